@@ -0,0 +1,417 @@
+"""
+Asset library catalog shared by the Python asset tools.
+
+The catalog lives in a hidden ``.dav_cache`` folder at the root of an asset
+library, next to everything the tools derive from the assets (peak files,
+metadata, thumbnails, ...). The viewer reads the same folder through the
+directory handle the user picks, so derived data never has to be uploaded
+anywhere.
+
+Scan rules (see scan_rules.py) given on the command line are saved in the
+catalog and used by every later scan of the library, including the ones the
+other tools start.
+
+Usage:
+    python asset_catalog.py LIBRARY_ROOT [--exclude GLOB] [--include GLOB] [--max-depth N] [--sniff] [--no-rules]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from scan_rules import ScanRules
+from service_metrics import CACHE_REQUESTS, STAGE_SECONDS, Counter, Gauge, Histogram, flush_metrics_file, trace
+
+CACHE_DIR_NAME = ".dav_cache"
+CATALOG_FILE_NAME = "catalog.json"
+CATALOG_VERSION = 1
+
+# Supported extensions per asset type - keep in sync with asset_types.js
+TYPE_EXTENSIONS = {
+    "glb": ("glb",),
+    "fbx": ("fbx",),
+    "obj": ("obj",),
+    "usdz": ("usdz",),
+    "video": ("mp4", "webm", "ogg"),
+    "audio": ("mp3", "wav", "flac"),
+    "image": ("jpg", "jpeg", "png", "gif", "webp", "tif", "tiff"),
+    "hdr": ("exr", "hdr"),
+}
+
+EXTENSION_TYPES = {
+    ext: asset_type for asset_type, extensions in TYPE_EXTENSIONS.items() for ext in extensions
+}
+
+# Magic bytes per asset type, for files with a missing or unknown extension.
+# A signature is a tuple of (offset, bytes) pairs that must all match.
+TYPE_SIGNATURES = {
+    "glb": (((0, b"glTF"),),),
+    "fbx": (((0, b"Kaydara FBX Binary"),),),
+    "video": (
+        ((4, b"ftypiso"),), ((4, b"ftypmp4"),), ((4, b"ftypM4V"),), ((4, b"ftypavc1"),),
+        ((0, b"\x1a\x45\xdf\xa3"),), ((0, b"OggS"),),
+    ),
+    "audio": (
+        ((0, b"ID3"),), ((0, b"\xff\xfb"),), ((0, b"\xff\xf3"),), ((0, b"\xff\xf2"),),
+        ((0, b"RIFF"), (8, b"WAVE")), ((0, b"fLaC"),),
+    ),
+    "image": (
+        ((0, b"\xff\xd8\xff"),), ((0, b"\x89PNG\r\n\x1a\n"),), ((0, b"GIF8"),),
+        ((0, b"RIFF"), (8, b"WEBP")), ((0, b"II*\x00"),), ((0, b"MM\x00*"),),
+    ),
+    "hdr": (((0, b"\x76\x2f\x31\x01"),), ((0, b"#?RADIANCE"),), ((0, b"#?RGBE"),)),
+}
+
+SNIFF_BYTES = max(
+    offset + len(magic)
+    for signatures in TYPE_SIGNATURES.values() for signature in signatures for offset, magic in signature
+)
+
+
+SCAN_FILES = Counter("dav_scan_files_total", "Asset files found by library scans")
+SCAN_SECONDS = Counter("dav_scan_seconds_total", "Time spent scanning libraries")
+SCAN_FILES_PER_SECOND = Gauge("dav_scan_files_per_second", "Throughput of the last library scan")
+SCAN_DIRECTORY_SECONDS = Histogram("dav_scan_directory_seconds", "Time to list one directory and stat its assets")
+BATCH_QUEUE_DEPTH = Gauge("dav_batch_queue_depth", "Assets waiting for or being processed by a batch", ("stage",))
+BATCH_ITEMS = Counter("dav_batch_items_total", "Assets processed by batches, by outcome", ("stage", "result"))
+BATCH_ITEM_SECONDS = Histogram("dav_batch_item_seconds", "Time to process one asset", ("stage",))
+
+
+def get_extension(name):
+    """
+    Returns the lower-case extension of a file name without the dot.
+    """
+    return os.path.splitext(name)[1][1:].lower()
+
+
+def get_asset_type(name):
+    """
+    Returns the asset type for a file name, or None if it is not supported.
+    """
+    return EXTENSION_TYPES.get(get_extension(name))
+
+
+def sniff_asset_type(path):
+    """
+    Returns the asset type whose magic bytes start the file, or None.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return None
+    for asset_type, signatures in TYPE_SIGNATURES.items():
+        for signature in signatures:
+            if all(head[offset:offset + len(magic)] == magic for offset, magic in signature):
+                return asset_type
+    return None
+
+
+def detect_asset_type(path):
+    """
+    Returns the asset type of a file by its extension, or by its content if
+    the extension is missing or unknown (a file the catalog sniffed).
+    """
+    return get_asset_type(os.path.basename(path)) or sniff_asset_type(path)
+
+
+@contextmanager
+def named_as_type(path, asset_type):
+    """
+    Yields a path of the file that has an extension of `asset_type`.
+
+    External converters pick their reader by the extension, so a sniffed
+    file without one is linked (or copied) into a temporary folder under a
+    name that has it.
+    """
+    if get_asset_type(os.path.basename(path)) == asset_type:
+        yield path
+        return
+    with tempfile.TemporaryDirectory() as temp_dir:
+        alias = os.path.join(temp_dir, "asset." + TYPE_EXTENSIONS[asset_type][0])
+        try:
+            os.link(path, alias)
+        except OSError:
+            shutil.copyfile(path, alias)
+        yield alias
+
+
+def cache_root(root):
+    """
+    Returns the path of the cache folder for a library root.
+    """
+    return os.path.join(root, CACHE_DIR_NAME)
+
+
+def derived_path(root, kind, rel_path, suffix):
+    """
+    Returns the absolute path of a file derived from an asset.
+
+    Derived files mirror the library layout under ``.dav_cache/<kind>/`` so
+    the viewer can locate them from an asset's relative path alone.
+    """
+    return os.path.join(cache_root(root), kind, *rel_path.split("/")) + suffix
+
+
+def cache_relative(root, path):
+    """
+    Returns a cache file path relative to the cache folder, using forward slashes.
+    """
+    return os.path.relpath(path, cache_root(root)).replace(os.sep, "/")
+
+
+def is_fresh(derived, source):
+    """
+    Returns True if a derived file exists and is newer than its source file.
+    """
+    try:
+        return os.path.getmtime(derived) >= os.path.getmtime(source)
+    except OSError:
+        return False
+
+
+def make_entry(rel_path, stat_result, asset_type=None):
+    """
+    Builds the catalog entry for a single asset file. The type defaults to
+    the one of its extension.
+    """
+    name = rel_path.rsplit("/", 1)[-1]
+    return {
+        "path": rel_path,
+        "name": name,
+        "type": asset_type or get_asset_type(name),
+        "ext": get_extension(name),
+        "size": stat_result.st_size,
+        "mtime": stat_result.st_mtime,
+    }
+
+
+def iter_library(root, rules=None):
+    """
+    Yields (relative path, stat result, asset type) for every supported
+    asset under root.
+
+    The cache folder and the folders excluded by the scan `rules` are never
+    walked. Files with an unknown extension are only read if the rules ask
+    to sniff them.
+    """
+    rules = ScanRules(rules)
+    pending = [("", 0)]
+    while pending:
+        rel_dir, depth = pending.pop()
+        abs_dir = os.path.join(root, *rel_dir.split("/")) if rel_dir else root
+        # Each folder is read completely before yielding, so its timing does
+        # not include the caller's work
+        start = time.perf_counter()
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError as error:
+            print(f"Skipping unreadable folder '{abs_dir}': {error}")
+            continue
+        files = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name != CACHE_DIR_NAME and rules.enters_folder(rel_path, depth + 1):
+                    pending.append((rel_path, depth + 1))
+                continue
+            asset_type = get_asset_type(entry.name)
+            if (asset_type or rules.sniff) and rules.accepts_file(rel_path):
+                asset_type = asset_type or sniff_asset_type(entry.path)
+                if asset_type:
+                    files.append((rel_path, entry.stat(), asset_type))
+        elapsed = time.perf_counter() - start
+        SCAN_DIRECTORY_SECONDS.observe(elapsed)
+        trace("scan_directory", elapsed, path=abs_dir, entries=len(entries))
+        yield from files
+
+
+def empty_catalog(root):
+    return {
+        "version": CATALOG_VERSION,
+        "root": os.path.abspath(root),
+        "updated": None,
+        "assets": {},
+    }
+
+
+def load_catalog(root):
+    """
+    Loads the catalog of a library, or returns an empty one if there is none yet.
+    """
+    path = os.path.join(cache_root(root), CATALOG_FILE_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+    except FileNotFoundError:
+        return empty_catalog(root)
+    if catalog.get("version") != CATALOG_VERSION:
+        print(f"Ignoring catalog with unsupported version {catalog.get('version')}")
+        return empty_catalog(root)
+    return catalog
+
+
+def save_catalog(root, catalog):
+    """
+    Writes the catalog atomically so readers never see a partial file.
+    """
+    os.makedirs(cache_root(root), exist_ok=True)
+    catalog["updated"] = time.time()
+    path = os.path.join(cache_root(root), CATALOG_FILE_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def update_asset_fields(root, updates):
+    """
+    Merges per-asset fields into the latest saved catalog.
+
+    `updates` maps relative asset paths to dicts of fields; a value of None
+    removes the field. Tools call this once at the end of a batch so they do
+    not overwrite fields another tool recorded while they were running.
+    """
+    catalog = load_catalog(root)
+    for rel_path, fields in updates.items():
+        entry = catalog["assets"].get(rel_path)
+        if entry is None:
+            continue
+        for key, value in fields.items():
+            if value is None:
+                entry.pop(key, None)
+            else:
+                entry[key] = value
+    save_catalog(root, catalog)
+    return catalog
+
+
+def update_catalog(root, rules=None):
+    """
+    Rescans a library and merges the result into its catalog.
+
+    Entries whose size and modification time are unchanged keep any fields
+    the other tools added to them; changed files get a fresh entry. New
+    scan `rules` replace the ones saved in the catalog; without them the
+    saved rules are used.
+    """
+    catalog = load_catalog(root)
+    if rules is not None:
+        catalog["scan"] = ScanRules(rules).rules
+    previous = catalog["assets"]
+    assets = {}
+    start = time.perf_counter()
+    for rel_path, stat_result, asset_type in iter_library(root, catalog.get("scan")):
+        entry = make_entry(rel_path, stat_result, asset_type)
+        old = previous.get(rel_path)
+        if old and old.get("size") == entry["size"] and old.get("mtime") == entry["mtime"]:
+            entry = {**old, **entry}
+        assets[rel_path] = entry
+    elapsed = time.perf_counter() - start
+    SCAN_FILES.inc(len(assets))
+    SCAN_SECONDS.inc(elapsed)
+    SCAN_FILES_PER_SECOND.set(len(assets) / elapsed if elapsed > 0 else 0)
+    STAGE_SECONDS.observe(elapsed, stage="scan")
+    catalog["assets"] = assets
+    save_catalog(root, catalog)
+    return catalog
+
+
+def asset_path(root, rel_path):
+    """
+    Returns the absolute path of an asset from its catalog path.
+    """
+    return os.path.join(root, *rel_path.split("/"))
+
+
+def _run_one(process, root, rel_path):
+    start = time.perf_counter()
+    try:
+        return rel_path, process(root, rel_path), None, time.perf_counter() - start
+    except Exception as error:
+        return rel_path, None, str(error), time.perf_counter() - start
+
+
+def run_asset_batch(root, asset_types, process, jobs=None, needs_update=None, error_fields=(), label="Processing",
+                    catalog=None):
+    """
+    Runs a tool over every cataloged asset of the given types in worker processes.
+
+    `process(root, rel_path)` must be picklable (a module-level function or a
+    functools.partial of one) and return a dict of catalog fields for the
+    asset. `needs_update(entry)` can skip assets whose fields are current.
+    Fields named in `error_fields` are removed from assets that fail.
+    Results are merged into the catalog once all workers finish. Pass a
+    `catalog` that was just refreshed to skip rescanning the library.
+
+    Returns the number of failed assets.
+    """
+    if catalog is None:
+        catalog = update_catalog(root)
+    # Metrics are labelled with the tool's module, e.g. "thumbnail_atlas"
+    stage = getattr(process, "func", process).__module__
+    candidates = [path for path, entry in catalog["assets"].items() if entry["type"] in asset_types]
+    rel_paths = [path for path in candidates if needs_update is None or needs_update(catalog["assets"][path])]
+    CACHE_REQUESTS.inc(len(candidates) - len(rel_paths), cache=stage, result="hit")
+    CACHE_REQUESTS.inc(len(rel_paths), cache=stage, result="miss")
+    print(f"{label} {len(rel_paths)} assets")
+
+    start = time.perf_counter()
+    failures = 0
+    updates = {}
+    BATCH_QUEUE_DEPTH.set(len(rel_paths), stage=stage)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_run_one, process, root, rel_path) for rel_path in rel_paths]
+        for future in as_completed(futures):
+            rel_path, fields, error, seconds = future.result()
+            BATCH_QUEUE_DEPTH.dec(stage=stage)
+            BATCH_ITEM_SECONDS.observe(seconds, stage=stage)
+            BATCH_ITEMS.inc(stage=stage, result="failed" if error else "ok")
+            trace("process_asset", seconds, stage=stage, path=rel_path)
+            if error:
+                failures += 1
+                updates[rel_path] = {field: None for field in error_fields}
+                print(f"Failed to process '{rel_path}': {error}")
+            else:
+                updates[rel_path] = fields
+            flush_metrics_file()
+    update_asset_fields(root, updates)
+
+    elapsed = time.perf_counter() - start
+    STAGE_SECONDS.observe(elapsed, stage=stage)
+    print(f"Finished in {elapsed:.2f}s ({failures} failed)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the catalog of an asset library.")
+    parser.add_argument("root", help="Library root folder")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="Skip files and folders matching GLOB, e.g. '**/cache/**', '*.bak' or .git (repeatable)")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="Only catalog files matching GLOB (repeatable)")
+    parser.add_argument("--max-depth", type=int, metavar="N", help="Scan at most N folder levels below the root")
+    parser.add_argument("--sniff", action="store_true",
+                        help="Detect the type of files with a missing or unknown extension from their content")
+    parser.add_argument("--no-rules", action="store_true", help="Forget the saved scan rules")
+    args = parser.parse_args()
+
+    rules = None
+    if args.no_rules or args.exclude or args.include or args.max_depth is not None or args.sniff:
+        rules = {"include": args.include, "exclude": args.exclude, "max_depth": args.max_depth, "sniff": args.sniff}
+
+    start = time.perf_counter()
+    catalog = update_catalog(args.root, rules)
+    elapsed = time.perf_counter() - start
+    print(f"Cataloged {len(catalog['assets'])} assets in {elapsed:.2f}s")
+    if catalog.get("scan"):
+        print(f"Scan rules: {json.dumps(catalog['scan'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,28 @@
 // asset_loading.js
-import FBXViewer from './viewer_fbx.js';
+import TileLoadScheduler from './tile_scheduler.js';
+import { supportsWorkerDecode, loadImagePreview, drawPreview } from './image_preview.js';
+import { loadVideoStrip, drawStripFrame } from './video_preview.js';
+import { setLibraryRoot, closeLibraryRoot, getDerivedFile, getCatalogEntry, getLodFiles, getConvertedGLB, getCompressedGLB, loadCatalog } from './library_cache.js';
+import {
+  libraryRoots,
+  restoreLibraryRoots,
+  saveLibraryRoots,
+  addLibraryRoot,
+  setDetachedRoot,
+  removeLibraryRoot,
+  getLibraryRoot,
+  ensureRootPermission,
+  scanRoot
+} from './library_roots.js';
+import { readPeakLevel, drawWaveform } from './waveform.js';
+import { indexAssets, searchAssets, similarQuery } from './search.js';
+import { prepareAtlases, forgetAtlases, getPageAtlasCells, createAtlasThumb } from './atlas.js';
+import { formatScanRules, parseScanRules } from './scan_rules.js';
+import { ASSET_TYPES, detectType, getRenderers, registerRenderers } from './asset_types.js';
+import './hdr_preview.js';
+import { getPyramid, loadPyramidPreview, needsPyramid, TiledImageViewer } from './tiled_image.js';
+import { startSpan, measureSince } from './perf_trace.js';
+import { registerMemorySource, memoryCheckpoint } from './memory_diagnostics.js';
 
 // Keep track of active FBX viewers
 export const activeFbxViewers = new Set();
@@ -16,22 +39,23 @@ import {
   setCurrentSort,
   updatePagination,
   toggleSelectionUI,
-  fileMatchesSearch,
+  getSearchTerm,
+  setSearchTerm,
   getUIElements,
   initializeUI
 } from './ui.js';
-import * as THREE from 'three';
-import { OrbitControls } from 'three/addons/controls/OrbitControls.js';
-import { FBXLoader } from 'three/addons/loaders/FBXLoader.js';
 
 const folderPickerButton = document.getElementById("folderPicker");
 // Remove folderPathInput reference since we no longer use it
 const viewerContainer = document.getElementById("viewerContainer");
-const filterOptions = document.querySelectorAll('.filter-option');
+const filterOptions = document.querySelectorAll('.filter-option[data-type]');
+const collapseDuplicatesOption = document.querySelector('.filter-option[data-option="collapse-duplicates"]');
 const itemsOptions = document.querySelectorAll('.items-option');
 const itemsBtn = document.querySelector('.dropdown-btn');
 const sortOptions = document.querySelectorAll('.sort-option');
 const sortDirectionBtn = document.querySelector('.sort-direction');
+const rootsButton = document.getElementById('rootsBtn');
+const rootsDropdown = document.getElementById('rootsDropdown');
 
 let modelFiles = [];
 let filteredModelFiles = [];
@@ -45,16 +69,178 @@ const observerOptions = {
   threshold: 0.1
 };
 
+// Limits concurrent tile loads per type and cancels them on page change
+const tileScheduler = new TileLoadScheduler();
+
 const tileObserver = new IntersectionObserver((entries, observer) => {
   entries.forEach(entry => {
+    const tile = entry.target;
     if (entry.isIntersecting) {
-      const tile = entry.target;
-      loadTileContent(tile);
-      observer.unobserve(tile);
+      tileScheduler.enqueue(tile, tile.model.type, (signal) => {
+        observer.unobserve(tile);
+        return loadTileContent(tile, signal);
+      });
+    } else {
+      // Not started yet - it will be queued again when it scrolls back in
+      tileScheduler.dequeue(tile);
     }
   });
 }, observerOptions);
 
+// Pinned to vendor.MODEL_VIEWER_VERSION, so the copy sw.js caches is never
+// swapped for another release
+const MODEL_VIEWER_URL = 'https://unpkg.com/@google/model-viewer@3.4.0/dist/model-viewer.min.js';
+
+// The 3D stacks are loaded on demand, so folders without models never pay
+// for parsing three.js or model-viewer. three.js comes in when the first
+// FBX, OBJ or USDZ tile or preview is shown.
+let fbxModules = null;
+
+function loadFbxModules() {
+  if (!fbxModules) {
+    fbxModules = Promise.all([
+      import('./viewer_fbx.js'),
+      import('./model_cache.js'),
+    ]).then(([viewer, cache]) => ({
+      FBXViewer: viewer.default,
+      modelCache: cache.modelCache,
+    }));
+    // Let a later attempt retry after a network error
+    fbxModules.catch(() => { fbxModules = null; });
+  }
+  return fbxModules;
+}
+
+// three.js loader per model type shown with FBXViewer; each is fetched
+// with the first model of its type
+const THREE_LOADERS = {
+  fbx: () => import('three/addons/loaders/FBXLoader.js').then(module => module.FBXLoader),
+  obj: () => import('three/addons/loaders/OBJLoader.js').then(module => module.OBJLoader),
+  usdz: () => import('three/addons/loaders/USDZLoader.js').then(module => module.USDZLoader),
+};
+
+// Once a folder is known to hold models, fetch their code in the background
+// so the first 3D tile does not wait for it
+let preloaded3D = false;
+
+function preload3DModules(models) {
+  if (preloaded3D) return;
+  const hasFbx = models.some(model => THREE_LOADERS[model.type]);
+  const hasGlb = models.some(model => model.type === 'glb');
+  if (!hasFbx && !hasGlb) return;
+  preloaded3D = true;
+  const hrefs = [];
+  if (hasFbx) {
+    hrefs.push(...[
+      './viewer_fbx.js',
+      './model_cache.js',
+      'three',
+      'three/addons/controls/OrbitControls.js',
+      'three/addons/loaders/FBXLoader.js',
+      'three/addons/utils/SkeletonUtils.js',
+    ].map(specifier => import.meta.resolve(specifier)));
+  }
+  // Converted FBX models are shown with model-viewer as well
+  hrefs.push(MODEL_VIEWER_URL);
+  for (const href of hrefs) {
+    const link = document.createElement('link');
+    link.rel = 'modulepreload';
+    link.href = href;
+    document.head.appendChild(link);
+  }
+}
+
+// Parsed FBX, OBJ or USDZ model shared by every view of the same content:
+// tiles, tiles rendered again after a page round-trip, fullscreen and
+// duplicate files. Loads are not tied to one view, so they are not aborted
+// with it.
+async function acquireThreeModel(model, entry) {
+  const [{ modelCache }, Loader] = await Promise.all([loadFbxModules(), THREE_LOADERS[model.type]()]);
+  const key = entry?.hash || `${model.relativePath || model.name}:${model.file.size}:${model.file.lastModified}`;
+  return modelCache.acquire(key, async () => {
+    const url = URL.createObjectURL(model.file);
+    try {
+      return await new Loader().loadAsync(url);
+    } finally {
+      URL.revokeObjectURL(url);
+    }
+  });
+}
+
+// Tile FBX viewers only render while their tile is in the viewport
+const tileViewers = new WeakMap();
+const viewerVisibilityObserver = new IntersectionObserver((entries) => {
+  entries.forEach(entry => {
+    const viewer = tileViewers.get(entry.target);
+    if (!viewer) return;
+    if (entry.isIntersecting) {
+      viewer.start();
+    } else {
+      viewer.stop();
+    }
+  });
+});
+
+// three.js resources of every live FBX viewer, for memory diagnostics
+registerMemorySource(() => [...activeFbxViewers].map(viewer => ({
+  element: viewer.renderer.domElement,
+  geometries: viewer.renderer.info.memory.geometries,
+  textures: viewer.renderer.info.memory.textures,
+})));
+
+function disposeTileViewer(viewerDiv, viewer) {
+  viewerVisibilityObserver.unobserve(viewerDiv);
+  tileViewers.delete(viewerDiv);
+  activeFbxViewers.delete(viewer);
+  viewer.dispose();
+}
+
+// Free the WebGL contexts of the tiles on the page being replaced
+function disposeTileViewers() {
+  for (const viewer of activeFbxViewers) {
+    if (viewer !== fullscreenFbxViewer) disposeTileViewer(viewer.container, viewer);
+  }
+}
+
+function abortError() {
+  return new DOMException('Tile load aborted', 'AbortError');
+}
+
+// Object URL that is revoked if the tile load is aborted
+function createTileObjectURL(file, signal) {
+  const url = URL.createObjectURL(file);
+  signal?.addEventListener('abort', () => URL.revokeObjectURL(url), { once: true });
+  return url;
+}
+
+// Resolve when `element` fires `readyEvent`, reject on error or abort
+function waitForElement(element, readyEvent, signal) {
+  return new Promise((resolve, reject) => {
+    if (signal?.aborted) {
+      reject(abortError());
+      return;
+    }
+    const cleanup = () => {
+      element.removeEventListener(readyEvent, onReady);
+      element.removeEventListener('error', onError);
+      signal?.removeEventListener('abort', onAbort);
+    };
+    const onReady = () => { cleanup(); resolve(element); };
+    const onError = () => { cleanup(); reject(new Error(`Failed to load ${element.tagName.toLowerCase()}`)); };
+    const onAbort = () => { cleanup(); reject(abortError()); };
+    element.addEventListener(readyEvent, onReady);
+    element.addEventListener('error', onError);
+    signal?.addEventListener('abort', onAbort);
+  });
+}
+
+// Release the decoder held by a media element
+function releaseMediaElement(media) {
+  media.pause();
+  media.removeAttribute('src');
+  media.load();
+}
+
 // Format file size in a human-readable format
 function formatFileSize(bytes) {
   if (bytes === 0) return '0 B';
@@ -86,61 +272,111 @@ function createPlaceholder(type) {
 // Cache for tile content
 const tileCache = new Map();
 
-// File retrieval function - Recursively collects files from selected directory
-async function getFilesFromDirectory(dirHandle, recursive, currentDepth = 0) {
-  let files = [];
-  const depth = getSubfolderDepth();
-  const maxDepth = depth === 'all' ? Infinity : depth === 'off' ? 0 : parseInt(depth);
-
-  for await (const [name, handle] of dirHandle.entries()) {
-    if (handle.kind === "file") {
-      files.push({ name, handle });
-    } else if (handle.kind === "directory" && recursive && currentDepth < maxDepth) {
-      const subFiles = await getFilesFromDirectory(handle, true, currentDepth + 1);
-      files = files.concat(subFiles);
-    }
+// Stable key for a file across page renders
+function getAssetKey(model) {
+  return `${model.fullPath || model.name}|${model.file.size}|${model.file.lastModified}`;
+}
+
+// Compare two files using the current sort settings
+function compareFiles(a, b) {
+  const currentSort = getCurrentSort();
+  let comparison = 0;
+  switch (currentSort.field) {
+    case 'name':
+      comparison = a.name.localeCompare(b.name);
+      break;
+    case 'size':
+      comparison = a.file.size - b.file.size;
+      break;
+    case 'type':
+      comparison = a.type.localeCompare(b.type);
+      break;
+    case 'date':
+      comparison = a.file.lastModified - b.file.lastModified;
+      break;
   }
-  return files;
+  return currentSort.direction === 'asc' ? comparison : -comparison;
 }
 
 // Sort files based on current sort settings
 function sortFiles() {
-  const currentSort = getCurrentSort();
-  filteredModelFiles.sort((a, b) => {
-    let comparison = 0;
-    switch (currentSort.field) {
-      case 'name':
-        comparison = a.name.localeCompare(b.name);
-        break;
-      case 'size':
-        comparison = a.file.size - b.file.size;
-        break;
-      case 'type':
-        comparison = a.type.localeCompare(b.type);
-        break;
-      case 'date':
-        comparison = a.file.lastModified - b.file.lastModified;
-        break;
-    }
-    return currentSort.direction === 'asc' ? comparison : -comparison;
-  });
+  filteredModelFiles.sort(compareFiles);
   
   // Re-render the current page with sorted files
   renderPage(getCurrentPage());
 }
 
 // Initialize active filters
-const activeFilters = new Set(['fbx', 'glb', 'video', 'audio', 'image']);
+const activeFilters = new Set(Object.keys(ASSET_TYPES));
+let collapseDuplicates = false;
+// Library roots whose assets are filtered out; switching projects only
+// changes this, it never rescans
+const hiddenRoots = new Set();
+// Search results per root, shown in the roots dropdown
+let rootCounts = {};
+// Search document of each loaded asset (duplicate group, pHashes, ...)
+let searchDocs = new Map();
+// Number of assets each visible tile stands for when duplicates are collapsed
+const duplicateCounts = new Map();
+
+// Rebuild the search index after modelFiles changed
+async function indexModelFiles() {
+  const docs = await indexAssets(modelFiles);
+  searchDocs = new Map(modelFiles.map((model, i) => [model, docs[i]]));
+}
 
-// Filter management - Updates displayed assets based on active file type filters and search
-function updateFilteredModelFiles() {
-  const previousLength = filteredModelFiles.length;
-  filteredModelFiles = modelFiles.filter(item => 
-    activeFilters.has(item.type) && fileMatchesSearch(item)
-  );
+// Keep the first asset of each duplicate group, in the current sort order
+function collapseDuplicateFiles(files) {
+  duplicateCounts.clear();
+  const shown = new Map();
+  return files.filter(item => {
+    const group = searchDocs.get(item)?.group;
+    if (!group) return true;
+    const first = shown.get(group);
+    if (first) {
+      duplicateCounts.set(first, duplicateCounts.get(first) + 1);
+      return false;
+    }
+    shown.set(group, item);
+    duplicateCounts.set(item, 1);
+    return true;
+  });
+}
+
+// Show how many search results each type filter would add
+function updateFilterCounts(typeCounts) {
+  filterOptions.forEach(option => {
+    option.dataset.count = typeCounts[option.dataset.type] || 0;
+  });
+}
+
+// Filter management - Updates displayed assets based on active file type filters and search.
+// Search ids are positions in modelFiles, as passed to indexAssets().
+async function updateFilteredModelFiles() {
+  const result = await searchAssets(getSearchTerm());
+  // A newer search started while this one was running
+  if (!result) return;
+
+  const previous = filteredModelFiles;
+  filteredModelFiles = [];
+  for (const id of result.ids) {
+    const item = modelFiles[id];
+    if (item && activeFilters.has(item.type) && !hiddenRoots.has(item.root)) filteredModelFiles.push(item);
+  }
+  filteredModelFiles.sort(compareFiles);
+  if (collapseDuplicates) {
+    filteredModelFiles = collapseDuplicateFiles(filteredModelFiles);
+  } else {
+    duplicateCounts.clear();
+  }
+  updateFilterCounts(result.facets.type);
+  rootCounts = result.facets.root;
+  updateRootCounts();
 
   // Only trigger full re-render if filter actually changed the visible items
-  if (previousLength !== filteredModelFiles.length) {
+  const changed = previous.length !== filteredModelFiles.length ||
+    filteredModelFiles.some((item, i) => item !== previous[i]);
+  if (changed) {
     setCurrentPage(0);
     renderPage(getCurrentPage());
   }
@@ -162,213 +398,514 @@ filterOptions.forEach(option => {
   });
 });
 
-async function handleFolderPick(dirHandle) {
-  console.log("Starting folder processing");
-  modelFiles = [];
+collapseDuplicatesOption?.addEventListener('click', () => {
+  collapseDuplicates = collapseDuplicatesOption.classList.toggle('active');
+  updateFilteredModelFiles();
+});
+
+// Start time of the last folder pick, until its first tile has loaded
+let firstTileStart = null;
+
+function markFirstTile() {
+  if (firstTileStart === null) return;
+  measureSince('first-tile', firstTileStart);
+  firstTileStart = null;
+}
+
+function getMaxScanDepth() {
+  const depth = getSubfolderDepth();
+  return depth === 'all' ? Infinity : depth === 'off' ? 0 : parseInt(depth);
+}
+
+// Scan one library root and replace its files; other roots are untouched
+async function scanLibraryRoot(root) {
+  const detail = { root: root.name };
+  let endPhase = startSpan('folder-pick:cache', detail);
+  if (await setLibraryRoot(root.handle, root.name)) {
+    console.log(`Found library cache folder in '${root.name}'`);
+    // The catalog already tells whether there are models, before the scan
+    const catalog = await loadCatalog(root.name);
+    if (catalog) preload3DModules(Object.values(catalog.assets || {}));
+    // Scan the way the indexer does unless the root has rules of its own
+    if (!root.rules && catalog?.scan) {
+      root.rules = catalog.scan;
+      saveLibraryRoots();
+    }
+  }
+  if (await prepareAtlases(root.name)) {
+    console.log(`Using thumbnail atlases of '${root.name}'`);
+  }
+  endPhase();
+  endPhase = startSpan('folder-pick:scan', detail);
+  // A root's own depth limit wins over the subfolder depth setting
+  const rules = { ...root.rules, max_depth: root.rules?.max_depth ?? getMaxScanDepth() };
+  const entries = await scanRoot(root, { rules });
+  endPhase({ files: entries.length });
+  endPhase = startSpan('folder-pick:classify', detail);
+  root.files = entries.map(({ name, relativePath, file, type }) => ({
+    name,
+    file,
+    type,
+    root: root.name,
+    fullPath: `${root.name}\\${relativePath.replaceAll('/', '\\')}`,
+    relativePath
+  }));
+  endPhase({ files: root.files.length });
+  console.log(`Found ${root.files.length} supported files in '${root.name}'`);
+}
+
+// Merge the files of every scanned root into one list and index it
+async function rebuildLibrary() {
+  modelFiles = libraryRoots.flatMap(root => root.files || []);
+  let endPhase = startSpan('folder-pick:sort');
+  modelFiles.sort((a, b) => a.name.localeCompare(b.name));
+  endPhase();
+  preload3DModules(modelFiles);
+  endPhase = startSpan('folder-pick:index');
+  await indexModelFiles();
+  endPhase();
+  endPhase = startSpan('folder-pick:filter');
+  await updateFilteredModelFiles();
+  endPhase({ files: filteredModelFiles.length });
+  console.log(`Filtered to ${filteredModelFiles.length} files based on current filters`);
+  setCurrentPage(0);
+  updatePagination(Math.ceil(filteredModelFiles.length / getItemsPerPage()));
+  renderPage(getCurrentPage());
+  renderRootOptions();
+}
+
+// Scan roots in parallel, one worker each, then show the merged library.
+// A root that fails to scan is left unscanned. Resolves to the failures.
+async function loadLibraryRoots(roots) {
+  firstTileStart = performance.now();
+  const endPick = startSpan('folder-pick', { roots: roots.length });
   viewerContainer.innerHTML = "";
+  const failures = [];
   try {
-    let fileEntries = [];
-    const depth = getSubfolderDepth();
-    if (depth !== 'off') {
-      console.log(`Loading files with subfolder depth: ${depth}`);
-      fileEntries = await getFilesFromDirectory(dirHandle, true);
-    } else {
-      console.log("Loading files from root directory only");
-      for await (const [name, handle] of dirHandle.entries()) {
-        fileEntries.push({ name, handle });
-      }
-    }
-    console.log(`Found ${fileEntries.length} total files`);
-    for (const {name, handle} of fileEntries) {
-      const lowerCaseName = name.toLowerCase();
-      if (
-        lowerCaseName.endsWith(".glb") || lowerCaseName.endsWith(".fbx") ||
-        lowerCaseName.endsWith(".mp4") || lowerCaseName.endsWith(".webm") ||
-        lowerCaseName.endsWith(".ogg") || lowerCaseName.endsWith(".mp3") ||
-        lowerCaseName.endsWith(".wav") ||
-        lowerCaseName.endsWith(".jpg") || lowerCaseName.endsWith(".jpeg") ||
-        lowerCaseName.endsWith(".png") || lowerCaseName.endsWith(".gif")
-      ) {
-        console.log(`Processing file: ${name}`);
-        const file = await handle.getFile();
-        let type = "other";
-        if (lowerCaseName.endsWith(".glb")) { type = "glb"; }
-        else if (lowerCaseName.endsWith(".fbx")) { type = "fbx"; }
-        else if (lowerCaseName.endsWith(".mp4") || lowerCaseName.endsWith(".webm") || lowerCaseName.endsWith(".ogg")) { type = "video"; }
-        else if (lowerCaseName.endsWith(".mp3") || lowerCaseName.endsWith(".wav")) { type = "audio"; }
-        else if (
-          lowerCaseName.endsWith(".jpg") || lowerCaseName.endsWith(".jpeg") ||
-          lowerCaseName.endsWith(".png") || lowerCaseName.endsWith(".gif")
-        ) { type = "image"; }
-        const getFullPath = async (handle) => {
-          const relativeParts = [];
-          let current = handle;
-          while (current) {
-            relativeParts.unshift(current.name);
-            try {
-              current = await current.getParent();
-            } catch {
-              break;
-            }
-          }
-          return relativeParts.join('\\');
-        };
-        const fullPath = await getFullPath(handle);
-        modelFiles.push({ name, file, type, fullPath });
-        console.log(`Added ${type} file: ${name}`);
+    const results = await Promise.allSettled(roots.map(root => scanLibraryRoot(root)));
+    results.forEach((result, i) => {
+      if (result.status === 'rejected') {
+        console.error(`Error scanning '${roots[i].name}':`, result.reason);
+        roots[i].files = null;
+        failures.push(result.reason);
       }
-    }
-    console.log(`Processed ${modelFiles.length} supported files`);
-    modelFiles.sort((a, b) => a.name.localeCompare(b.name));
-    console.log("Files sorted alphabetically");
-    updateFilteredModelFiles();
-    console.log(`Filtered to ${filteredModelFiles.length} files based on current filters`);
-    setCurrentPage(0);
-    updatePagination(Math.ceil(filteredModelFiles.length / getItemsPerPage()));
-    renderPage(getCurrentPage());
-    console.log("Initial page rendered");
+    });
+    await rebuildLibrary();
+    if (filteredModelFiles.length === 0) firstTileStart = null;
+  } catch (error) {
+    firstTileStart = null;
+    throw error;
+  } finally {
+    endPick({ files: modelFiles.length });
+  }
+  return failures;
+}
+
+// Add a picked folder as a library root (or rescan it if it is one
+// already) and switch to it. Other roots stay loaded, just hidden.
+async function handleFolderPick(dirHandle) {
+  console.log("Starting folder processing");
+  try {
+    const root = await addLibraryRoot(dirHandle);
+    showOnlyRoot(root.name);
+    const [error] = await loadLibraryRoots([root]);
+    if (error) throw error;
+    saveLibraryRoots();
   } catch (error) {
     console.error("Error in handleFolderPick:", error);
     alert(`Error: ${error.message}\n\nFailed to access folder contents. Ensure you have permission.`);
   }
 }
 
-async function loadTileContent(tile) {
-  const model = tile.model;
-  const placeholder = tile.querySelector('.placeholder');
+function removeRoot(name) {
+  removeLibraryRoot(name);
+  closeLibraryRoot(name);
+  forgetAtlases(name);
+  hiddenRoots.delete(name);
+  saveLibraryRoots();
+  rebuildLibrary();
+}
+
+// Root name for files dropped on the viewer
+const DROPPED_ROOT = 'Dropped files';
+
+function showOnlyRoot(name) {
+  hiddenRoots.clear();
+  for (const root of libraryRoots) {
+    if (root.name !== name) hiddenRoots.add(root.name);
+  }
+}
+
+// Show only one root, or toggle it with Ctrl/Cmd
+function selectRoot(name, toggle) {
+  if (toggle) {
+    if (!hiddenRoots.delete(name)) hiddenRoots.add(name);
+  } else {
+    showOnlyRoot(name);
+  }
+  renderRootOptions();
+  updateFilteredModelFiles();
+}
+
+function updateRootCounts() {
+  rootsDropdown?.querySelectorAll('.root-option').forEach(option => {
+    if (getLibraryRoot(option.dataset.root)?.files) option.dataset.count = rootCounts[option.dataset.root] || 0;
+  });
+}
+
+function renderRootOptions() {
+  if (!rootsDropdown) return;
+  rootsDropdown.innerHTML = '';
+  for (const root of libraryRoots) {
+    const option = document.createElement('label');
+    option.className = 'filter-option root-option' + (hiddenRoots.has(root.name) ? '' : ' active');
+    option.dataset.root = root.name;
+    option.title = (root.files ? 'Click to show only this root, Ctrl+click to add or remove it'
+      : 'Not scanned yet - click to scan');
+    const rules = formatScanRules(root.rules);
+    if (rules) option.title += `\nScan rules: ${rules}`;
+    option.innerHTML = `<i class="fa fa-check"></i><span></span>
+      <button type="button" class="root-action" data-action="rules" title="Scan rules"><i class="fa fa-filter"></i></button>
+      <button type="button" class="root-action" data-action="rescan" title="Rescan"><i class="fa fa-rotate-right"></i></button>
+      <button type="button" class="root-action" data-action="remove" title="Remove from library"><i class="fa fa-xmark"></i></button>`;
+    option.querySelector('span').textContent = root.files ? root.name : `${root.name} (not scanned)`;
+    if (!root.handle) option.querySelectorAll('[data-action="rules"], [data-action="rescan"]').forEach(button => button.remove());
+    rootsDropdown.appendChild(option);
+  }
+  if (libraryRoots.length > 0) {
+    rootsDropdown.insertAdjacentHTML('beforeend', `
+      <label class="filter-option" data-option="all-roots"><i class="fa fa-eye"></i><span>Show all roots</span></label>
+      <div class="dropdown-divider"></div>`);
+  }
+  rootsDropdown.insertAdjacentHTML('beforeend',
+    `<label class="filter-option" data-option="add-root"><i class="fa fa-plus"></i><span>Add folder...</span></label>`);
+  updateRootCounts();
+
+  const shown = libraryRoots.filter(root => !hiddenRoots.has(root.name));
+  const label = rootsButton?.querySelector('span');
+  if (label) {
+    label.textContent = libraryRoots.length === 0 ? ''
+      : shown.length === 1 ? shown[0].name : `${shown.length}/${libraryRoots.length}`;
+  }
+}
+
+rootsDropdown?.addEventListener('click', async (event) => {
+  event.preventDefault();
+  event.stopPropagation();
+  const option = event.target.closest('label');
+  if (!option) return;
+  if (option.dataset.option === 'add-root') {
+    handleFolderSelection();
+    return;
+  }
+  if (option.dataset.option === 'all-roots') {
+    hiddenRoots.clear();
+    renderRootOptions();
+    updateFilteredModelFiles();
+    return;
+  }
+  const root = getLibraryRoot(option.dataset.root);
+  if (!root) return;
+  const action = event.target.closest('.root-action')?.dataset.action;
+  if (action === 'remove') {
+    removeRoot(root.name);
+    return;
+  }
+  if (action === 'rules') {
+    const text = prompt(
+      `Scan rules for '${root.name}', e.g. -**/cache/** -*.bak -.git +*.fbx depth:3\n` +
+      '(- excludes files and folders, + only includes matching files,\n' +
+      'sniff detects the type of files with a missing or unknown extension)',
+      formatScanRules(root.rules));
+    if (text === null) return;
+    root.rules = parseScanRules(text);
+    saveLibraryRoots();
+  }
+  if (action === 'rules' || action === 'rescan' || !root.files) {
+    // Permission can only be requested from a click
+    if (!await ensureRootPermission(root)) return;
+    hiddenRoots.delete(root.name);
+    const [error] = await loadLibraryRoots([root]);
+    if (error) alert(`Error scanning '${root.name}': ${error.message}`);
+  } else {
+    selectRoot(root.name, event.ctrlKey || event.metaKey);
+  }
+});
+
+// Reopen the roots of the last session. Roots the browser still has
+// permission for are scanned at once; the others on their first click.
+async function restoreLibrary() {
+  await restoreLibraryRoots();
+  const readable = [];
+  for (const root of libraryRoots) {
+    if (await ensureRootPermission(root, false)) readable.push(root);
+  }
+  renderRootOptions();
+  if (readable.length > 0) {
+    console.log(`Restoring ${readable.length} of ${libraryRoots.length} library roots`);
+    await loadLibraryRoots(readable);
+  }
+}
 
+restoreLibrary().catch(error => console.error('Error restoring library roots:', error));
+
+// Tile renderers, registered per type below. Each replaces the placeholder
+// and resolves once the preview is shown.
+
+// `converted` is a GLB made from another format; `fallback` renders the
+// original when it fails to load
+async function renderGlbTile(context, converted = null, fallback = null) {
+  const { model, placeholder, signal } = context;
+  await loadModelViewer();
+  if (signal?.aborted) throw abortError();
+
+  // Tiles are small, so the coarsest LOD is enough when there is one
+  const [coarsest] = converted ? [converted] : await getLodFiles(model);
+  const source = coarsest || await getCompressedGLB(model) || model.file;
+  if (signal?.aborted) throw abortError();
+  const mv = document.createElement("model-viewer");
+  let loaded = waitForElement(mv, 'load', signal);
+  mv.src = createTileObjectURL(source, signal);
+  mv.setAttribute("camera-controls", "");
+  mv.setAttribute("auto-rotate", "");
+  mv.setAttribute("environment-image", "neutral");
+  mv.setAttribute("animation-name", "*");
+  placeholder.replaceWith(mv);
   try {
-    if (model.type === "glb") {
-      if (!customElements.get('model-viewer')) {
-        const script = document.createElement('script');
-        script.type = 'module';
-        script.src = 'https://unpkg.com/@google/model-viewer/dist/model-viewer.min.js';
-        document.head.appendChild(script);
-        await new Promise(resolve => script.onload = resolve);
-      }
-      
-      const mv = document.createElement("model-viewer");
-      mv.src = URL.createObjectURL(model.file);
-      mv.setAttribute("camera-controls", "");
-      mv.setAttribute("auto-rotate", "");
-      mv.setAttribute("environment-image", "neutral");
-      mv.setAttribute("animation-name", "*");
-      placeholder.replaceWith(mv);
-
-    } else if (model.type === "fbx") {
-      const viewerDiv = document.createElement("div");
-      viewerDiv.className = "three-viewer";
-      placeholder.replaceWith(viewerDiv);
-      const viewer = new FBXViewer(viewerDiv);
-      activeFbxViewers.add(viewer);
-      viewer.loadModel(URL.createObjectURL(model.file));
+    await loaded;
+  } catch (error) {
+    // A derived file that fails to decode should not hide the original
+    if (error.name === 'AbortError' || source === model.file) throw error;
+    if (fallback) return fallback({ ...context, placeholder: mv });
+    loaded = waitForElement(mv, 'load', signal);
+    mv.src = createTileObjectURL(model.file, signal);
+    await loaded;
+  }
+}
 
-    } else if (model.type === "video") {
-      const videoPreview = document.createElement("div");
-      videoPreview.className = "video-preview";
-      const video = document.createElement("video");
-      video.src = URL.createObjectURL(model.file);
-      video.muted = true;
-      video.className = 'preview-video'; // Add class for easy selection
-      videoPreview.appendChild(video);
-
-      const scrubBarContainer = document.createElement("div");
-      scrubBarContainer.className = "scrub-bar-container";
-      const scrubBar = document.createElement("div");
-      scrubBar.className = "scrub-bar";
-      scrubBarContainer.appendChild(scrubBar);
-      const timeMarker = document.createElement("div");
-      timeMarker.className = "time-marker";
-      scrubBar.appendChild(timeMarker);
-      videoPreview.appendChild(scrubBarContainer);
-
-      let isDragging = false;
-
-      scrubBarContainer.addEventListener('mousedown', (e) => {
-        isDragging = true;
-        updateVideoTime(e);
-      });
+// FBX, OBJ and USDZ models, shown with three.js
+async function renderThreeTile({ model, placeholder, signal }) {
+  const { FBXViewer } = await loadFbxModules();
+  if (signal?.aborted) throw abortError();
+  const viewerDiv = document.createElement("div");
+  viewerDiv.className = "three-viewer";
+  placeholder.replaceWith(viewerDiv);
+  const viewer = new FBXViewer(viewerDiv);
+  activeFbxViewers.add(viewer);
+  tileViewers.set(viewerDiv, viewer);
+  viewerVisibilityObserver.observe(viewerDiv);
+  signal?.addEventListener('abort', () => disposeTileViewer(viewerDiv, viewer), { once: true });
+  const entry = await getCatalogEntry(model);
+  await viewer.showModel(acquireThreeModel(model, entry), signal, entry?.model?.bounds);
+}
 
-      document.addEventListener('mousemove', (e) => {
-        if (!isDragging) return;
-        updateVideoTime(e);
-      });
+// FBX models converted by fbx_convert.py load as GLB, which is much
+// faster to parse and lighter on memory than FBXLoader
+async function renderFbxTile(context) {
+  const converted = await getConvertedGLB(context.model);
+  if (context.signal?.aborted) throw abortError();
+  return converted ? renderGlbTile(context, converted, renderThreeTile) : renderThreeTile(context);
+}
 
-      document.addEventListener('mouseup', () => {
-        isDragging = false;
-      });
+// Hover-scrub swaps between pre-extracted frames; no live decoder per tile
+async function renderVideoTile({ model, placeholder, signal }) {
+  const videoPreview = document.createElement("div");
+  videoPreview.className = "video-preview";
+  const canvas = document.createElement("canvas");
+  canvas.className = 'preview-frame';
+  videoPreview.appendChild(canvas);
+
+  const scrubBarContainer = document.createElement("div");
+  scrubBarContainer.className = "scrub-bar-container";
+  const scrubBar = document.createElement("div");
+  scrubBar.className = "scrub-bar";
+  scrubBarContainer.appendChild(scrubBar);
+  const timeMarker = document.createElement("div");
+  timeMarker.className = "time-marker";
+  scrubBar.appendChild(timeMarker);
+  videoPreview.appendChild(scrubBarContainer);
+  placeholder.replaceWith(videoPreview);
+
+  const { width, height } = videoPreview.getBoundingClientRect();
+  const maxSize = Math.ceil(Math.max(width, height, 1) * window.devicePixelRatio);
+  const strip = await loadVideoStrip(getAssetKey(model), model.file, maxSize, signal);
+  const posterFrame = Math.floor(strip.frameCount / 2);
+  drawStripFrame(canvas, strip, posterFrame);
+
+  function updateVideoTime(e) {
+    const rect = videoPreview.getBoundingClientRect();
+    const x = Math.max(0, Math.min(e.clientX - rect.left, rect.width));
+    const percentage = rect.width ? x / rect.width : 0;
+    drawStripFrame(canvas, strip, Math.floor(percentage * strip.frameCount));
+    scrubBar.style.width = `${percentage * 100}%`;
+    timeMarker.textContent = formatTime(percentage * strip.duration);
+  }
 
-      function updateVideoTime(e) {
-        if (!video.duration) return;
-        const rect = scrubBarContainer.getBoundingClientRect();
-        const x = Math.max(0, Math.min(e.clientX - rect.left, rect.width));
-        const percentage = x / rect.width;
-        const newTime = percentage * video.duration;
-        video.currentTime = newTime;
-        scrubBar.style.width = `${percentage * 100}%`;
-        timeMarker.textContent = formatTime(newTime);
-        timeMarker.style.left = `${percentage * 100}%`;
-      }
+  videoPreview.addEventListener('mousemove', updateVideoTime);
+  videoPreview.addEventListener('mouseleave', () => {
+    drawStripFrame(canvas, strip, posterFrame);
+    scrubBar.style.width = '0';
+    timeMarker.textContent = '';
+  });
+}
 
-      scrubBarContainer.addEventListener('mousemove', updateVideoTime);
-      placeholder.replaceWith(videoPreview);
-
-    } else if (model.type === "audio") {
-      const audioTile = document.createElement("div");
-      audioTile.className = "audio-tile";
-      const audioHeader = document.createElement("div");
-      audioHeader.className = "audio-header";
-      const ext = model.name.split('.').pop().toUpperCase();
-      audioHeader.innerHTML = '<i class="fa fa-music"></i> ' + ext;
-      const audioControls = document.createElement("div");
-      audioControls.className = "audio-controls";
-      const audioElem = document.createElement("audio");
-      audioElem.src = URL.createObjectURL(model.file);
-      audioElem.controls = true;
-      
-      // Add event listener to stop other audio when this one starts playing
-      audioElem.addEventListener('play', () => {
-        // Stop all other audio elements
-        document.querySelectorAll('audio').forEach(audio => {
-          if (audio !== audioElem && !audio.paused) {
-            audio.pause();
-            audio.currentTime = 0;
-          }
-        });
-      });
-      
-      audioControls.appendChild(audioElem);
-      audioTile.appendChild(audioHeader);
-      audioTile.appendChild(audioControls);
-
-      // Add fullscreen button
-      const fsBtn = document.createElement('button');
-      fsBtn.className = 'fullscreen-btn';
-      fsBtn.innerHTML = '<i class="fa fa-expand"></i>';
-      fsBtn.onclick = () => showFullscreen(model);
-      audioTile.appendChild(fsBtn);
-
-      placeholder.replaceWith(audioTile);
-
-    } else if (model.type === "image") {
-      const imagePreview = document.createElement("div");
-      imagePreview.className = "image-preview";
-      const imgElem = document.createElement("img");
-      imgElem.src = URL.createObjectURL(model.file);
-      imagePreview.appendChild(imgElem);
-      placeholder.replaceWith(imagePreview);
+async function renderAudioTile({ model, placeholder, signal }) {
+  const audioTile = document.createElement("div");
+  audioTile.className = "audio-tile";
+  const audioHeader = document.createElement("div");
+  audioHeader.className = "audio-header";
+  const ext = model.name.split('.').pop().toUpperCase();
+  audioHeader.innerHTML = '<i class="fa fa-music"></i> ' + ext;
+  const audioControls = document.createElement("div");
+  audioControls.className = "audio-controls";
+  const audioElem = document.createElement("audio");
+  // With a pre-computed waveform the tile needs no decoding until played
+  const peakFile = await getDerivedFile('peaks', model, '.peaks');
+  if (signal?.aborted) throw abortError();
+  if (peakFile) {
+    audioElem.preload = 'none';
+  }
+  const loaded = peakFile ? null : waitForElement(audioElem, 'loadedmetadata', signal);
+  audioElem.src = createTileObjectURL(model.file, signal);
+  audioElem.controls = true;
+  
+  // Add event listener to stop other audio when this one starts playing
+  audioElem.addEventListener('play', () => {
+    // Stop all other audio elements
+    document.querySelectorAll('audio').forEach(audio => {
+      if (audio !== audioElem && !audio.paused) {
+        audio.pause();
+        audio.currentTime = 0;
+      }
+    });
+  });
+  
+  audioControls.appendChild(audioElem);
+  audioTile.appendChild(audioHeader);
+
+  let waveformCanvas = null;
+  if (peakFile) {
+    waveformCanvas = document.createElement("canvas");
+    waveformCanvas.className = "audio-waveform";
+    waveformCanvas.title = "Click to play from here";
+    waveformCanvas.addEventListener('click', (e) => {
+      const rect = waveformCanvas.getBoundingClientRect();
+      const percentage = (e.clientX - rect.left) / rect.width;
+      const seek = () => {
+        audioElem.currentTime = percentage * audioElem.duration;
+        audioElem.play();
+      };
+      if (audioElem.readyState >= 1) {
+        seek();
+      } else {
+        audioElem.addEventListener('loadedmetadata', seek, { once: true });
+        audioElem.load();
+      }
+    });
+    audioTile.appendChild(waveformCanvas);
+  }
+  audioTile.appendChild(audioControls);
+
+  // Add fullscreen button
+  const fsBtn = document.createElement('button');
+  fsBtn.className = 'fullscreen-btn';
+  fsBtn.innerHTML = '<i class="fa fa-expand"></i>';
+  fsBtn.onclick = () => showFullscreen(model);
+  audioTile.appendChild(fsBtn);
+
+  placeholder.replaceWith(audioTile);
+  signal?.addEventListener('abort', () => releaseMediaElement(audioElem), { once: true });
+  if (waveformCanvas) {
+    const width = waveformCanvas.getBoundingClientRect().width * window.devicePixelRatio;
+    const level = await readPeakLevel(peakFile, width);
+    if (level) {
+      drawWaveform(waveformCanvas, level);
+    } else {
+      waveformCanvas.remove();
     }
+  } else {
+    await loaded;
+  }
+}
+
+// Shown instead of a preview the browser cannot decode
+const NO_PYRAMID_MESSAGE = '<i class="fa fa-image"></i><br>Run image_tiles.py to preview';
+
+async function renderImageTile(context) {
+  const { model, placeholder, signal } = context;
+  if (await needsPyramid(model.file)) {
+    if (await getPyramid(model)) return renderThumbnailTile(context);
+    // An atlas thumbnail (thumbnail_atlas.py decodes TIFF) is better than nothing
+    if (!placeholder.classList.contains('atlas-thumb')) placeholder.innerHTML = NO_PYRAMID_MESSAGE;
+    return;
+  }
+  // Decode off the main thread at tile resolution; GIFs keep <img> for animation
+  if (supportsWorkerDecode() && !model.name.toLowerCase().endsWith('.gif')) {
+    return renderThumbnailTile(context);
+  }
+  const imagePreview = document.createElement("div");
+  imagePreview.className = "image-preview";
+  const imgElem = document.createElement("img");
+  const loaded = waitForElement(imgElem, 'load', signal);
+  imgElem.src = createTileObjectURL(model.file, signal);
+  imagePreview.appendChild(imgElem);
+  placeholder.replaceWith(imagePreview);
+  await loaded;
+}
+
+// Still preview at tile resolution, from the tile pyramid if
+// image_tiles.py made one, otherwise the type's thumbnail renderer
+async function renderThumbnailTile({ model, placeholder, signal }) {
+  const imagePreview = document.createElement("div");
+  imagePreview.className = "image-preview";
+  const canvas = document.createElement("canvas");
+  imagePreview.appendChild(canvas);
+  placeholder.replaceWith(imagePreview);
+  const { width, height } = canvas.getBoundingClientRect();
+  const maxSize = Math.ceil(Math.max(width, height, 1) * window.devicePixelRatio);
+  const key = getAssetKey(model);
+  const pyramid = await getPyramid(model);
+  const bitmap = pyramid
+    ? await loadPyramidPreview(pyramid, key, maxSize, signal)
+    : await getRenderers(model.type).thumbnail({ model, key, maxSize, signal });
+  drawPreview(canvas, bitmap);
+}
+
+// Load the preview for a tile with the renderer registered for its type.
+// The returned promise settles once the content is ready, so the tile
+// scheduler can hold a slot for the whole load.
+async function loadTileContent(tile, signal) {
+  const model = tile.model;
+  const placeholder = tile.querySelector('.placeholder, .atlas-thumb');
+  const endSpan = startSpan(`tile:${model.type}`, { name: model.name });
+  const { tile: renderTile = renderThumbnailTile } = getRenderers(model.type);
+
+  try {
+    await renderTile({ tile, model, placeholder, signal });
+    markFirstTile();
   } catch (error) {
+    if (error.name === 'AbortError') {
+      throw error;
+    }
     console.error(`Error loading ${model.type} content:`, error);
     placeholder.innerHTML = `<i class="fa fa-exclamation-triangle"></i><br>Error loading ${model.type}`;
+  } finally {
+    endSpan({ aborted: Boolean(signal?.aborted) });
   }
 }
 
 function renderPage(pageIndex) {
+  const endSpan = startSpan('render-page', { page: pageIndex });
+  memoryCheckpoint(`before page ${pageIndex + 1}`);
+  // Abort loads for tiles on the page being replaced
+  tileScheduler.cancelAll();
+  disposeTileViewers();
   viewerContainer.innerHTML = "";
   const startIndex = pageIndex * getItemsPerPage();
   const pageItems = filteredModelFiles.slice(startIndex, startIndex + getItemsPerPage());
   const selectedFiles = getSelectedFiles();
+  // Tiles with a cell in the page's thumbnail atlases skip per-file loading
+  const atlasCells = getPageAtlasCells(pageItems, getCurrentSort().field);
   
   pageItems.forEach(model => {
     const tile = document.createElement("div");
@@ -382,7 +919,7 @@ function renderPage(pageIndex) {
     tile.appendChild(selectionIndicator);
 
     tile.addEventListener('click', (e) => {
-      if (e.target.closest('.fullscreen-btn') || e.target.closest('.scrub-bar-container')) {
+      if (e.target.closest('.fullscreen-btn') || e.target.closest('.similar-btn') || e.target.closest('.scrub-bar-container')) {
         return;
       }
       if (e.target.closest('.selection-indicator')) {
@@ -396,7 +933,27 @@ function renderPage(pageIndex) {
     fsBtn.onclick = () => showFullscreen(model);
     tile.appendChild(fsBtn);
 
-    tile.appendChild(createPlaceholder(model.type));
+    // Offer "show similar" for assets duplicates.py has hashed or grouped
+    const doc = searchDocs.get(model);
+    if (doc?.phash || doc?.group) {
+      const similarBtn = document.createElement('button');
+      similarBtn.className = 'similar-btn';
+      similarBtn.title = 'Show similar';
+      similarBtn.innerHTML = '<i class="fa fa-clone"></i>';
+      similarBtn.onclick = () => setSearchTerm(similarQuery(doc));
+      tile.appendChild(similarBtn);
+    }
+    const duplicates = duplicateCounts.get(model);
+    if (duplicates > 1) {
+      const badge = document.createElement('div');
+      badge.className = 'duplicate-badge';
+      badge.textContent = `×${duplicates}`;
+      badge.title = `${duplicates} copies`;
+      tile.appendChild(badge);
+    }
+
+    const atlasCell = atlasCells?.get(model);
+    tile.appendChild(atlasCell ? createAtlasThumb(atlasCell) : createPlaceholder(model.type));
     tile.model = model;
 
     const nameDiv = document.createElement("div");
@@ -413,12 +970,286 @@ function renderPage(pageIndex) {
     tile.appendChild(fileInfo);
 
     viewerContainer.appendChild(tile);
-    tileObserver.observe(tile);
+    if (!atlasCell) {
+      tileObserver.observe(tile);
+    } else if (model.type === "video") {
+      // Frames for hover-scrubbing are only extracted once the tile is hovered
+      tile.addEventListener('mouseenter', () => {
+        tileScheduler.enqueue(tile, model.type, (signal) => loadTileContent(tile, signal));
+      }, { once: true });
+    }
   });
   
   updatePagination(Math.ceil(filteredModelFiles.length / getItemsPerPage()));
+  // Atlas thumbnails are shown without a tile load
+  if (atlasCells?.size) markFirstTile();
+  endSpan({ tiles: pageItems.length });
 }
 
+// Load model-viewer once, pointing it at the vendored decoders for
+// compressed GLBs (Draco, meshopt, KTX2) instead of their CDN defaults
+let modelViewerReady = null;
+
+function loadModelViewer() {
+  if (!modelViewerReady) {
+    if (!customElements.get('model-viewer')) {
+      const script = document.createElement('script');
+      script.type = 'module';
+      script.src = MODEL_VIEWER_URL;
+      document.head.appendChild(script);
+    }
+    modelViewerReady = customElements.whenDefined('model-viewer').then(ModelViewerElement => {
+      const vendorURL = (path) => new URL(`vendor/${path}`, document.baseURI).href;
+      ModelViewerElement.dracoDecoderLocation = vendorURL('draco/');
+      ModelViewerElement.ktx2TranscoderLocation = vendorURL('basis/');
+      ModelViewerElement.meshoptDecoderLocation = vendorURL('meshopt_decoder.module.js');
+    });
+  }
+  return modelViewerReady;
+}
+
+// One renderer serves every fullscreen FBX preview. Creating a WebGL
+// context per preview leaks GPU memory when browsing through many models.
+let fullscreenFbxViewer = null;
+
+async function getFullscreenFbxViewer(container) {
+  const { FBXViewer } = await loadFbxModules();
+  if (!fullscreenFbxViewer) {
+    fullscreenFbxViewer = new FBXViewer(container);
+    activeFbxViewers.add(fullscreenFbxViewer);
+  } else {
+    fullscreenFbxViewer.attach(container);
+    fullscreenFbxViewer.start();
+  }
+  return fullscreenFbxViewer;
+}
+
+// Show the coarsest level first and swap in each finer one once the one
+// before it has loaded. If a level fails to load, `onFailure` is called
+// with the file that failed.
+function loadLodChain(mv, files, onFailure) {
+  let level = 0;
+  let url = URL.createObjectURL(files[0]);
+  const showFile = (file) => {
+    URL.revokeObjectURL(url);
+    url = URL.createObjectURL(file);
+    mv.src = url;
+  };
+  const stop = () => {
+    mv.removeEventListener('load', onLoad);
+    mv.removeEventListener('error', onError);
+  };
+  const onLoad = () => {
+    if (level < files.length - 1 && mv.isConnected) {
+      level++;
+      showFile(files[level]);
+    } else {
+      stop();
+    }
+  };
+  const onError = () => {
+    stop();
+    onFailure(files[level]);
+  };
+  mv.addEventListener('load', onLoad);
+  mv.addEventListener('error', onError);
+  mv.src = url;
+}
+
+// Fullscreen renderers, registered per type below. Each fills the viewer
+// and resolves to the state exitFullscreen() needs.
+
+// If a file fails to load, the original is shown instead: with `fallback`
+// (a fullscreen renderer) when it is not a GLB, in place otherwise.
+function showModelViewerFullscreen(context, files, fallback = null) {
+  const { model, viewer } = context;
+  const mv = document.createElement("model-viewer");
+  let closed = false;
+  let fallbackState = null;
+  const state = {
+    cleanup: () => {
+      closed = true;
+      fallbackState?.cleanup?.();
+    },
+    fileName: model.name
+  };
+  loadLodChain(mv, files, failed => {
+    if (closed || !mv.isConnected) return;
+    if (!fallback) {
+      if (failed !== model.file) loadLodChain(mv, [model.file], () => {});
+      return;
+    }
+    mv.remove();
+    Promise.resolve(fallback(context)).then(shown => {
+      fallbackState = shown;
+      if (closed) shown?.cleanup?.();
+    }).catch(error => console.error(`Error loading fullscreen ${model.type}:`, error));
+  });
+  mv.setAttribute("camera-controls", "");
+  mv.setAttribute("auto-rotate", "");
+  mv.setAttribute("environment-image", "neutral");
+  mv.setAttribute("animation-name", "*");
+  mv.style.width = "100%";
+  mv.style.height = "100%";
+  viewer.appendChild(mv);
+  viewer.style.display = 'block';
+  return state;
+}
+
+async function showGlbFullscreen(context) {
+  const { model } = context;
+  await loadModelViewer();
+  // The compressed copy has full detail, so it replaces the original
+  const full = await getCompressedGLB(model) || model.file;
+  return showModelViewerFullscreen(context, [...await getLodFiles(model), full]);
+}
+
+// FBX, OBJ and USDZ models, shown with three.js
+async function showThreeFullscreen({ model, viewer: fullscreenViewer }) {
+  const container = document.createElement('div');
+  container.style.width = '100%';
+  container.style.height = '100%';
+  container.className = 'three-viewer';
+  fullscreenViewer.appendChild(container);
+  fullscreenViewer.style.display = 'block';
+  
+  const viewer = await getFullscreenFbxViewer(container);
+  let closed = false;
+  const state = {
+    cleanup: () => {
+      closed = true;
+      // Free the model right away; the renderer is kept for the next one
+      viewer.clear();
+      viewer.stop();
+    },
+    fileName: model.name
+  };
+
+  // The model loads after the state is returned, so closing works meanwhile
+  getCatalogEntry(model).then(entry => {
+    // Closed or moved on to another asset meanwhile
+    if (closed) return;
+    return viewer.showModel(acquireThreeModel(model, entry), null, entry?.model?.bounds);
+  }).catch(error => {
+    if (error?.name !== 'AbortError') console.error(`Error loading fullscreen ${model.type}:`, error);
+  });
+  return state;
+}
+
+async function showFbxFullscreen(context) {
+  const converted = await getConvertedGLB(context.model);
+  if (!converted) return showThreeFullscreen(context);
+  await loadModelViewer();
+  return showModelViewerFullscreen(context, [converted], showThreeFullscreen);
+}
+
+function showVideoFullscreen({ model, viewer, video }) {
+  viewer.style.display = 'none';
+  video.style.display = 'block';
+  video.src = URL.createObjectURL(model.file);
+  video.play();
+  return {
+    type: 'video',
+    fileName: model.name
+  };
+}
+
+// Pan and zoom through the tile pyramid of a large image, or null if it has none
+async function showTiledFullscreen({ model, viewer }) {
+  const pyramid = await getPyramid(model);
+  if (!pyramid) return null;
+  viewer.style.display = 'block';
+  const tiled = new TiledImageViewer(viewer, pyramid);
+  return { fileName: model.name, cleanup: () => tiled.dispose() };
+}
+
+async function showImageFullscreen({ model, viewer }) {
+  const tiled = await showTiledFullscreen({ model, viewer });
+  if (tiled) return tiled;
+  viewer.style.display = 'block';
+  if (await needsPyramid(model.file)) {
+    const message = document.createElement("div");
+    message.className = "placeholder";
+    message.innerHTML = NO_PYRAMID_MESSAGE;
+    message.style.width = "100%";
+    message.style.height = "100%";
+    viewer.appendChild(message);
+    return { fileName: model.name };
+  }
+  const img = document.createElement("img");
+  img.src = URL.createObjectURL(model.file);
+  img.style.width = "100%";
+  img.style.height = "100%";
+  img.style.objectFit = "contain";
+  viewer.appendChild(img);
+  return { ...img, fileName: model.name };
+}
+
+function showAudioFullscreen({ model, viewer }) {
+  viewer.style.display = 'block';
+  
+  const audioContainer = document.createElement("div");
+  audioContainer.className = "fullscreen-audio";
+  
+  const audioHeader = document.createElement("div");
+  audioHeader.className = "fullscreen-audio-header";
+  const ext = model.name.split('.').pop().toUpperCase();
+  audioHeader.innerHTML = '<i class="fa fa-music"></i> ' + ext;
+  
+  const audioControls = document.createElement("div");
+  audioControls.className = "fullscreen-audio-controls";
+  const audioElem = document.createElement("audio");
+  audioElem.src = URL.createObjectURL(model.file);
+  audioElem.controls = true;
+  audioElem.style.width = "100%";
+  
+  audioControls.appendChild(audioElem);
+  audioContainer.appendChild(audioHeader);
+  audioContainer.appendChild(audioControls);
+  viewer.appendChild(audioContainer);
+  
+  return {
+    type: 'audio',
+    element: audioElem,
+    fileName: model.name,
+    cleanup: () => {
+      audioElem.pause();
+      audioElem.currentTime = 0;
+    }
+  };
+}
+
+// Still preview at screen resolution, from the type's thumbnail renderer
+async function showThumbnailFullscreen({ model, viewer }) {
+  const tiled = await showTiledFullscreen({ model, viewer });
+  if (tiled) return tiled;
+  viewer.style.display = 'block';
+  const canvas = document.createElement("canvas");
+  canvas.style.width = "100%";
+  canvas.style.height = "100%";
+  canvas.style.objectFit = "contain";
+  viewer.appendChild(canvas);
+  const { width, height } = viewer.getBoundingClientRect();
+  const maxSize = Math.ceil(Math.max(width, height, 1) * window.devicePixelRatio);
+  const state = { fileName: model.name };
+  getRenderers(model.type).thumbnail({ model, key: getAssetKey(model), maxSize })
+    .then(bitmap => drawPreview(canvas, bitmap))
+    .catch(error => console.error(`Error loading fullscreen ${model.type}:`, error));
+  return state;
+}
+
+registerRenderers('glb', { tile: renderGlbTile, fullscreen: showGlbFullscreen });
+registerRenderers('fbx', { tile: renderFbxTile, fullscreen: showFbxFullscreen });
+registerRenderers('obj', { tile: renderThreeTile, fullscreen: showThreeFullscreen });
+registerRenderers('usdz', { tile: renderThreeTile, fullscreen: showThreeFullscreen });
+registerRenderers('video', { tile: renderVideoTile, fullscreen: showVideoFullscreen });
+registerRenderers('audio', { tile: renderAudioTile, fullscreen: showAudioFullscreen });
+registerRenderers('image', {
+  tile: renderImageTile,
+  thumbnail: ({ model, key, maxSize, signal }) => loadImagePreview(key, model.file, maxSize, signal),
+  fullscreen: showImageFullscreen
+});
+
 async function showFullscreen(model) {
   const fullscreenOverlay = document.getElementById('fullscreenOverlay');
   const fullscreenViewer = document.getElementById('fullscreenViewer');
@@ -437,107 +1268,9 @@ async function showFullscreen(model) {
   fullscreenOverlay.style.opacity = '1';
   fullscreenViewer.innerHTML = '';
   fullscreenVideo.style.display = 'none';
-  
-  if (model.type === "glb") {
-    if (!customElements.get('model-viewer')) {
-      const script = document.createElement('script');
-      script.type = 'module';
-      script.src = 'https://unpkg.com/@google/model-viewer/dist/model-viewer.min.js';
-      document.head.appendChild(script);
-      await new Promise(resolve => script.onload = resolve);
-    }
-    
-    const mv = document.createElement("model-viewer");
-    mv.src = URL.createObjectURL(model.file);
-    mv.setAttribute("camera-controls", "");
-    mv.setAttribute("auto-rotate", "");
-    mv.setAttribute("environment-image", "neutral");
-    mv.setAttribute("animation-name", "*");
-    mv.style.width = "100%";
-    mv.style.height = "100%";
-    fullscreenViewer.appendChild(mv);
-    fullscreenViewer.style.display = 'block';
-    currentFullscreenViewer = { ...mv, fileName: model.name };
-    
-  } else if (model.type === "fbx") {
-    const container = document.createElement('div');
-    container.style.width = '100%';
-    container.style.height = '100%';
-    container.className = 'three-viewer';
-    fullscreenViewer.appendChild(container);
-    fullscreenViewer.style.display = 'block';
-    
-    const viewer = new FBXViewer(container);
-    activeFbxViewers.add(viewer);
-    viewer.loadModel(URL.createObjectURL(model.file));
-    
-    currentFullscreenViewer = {
-      cleanup: () => {
-        activeFbxViewers.delete(viewer);
-      },
-      fileName: model.name
-    };
-    
-  } else if (model.type === "video") {
-    fullscreenViewer.style.display = 'none';
-    fullscreenVideo.style.display = 'block';
-    fullscreenVideo.src = URL.createObjectURL(model.file);
-    fullscreenVideo.play();
-    // Store reference to preview video for cleanup
-    const previewVideo = viewerContainer.querySelector(`[data-model-name="${model.name}"] video`);
-    currentFullscreenViewer = {
-      type: 'video',
-      previewVideo: previewVideo,
-      fileName: model.name
-    };
-    
-  } else if (model.type === "image") {
-    fullscreenViewer.style.display = 'block';
-    fullscreenVideo.style.display = 'none';
-    const img = document.createElement("img");
-    img.src = URL.createObjectURL(model.file);
-    img.style.width = "100%";
-    img.style.height = "100%";
-    img.style.objectFit = "contain";
-    fullscreenViewer.innerHTML = "";
-    fullscreenViewer.appendChild(img);
-    currentFullscreenViewer = { ...img, fileName: model.name };
-  } else if (model.type === "audio") {
-    fullscreenViewer.style.display = 'block';
-    fullscreenVideo.style.display = 'none';
-    
-    const audioContainer = document.createElement("div");
-    audioContainer.className = "fullscreen-audio";
-    
-    const audioHeader = document.createElement("div");
-    audioHeader.className = "fullscreen-audio-header";
-    const ext = model.name.split('.').pop().toUpperCase();
-    audioHeader.innerHTML = '<i class="fa fa-music"></i> ' + ext;
-    
-    const audioControls = document.createElement("div");
-    audioControls.className = "fullscreen-audio-controls";
-    const audioElem = document.createElement("audio");
-    audioElem.src = URL.createObjectURL(model.file);
-    audioElem.controls = true;
-    audioElem.style.width = "100%";
-    
-    audioControls.appendChild(audioElem);
-    audioContainer.appendChild(audioHeader);
-    audioContainer.appendChild(audioControls);
-    
-    fullscreenViewer.innerHTML = "";
-    fullscreenViewer.appendChild(audioContainer);
-    
-    currentFullscreenViewer = {
-      type: 'audio',
-      element: audioElem,
-      fileName: model.name,
-      cleanup: () => {
-        audioElem.pause();
-        audioElem.currentTime = 0;
-      }
-    };
-  }
+
+  const { fullscreen = showThumbnailFullscreen } = getRenderers(model.type);
+  currentFullscreenViewer = await fullscreen({ model, viewer: fullscreenViewer, video: fullscreenVideo });
 }
 
 let isDirectoryPickerActive = false;
@@ -723,64 +1456,46 @@ async function handleDrop(e) {
   viewerContainer.classList.remove('drag-over');
 
   console.log("Drop event triggered");
+  firstTileStart = performance.now();
 
   try {
-    const droppedFiles = e.dataTransfer.files;
+    const droppedFiles = [...e.dataTransfer.files];
     console.log("Number of dropped files:", droppedFiles.length);
 
-    // Clear existing files
-    modelFiles = [];
-    viewerContainer.innerHTML = "";
-
-    // Process each dropped file
-    for (const file of droppedFiles) {
+    // Dropped files are few, so misnamed ones are always sniffed
+    const types = await Promise.all(droppedFiles.map(file => detectType(file, true)));
+    const dropped = [];
+    droppedFiles.forEach((file, i) => {
       console.log("Processing file:", file.name, "size:", file.size, "type:", file.type);
-
-      const lowerCaseName = file.name.toLowerCase();
-      let type = null;
-
-      // Determine file type
-      if (lowerCaseName.endsWith(".glb")) type = "glb";
-      else if (lowerCaseName.endsWith(".fbx")) type = "fbx";
-      else if (lowerCaseName.endsWith(".mp4") || lowerCaseName.endsWith(".webm") || lowerCaseName.endsWith(".ogg")) type = "video";
-      else if (lowerCaseName.endsWith(".mp3") || lowerCaseName.endsWith(".wav")) type = "audio";
-      else if (lowerCaseName.endsWith(".jpg") || lowerCaseName.endsWith(".jpeg") || lowerCaseName.endsWith(".png") || lowerCaseName.endsWith(".gif")) type = "image";
-
-      if (type) {
-        console.log("Adding file:", file.name, "as type:", type);
-        modelFiles.push({ name: file.name, file, type });
+      if (types[i]) {
+        console.log("Adding file:", file.name, "as type:", types[i]);
+        dropped.push({ name: file.name, file, type: types[i], root: DROPPED_ROOT });
       }
-    }
+    });
 
-    console.log("Total files added:", modelFiles.length);
+    console.log("Total files added:", dropped.length);
 
-    if (modelFiles.length > 0) {
-      // Sort and display files
-      modelFiles.sort((a, b) => a.name.localeCompare(b.name));
-      updateFilteredModelFiles();
-      setCurrentPage(0);
-      updatePagination(Math.ceil(filteredModelFiles.length / getItemsPerPage()));
-      renderPage(getCurrentPage());
+    if (dropped.length > 0) {
+      // Dropped files replace the previous drop as a root of their own,
+      // shown alone; the folder roots stay loaded
+      viewerContainer.innerHTML = "";
+      setDetachedRoot(DROPPED_ROOT, dropped);
+      showOnlyRoot(DROPPED_ROOT);
+      await rebuildLibrary();
       console.log("View updated with new files");
     } else {
       console.log("No supported files found in drop");
-      alert("No supported files found. Please drop GLB, FBX, video, audio, or image files.");
+      firstTileStart = null;
+      alert("No supported files found. Please drop GLB, FBX, OBJ, USDZ, video, audio, image, EXR or HDR files.");
     }
 
   } catch (error) {
+    firstTileStart = null;
     console.error("Error processing dropped files:", error);
     alert(`Error processing files: ${error.message}`);
   }
 }
 
-// Add event listener to stop all preview videos when returning to grid
-document.getElementById('returnButton').addEventListener('click', () => {
-  document.querySelectorAll('.preview-video').forEach(video => {
-    video.pause();
-    video.currentTime = 0;
-  });
-});
-
 // Add drag and drop event listeners
 viewerContainer.addEventListener('dragenter', handleDragOver);
 viewerContainer.addEventListener('dragover', handleDragOver);
@@ -788,7 +1503,6 @@ viewerContainer.addEventListener('dragleave', handleDragLeave);
 viewerContainer.addEventListener('drop', handleDrop);
 
 export {
-  getFilesFromDirectory,
   handleFolderPick,
   loadTileContent,
   renderPage,
@@ -810,6 +1524,7 @@ export {
   lastDirectoryHandle,
   currentFullscreenViewer,
   tileObserver,
+  tileScheduler,
   observerOptions,
   folderPickerButton,
   viewerContainer,
@@ -0,0 +1,379 @@
+"""
+HTTP server for an asset library.
+
+Serves the viewer files plus a small API over the library catalog:
+
+    GET /api/catalog                      the catalog.json of the library
+    GET /api/search?q=...&offset=&limit=  search results and facets
+    GET /library/<path>                   asset files (supports Range requests)
+    GET /metrics                          Prometheus metrics (see service_metrics.py)
+
+Only the files of the viewer bundle (see create_zip.py) and the vendored
+decoders are served from the viewer folder; the rest of the checkout is not.
+
+The search index is rebuilt whenever catalog.json changes on disk, so the
+other tools can keep updating the catalog while the server runs.
+
+Given a roots file (see library_roots.py) instead of a library root, the
+server merges the catalogs of all roots and library paths start with the
+root name: /library/<root>/<path>.
+
+Usage:
+    python asset_server.py LIBRARY_ROOT|ROOTS_FILE [--port 3003] [--host 127.0.0.1] [--trace MS]
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from asset_catalog import CATALOG_FILE_NAME, cache_root, load_catalog
+from create_zip import ENTRY_FILE, bundle_sources
+from library_roots import catalog_path, is_roots_file, load_merged_catalog, load_roots, resolve_asset
+from search_index import SearchIndex
+from service_metrics import (
+    CACHE_REQUESTS, CONTENT_TYPE, REGISTRY, STAGE_SECONDS, Counter, Gauge, Histogram, set_trace_threshold, trace,
+)
+from vendor import VENDOR_DIR_NAME, VENDOR_FILES
+
+VIEWER_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 3003
+DEFAULT_SEARCH_LIMIT = 100
+MAX_SEARCH_LIMIT = 1000
+COPY_CHUNK_SIZE = 1024 * 1024
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+HTTP_REQUESTS = Counter("dav_http_requests_total", "HTTP requests handled, by route and status", ("route", "status"))
+HTTP_REQUEST_SECONDS = Histogram("dav_http_request_seconds", "Time to handle an HTTP request", ("route",))
+HTTP_SENT_BYTES = Counter("dav_http_sent_bytes_total", "Bytes written to clients, headers included", ("route",))
+HTTP_RANGE_REQUESTS = Counter("dav_http_range_requests_total", "Library file requests with a Range header")
+HTTP_ACTIVE_CONNECTIONS = Gauge("dav_http_active_connections", "Open client connections")
+
+
+class LibraryState:
+    """
+    Holds the catalog and search index of a library, reloading both when
+    catalog.json is modified. `path` is a library root or a roots file; with
+    a roots file, `roots` lists the roots and the catalog is merged from the
+    catalog of each.
+    """
+
+    def __init__(self, path):
+        if is_roots_file(path):
+            self.roots = load_roots(path)
+            self.root = None
+            self.catalog_paths = [catalog_path(root) for root in self.roots]
+        else:
+            self.roots = None
+            self.root = os.path.abspath(path)
+            self.catalog_paths = [os.path.join(cache_root(self.root), CATALOG_FILE_NAME)]
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.catalog = None
+        self.index = None
+
+    def current(self):
+        """
+        Returns (catalog, index), rebuilding them if the catalog changed.
+        """
+        mtime = tuple(modification_time(path) for path in self.catalog_paths)
+        with self.lock:
+            if self.index is None or mtime != self.mtime:
+                CACHE_REQUESTS.inc(cache="search_index", result="miss")
+                start = time.perf_counter()
+                self.catalog = load_merged_catalog(self.roots) if self.roots else load_catalog(self.root)
+                self.index = SearchIndex(self.catalog)
+                self.mtime = mtime
+                elapsed = time.perf_counter() - start
+                STAGE_SECONDS.observe(elapsed, stage="search_index")
+                print(f"Indexed {len(self.index.paths)} assets in {elapsed:.2f}s")
+            else:
+                CACHE_REQUESTS.inc(cache="search_index", result="hit")
+            return self.catalog, self.index
+
+    def library_dir(self, rel_path):
+        """
+        Returns (library folder, path inside it) for a /library/ path, or
+        (None, None) if it names no configured root.
+        """
+        if not self.roots:
+            return self.root, rel_path
+        root, rel_path = resolve_asset(self.roots, rel_path)
+        return (root["path"], rel_path) if root else (None, None)
+
+    def describe(self):
+        if not self.roots:
+            return f"'{self.root}'"
+        return f"{len(self.roots)} roots ({', '.join(root['name'] for root in self.roots)})"
+
+
+def modification_time(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def parse_byte_range(header, size):
+    """
+    Parses a single-range Range header into an inclusive (start, end) pair.
+
+    Returns None if the header is missing or not a single byte range, and
+    raises ValueError if the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+class CountingWriter:
+    """
+    Wraps a connection's output stream, counting the bytes written.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def viewer_files():
+    """
+    Returns the paths, relative to the viewer folder, that may be served:
+    the files the viewer loads and the vendored decoders.
+    """
+    files = set(bundle_sources())
+    files.update(f"{VENDOR_DIR_NAME}/{path}" for path in VENDOR_FILES)
+    return files
+
+
+def request_route(path):
+    path = urlsplit(path).path
+    if path.startswith("/api/"):
+        return path[len("/api/"):]
+    if path.startswith("/library/"):
+        return "library"
+    if path == "/metrics":
+        return "metrics"
+    return "static"
+
+
+def make_handler(state):
+    static_files = viewer_files()
+
+    class AssetRequestHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=VIEWER_DIR, **kwargs)
+
+        def setup(self):
+            super().setup()
+            self.wfile = CountingWriter(self.wfile)
+            HTTP_ACTIVE_CONNECTIONS.inc()
+
+        def finish(self):
+            try:
+                super().finish()
+            finally:
+                HTTP_ACTIVE_CONNECTIONS.dec()
+
+        def handle_one_request(self):
+            self.command = None
+            self.status = None
+            # Timings of the filesystem calls, for tracing slow mounts
+            self.trace_fields = {}
+            self.wfile.count = 0
+            start = time.perf_counter()
+            super().handle_one_request()
+            if not self.command:
+                return
+            elapsed = time.perf_counter() - start
+            route = request_route(self.path)
+            HTTP_REQUESTS.inc(route=route, status=str(self.status))
+            HTTP_REQUEST_SECONDS.observe(elapsed, route=route)
+            HTTP_SENT_BYTES.inc(self.wfile.count, route=route)
+            trace(
+                "http_request", elapsed, method=self.command, path=self.path, status=self.status,
+                bytes=self.wfile.count, **self.trace_fields,
+            )
+
+        def send_response(self, code, message=None):
+            self.status = int(code)
+            super().send_response(code, message)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/api/catalog":
+                self.send_catalog()
+            elif url.path == "/api/search":
+                self.send_search(parse_qs(url.query))
+            elif url.path.startswith("/library/"):
+                self.send_library_file(unquote(url.path[len("/library/"):]))
+            elif url.path == "/metrics":
+                self.send_metrics()
+            elif self.select_static_file(url.path):
+                super().do_GET()
+
+        def do_HEAD(self):
+            if self.select_static_file(urlsplit(self.path).path):
+                super().do_HEAD()
+
+        def select_static_file(self, url_path):
+            """
+            Points the request at a viewer file, or sends a 404 and returns
+            False if the path is not one.
+            """
+            path = ENTRY_FILE if url_path == "/" else unquote(url_path).lstrip("/")
+            if path not in static_files:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return False
+            self.path = "/" + path
+            return True
+
+        def send_json(self, data, status=HTTPStatus.OK):
+            body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_metrics(self):
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_catalog(self):
+            catalog, _ = state.current()
+            self.send_json(catalog)
+
+        def send_search(self, params):
+            try:
+                offset = max(0, int(params.get("offset", ["0"])[0]))
+                limit = min(MAX_SEARCH_LIMIT, max(0, int(params.get("limit", [str(DEFAULT_SEARCH_LIMIT)])[0])))
+            except ValueError:
+                self.send_json({"error": "offset and limit must be integers"}, HTTPStatus.BAD_REQUEST)
+                return
+            _, index = state.current()
+            start = time.perf_counter()
+            result = index.search(params.get("q", [""])[0])
+            ids = result["ids"]
+            self.send_json({
+                "total": len(ids),
+                "offset": offset,
+                "results": [index.entries[doc_id] for doc_id in ids[offset:offset + limit]],
+                "facets": result["facets"],
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+
+        def send_library_file(self, rel_path):
+            library_dir, rel_path = state.library_dir(rel_path)
+            if library_dir is None:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            # Refuse anything that resolves outside the library root
+            path = os.path.realpath(os.path.join(library_dir, *rel_path.split("/")))
+            if os.path.commonpath([path, os.path.realpath(library_dir)]) != os.path.realpath(library_dir):
+                self.send_error(HTTPStatus.FORBIDDEN)
+                return
+            start = time.perf_counter()
+            try:
+                f = open(path, "rb")
+            except OSError:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            with f:
+                stat_result = os.fstat(f.fileno())
+                self.trace_fields["open_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                size = stat_result.st_size
+                if "Range" in self.headers:
+                    HTTP_RANGE_REQUESTS.inc()
+                try:
+                    byte_range = parse_byte_range(self.headers.get("Range"), size)
+                except ValueError:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                start, end = byte_range if byte_range else (0, size - 1)
+                length = max(0, end - start + 1)
+                self.send_response(HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK)
+                self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+                self.send_header("Content-Length", str(length))
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Last-Modified", self.date_time_string(stat_result.st_mtime))
+                if byte_range:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.end_headers()
+
+                f.seek(start)
+                remaining = length
+                read_seconds = 0.0
+                while remaining > 0:
+                    read_start = time.perf_counter()
+                    chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+                    read_seconds += time.perf_counter() - read_start
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+                self.trace_fields["read_ms"] = round(read_seconds * 1000, 3)
+
+    return AssetRequestHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the viewer and an asset library over HTTP.")
+    parser.add_argument("root", help="Library root folder, or a roots file (see library_roots.py)")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--trace", type=float, metavar="MS",
+                        help="Log requests slower than MS milliseconds as JSON lines on stderr")
+    args = parser.parse_args()
+
+    if args.trace is not None:
+        set_trace_threshold(args.trace)
+
+    state = LibraryState(args.root)
+    state.current()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Serving {state.describe()} at http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+// asset_types.js
+// The asset types the viewer knows, in one table: their extensions, the
+// magic bytes that identify files with a missing or unknown extension, and
+// the renderers that show them. Keep the extensions and signatures in sync
+// with asset_catalog.py. Renderers are registered by the modules that
+// implement them, so a new type needs a table row and a renderer, but no
+// change to the tile or fullscreen code. Also imported by scan_worker.js,
+// so nothing here may touch the DOM.
+
+// A signature is a list of [offset, bytes] that must all match, with bytes
+// as a string of char codes 0-255. OBJ (text) and USDZ (a plain zip) have
+// none, so misnamed files of those types are not recognized.
+export const ASSET_TYPES = {
+  glb: {
+    extensions: ['glb'],
+    signatures: [[[0, 'glTF']]]
+  },
+  fbx: {
+    extensions: ['fbx'],
+    signatures: [[[0, 'Kaydara FBX Binary']]]
+  },
+  obj: {
+    extensions: ['obj'],
+    signatures: []
+  },
+  usdz: {
+    extensions: ['usdz'],
+    signatures: []
+  },
+  video: {
+    extensions: ['mp4', 'webm', 'ogg'],
+    signatures: [
+      [[4, 'ftypiso']], [[4, 'ftypmp4']], [[4, 'ftypM4V']], [[4, 'ftypavc1']],
+      [[0, '\x1a\x45\xdf\xa3']], [[0, 'OggS']]
+    ]
+  },
+  audio: {
+    extensions: ['mp3', 'wav', 'flac'],
+    signatures: [
+      [[0, 'ID3']], [[0, '\xff\xfb']], [[0, '\xff\xf3']], [[0, '\xff\xf2']],
+      [[0, 'RIFF'], [8, 'WAVE']], [[0, 'fLaC']]
+    ]
+  },
+  image: {
+    // Browsers other than Safari only show TIFFs through their tile pyramid
+    extensions: ['jpg', 'jpeg', 'png', 'gif', 'webp', 'tif', 'tiff'],
+    signatures: [
+      [[0, '\xff\xd8\xff']], [[0, '\x89PNG\r\n\x1a\n']], [[0, 'GIF8']],
+      [[0, 'RIFF'], [8, 'WEBP']], [[0, 'II*\x00']], [[0, 'MM\x00*']]
+    ]
+  },
+  // High dynamic range images: OpenEXR and Radiance RGBE
+  hdr: {
+    extensions: ['exr', 'hdr'],
+    signatures: [[[0, '\x76\x2f\x31\x01']], [[0, '#?RADIANCE']], [[0, '#?RGBE']]]
+  }
+};
+
+const EXTENSION_TYPES = new Map(
+  Object.entries(ASSET_TYPES).flatMap(([type, { extensions }]) => extensions.map(ext => [ext, type]))
+);
+
+export const SUPPORTED_EXTENSIONS = [...EXTENSION_TYPES.keys()];
+
+// Bytes read from the start of a file to sniff its type
+const SNIFF_BYTES = Math.max(...Object.values(ASSET_TYPES).flatMap(({ signatures }) =>
+  signatures.flat().map(([offset, magic]) => offset + magic.length)));
+
+// The type of a file name by its extension, or null
+export function typeFromName(name) {
+  const dot = name.lastIndexOf('.');
+  return dot < 0 ? null : EXTENSION_TYPES.get(name.slice(dot + 1).toLowerCase()) || null;
+}
+
+// The type whose signature the first bytes of a file match, or null
+export function typeFromBytes(bytes) {
+  const matches = ([offset, magic]) => {
+    if (offset + magic.length > bytes.length) return false;
+    for (let i = 0; i < magic.length; i++) {
+      if (bytes[offset + i] !== magic.charCodeAt(i)) return false;
+    }
+    return true;
+  };
+  for (const [type, { signatures }] of Object.entries(ASSET_TYPES)) {
+    if (signatures.some(signature => signature.every(matches))) return type;
+  }
+  return null;
+}
+
+// Read the start of a file (a File or Blob) and sniff its type
+export async function sniffType(file) {
+  try {
+    return typeFromBytes(new Uint8Array(await file.slice(0, SNIFF_BYTES).arrayBuffer()));
+  } catch (error) {
+    // Unreadable, e.g. removed since it was listed
+    return null;
+  }
+}
+
+// The type of a file by its extension, falling back to its content if
+// `sniff` is set and the extension is missing or unknown
+export async function detectType(file, sniff = false) {
+  return typeFromName(file.name) || (sniff ? await sniffType(file) : null);
+}
+
+// Renderers per type, all optional:
+//   tile({ tile, model, placeholder, signal }) replaces the tile's
+//     placeholder and resolves once the preview is shown
+//   thumbnail({ model, key, maxSize, signal }) resolves to an ImageBitmap
+//     at most maxSize pixels on its longest side, `key` identifying the
+//     file for caches; shown in a canvas for types without a tile or
+//     fullscreen renderer
+//   fullscreen({ model, viewer, video }) fills the fullscreen viewer and
+//     resolves to { fileName, type?, cleanup? } for exitFullscreen()
+const renderers = new Map();
+
+export function registerRenderers(type, typeRenderers) {
+  if (!ASSET_TYPES[type]) throw new Error(`Unknown asset type '${type}'`);
+  renderers.set(type, { ...renderers.get(type), ...typeRenderers });
+}
+
+export function getRenderers(type) {
+  return renderers.get(type) || {};
+}
@@ -0,0 +1,105 @@
+// atlas.js
+// Grid render mode backed by the thumbnail atlases of thumbnail_atlas.py.
+// Tiles show their cell of a shared atlas image through CSS background
+// offsets, so a page costs one or two file reads and decodes instead of one
+// per asset.
+import { getCacheFile, loadAtlasManifest } from './library_cache.js';
+
+// Beyond this a filtered page is cheaper to load tile by tile
+export const MAX_PAGE_ATLASES = 3;
+const MAX_CACHED_ATLASES = 8;
+
+// Root name -> atlas manifest
+const manifests = new Map();
+// "<root>/<atlas file>" -> Promise of an object URL, in least recently used order
+const atlasURLs = new Map();
+
+function revokeAtlasURL(url) {
+  url.then(value => value && URL.revokeObjectURL(value));
+}
+
+// Drop the manifest and atlas images of a root
+export function forgetAtlases(root) {
+  manifests.delete(root);
+  for (const [key, url] of atlasURLs) {
+    if (key.startsWith(`${root}/`)) {
+      atlasURLs.delete(key);
+      revokeAtlasURL(url);
+    }
+  }
+}
+
+// Load the manifest of a library root. Call after the root is (re)scanned.
+export async function prepareAtlases(root) {
+  forgetAtlases(root);
+  const manifest = await loadAtlasManifest(root);
+  if (manifest) manifests.set(root, manifest);
+  return manifest !== null;
+}
+
+// Cell of an asset in the atlases of its root for a sort field, or null if
+// it has none or the asset changed since the atlas was packed
+function getAtlasCell(model, sortField) {
+  const manifest = manifests.get(model.root);
+  const cell = manifest?.orders?.[sortField]?.[model.relativePath];
+  const version = manifest?.assets?.[model.relativePath];
+  if (!cell || !version || version[0] !== model.file.size) return null;
+  // The manifest stores mtime in seconds; allow for filesystem rounding
+  if (Math.abs(version[1] * 1000 - model.file.lastModified) > 2000) return null;
+  const atlas = manifest.atlases[cell[0]];
+  return { root: model.root, atlas, index: cell[1] };
+}
+
+// Atlas cells for the tiles of a page, or null if the page would need too
+// many atlases to be worth it
+export function getPageAtlasCells(models, sortField) {
+  if (manifests.size === 0) return null;
+  const cells = new Map();
+  const atlases = new Set();
+  for (const model of models) {
+    const cell = getAtlasCell(model, sortField);
+    if (!cell) continue;
+    cells.set(model, cell);
+    atlases.add(cell.atlas);
+  }
+  return cells.size > 0 && atlases.size <= MAX_PAGE_ATLASES ? cells : null;
+}
+
+function loadAtlasURL(root, atlas) {
+  const key = `${root}/${atlas.file}`;
+  let url = atlasURLs.get(key);
+  if (url) {
+    atlasURLs.delete(key);
+  } else {
+    url = getCacheFile(atlas.file, root).then(file => file ? URL.createObjectURL(file) : null);
+  }
+  atlasURLs.set(key, url);
+  while (atlasURLs.size > MAX_CACHED_ATLASES) {
+    const [oldest, oldURL] = atlasURLs.entries().next().value;
+    atlasURLs.delete(oldest);
+    revokeAtlasURL(oldURL);
+  }
+  return url;
+}
+
+// Square element showing one atlas cell. Sizes and offsets are percentages,
+// so it scales with the tile size without re-rendering.
+export function createAtlasThumb(cell) {
+  const { root, atlas, index } = cell;
+  const column = index % atlas.columns;
+  const row = Math.floor(index / atlas.columns);
+  const thumb = document.createElement('div');
+  thumb.className = 'atlas-thumb';
+  const image = document.createElement('div');
+  image.className = 'atlas-cell';
+  image.style.backgroundSize = `${atlas.columns * 100}% ${atlas.rows * 100}%`;
+  image.style.backgroundPosition = [
+    atlas.columns > 1 ? `${column / (atlas.columns - 1) * 100}%` : '0',
+    atlas.rows > 1 ? `${row / (atlas.rows - 1) * 100}%` : '0'
+  ].join(' ');
+  thumb.appendChild(image);
+  loadAtlasURL(root, atlas).then(url => {
+    if (url) image.style.backgroundImage = `url("${url}")`;
+  });
+  return thumb;
+}
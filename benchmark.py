@@ -0,0 +1,538 @@
+"""
+Benchmarks the library tools and the viewer on a synthetic asset library.
+
+A library of small GLB, FBX, PNG, WAV and MP4 fixtures is generated from a
+seed, so the same arguments always produce the same tree. Then each stage is
+timed:
+
+    index_cold_ms     asset_catalog.update_catalog on a library without cache
+    index_warm_ms     the same again, with every entry unchanged
+    catalog_load_ms   asset_catalog.load_catalog (median of several loads)
+    thumbnails_ms     thumbnail_atlas.build_library_atlases (needs Pillow)
+    package_ms        create_zip.create_digital_asset_viewer_zip, without vendoring
+
+With --browser, the viewer is served by asset_server.py and driven in
+headless Chromium (needs Playwright). The library is dropped onto the grid,
+and the time until the tile loads settle is measured for the first page, a
+page flip and a sort change, using the spans of perf_trace.js:
+
+    browser_first_tile_ms, browser_first_page_ms,
+    browser_page_flip_ms, browser_sort_change_ms
+
+Every run is appended to a JSON history. A metric is a regression when it is
+slower than the median of the last runs with the same library settings on the
+same machine by more than its threshold; the exit status is then 1.
+
+MP4 fixtures need ffmpeg on PATH and are left out without it.
+
+Usage:
+    python benchmark.py [--files 1000] [--depth 3] [--fanout 4] [--seed 1]
+                        [--browser] [--history FILE] [--threshold 0.2]
+                        [--metric-threshold NAME=RATIO ...] [--keep DIR]
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+import zlib
+from array import array
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+
+import create_zip
+import thumbnail_atlas
+from asset_catalog import cache_root, load_catalog, update_catalog
+from asset_server import LibraryState, make_handler
+from glb_io import ELEMENT_ARRAY_BUFFER, FLOAT, UNSIGNED_SHORT, GLBFile
+
+VIEWER_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(VIEWER_DIR, "benchmark_history.json")
+HISTORY_VERSION = 1
+
+# Asset type, extension and share of the generated files
+FIXTURE_MIX = (
+    ("image", "png", 0.40),
+    ("audio", "wav", 0.20),
+    ("video", "mp4", 0.10),
+    ("glb", "glb", 0.15),
+    ("fbx", "fbx", 0.15),
+)
+IMAGE_SIZE = 128
+AUDIO_RATE = 22050
+AUDIO_SECONDS = 0.5
+# Videos are copies of a few generated clips; encoding one per file is slow
+VIDEO_VARIANTS = 8
+VIDEO_SECONDS = 2
+
+CATALOG_LOAD_REPEATS = 5
+# Runs the baseline is the median of
+BASELINE_RUNS = 5
+DEFAULT_THRESHOLD = 0.2
+# Differences smaller than this are noise, whatever the ratio
+MIN_REGRESSION_MS = 5.0
+
+BROWSER_VIEWPORT = {"width": 1600, "height": 1000}
+BROWSER_QUIET_MS = 1000
+BROWSER_TIMEOUT_MS = 60000
+
+# Unit cube: 8 corners and 6 faces, wound counter-clockwise from outside
+CUBE_CORNERS = [(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)]
+CUBE_FACES = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+
+# Runs in the page: drops the library files onto the grid, then flips a page
+# and changes the sort order, timing each until its tile loads settle
+BROWSER_SCENARIOS = """
+async ({ paths, quietMs, timeoutMs }) => {
+  const tileSpans = since => davPerf.getPerfEntries().filter(e => e.name.startsWith('tile:') && e.start >= since);
+  // Marks of spans that have not ended yet (perf_trace.js clears them at the end)
+  const tilesInFlight = () => performance.getEntriesByType('mark').filter(m => m.name.startsWith('dav:tile:')).length;
+  const settle = async since => {
+    const deadline = performance.now() + timeoutMs;
+    let state = '';
+    let changed = performance.now();
+    while (performance.now() < deadline) {
+      const inFlight = tilesInFlight();
+      const current = `${tileSpans(since).length}/${inFlight}`;
+      if (current !== state) {
+        state = current;
+        changed = performance.now();
+      } else if (inFlight === 0 && performance.now() - changed >= quietMs) {
+        break;
+      }
+      await new Promise(resolve => setTimeout(resolve, 50));
+    }
+    const ends = tileSpans(since).map(e => e.start + e.duration);
+    return ends.length ? Math.max(...ends) - since : null;
+  };
+
+  const files = await Promise.all(paths.map(async path => {
+    const response = await fetch('/library/' + path.split('/').map(encodeURIComponent).join('/'));
+    return new File([await response.blob()], path.split('/').pop());
+  }));
+  const transfer = new DataTransfer();
+  files.forEach(file => transfer.items.add(file));
+
+  const results = {};
+  let since = performance.now();
+  document.getElementById('viewerContainer').dispatchEvent(
+    new DragEvent('drop', { dataTransfer: transfer, bubbles: true, cancelable: true }));
+  results.browser_first_page_ms = await settle(since);
+  const firstTile = davPerf.getPerfEntries().find(e => e.name === 'first-tile' && e.start >= since);
+  results.browser_first_tile_ms = firstTile ? firstTile.duration : null;
+
+  const next = document.getElementById('nextPage');
+  if (!next.disabled) {
+    since = performance.now();
+    next.click();
+    results.browser_page_flip_ms = await settle(since);
+  }
+
+  since = performance.now();
+  document.querySelector('.sort-option[data-value="size"]').click();
+  results.browser_sort_change_ms = await settle(since);
+  return results;
+}
+"""
+
+
+def png_bytes(width, height, color):
+    """
+    Returns an RGB PNG with a vertical gradient starting at `color`.
+    """
+    red, green, blue = color
+    raw = b"".join(b"\x00" + bytes(((red + y) & 255, green, blue)) * width for y in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def wav_bytes(frequency, seconds=AUDIO_SECONDS, rate=AUDIO_RATE):
+    """
+    Returns a 16-bit mono WAV of a sine tone.
+    """
+    samples = array("h", (
+        int(12000 * math.sin(2 * math.pi * frequency * i / rate))
+        for i in range(int(seconds * rate))
+    ))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    output = io.BytesIO()
+    with wave.open(output, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+    return output.getvalue()
+
+
+def write_glb(path, scale, color):
+    positions = [coordinate * scale for corner in CUBE_CORNERS for coordinate in corner]
+    indices = [i for a, b, c, d in CUBE_FACES for i in (a, b, c, a, c, d)]
+    position_data = array("f", positions)
+    index_data = array("H", indices)
+    if sys.byteorder == "big":
+        position_data.byteswap()
+        index_data.byteswap()
+
+    glb = GLBFile({
+        "asset": {"version": "2.0", "generator": "benchmark.py"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "name": "Cube"}],
+        "meshes": [{"primitives": [{"attributes": {}, "material": 0}]}],
+        "materials": [{"pbrMetallicRoughness": {"baseColorFactor": [c / 255 for c in color] + [1.0]}}],
+    }, [])
+    primitive = glb.gltf["meshes"][0]["primitives"][0]
+    primitive["attributes"]["POSITION"] = glb.add_accessor(
+        position_data.tobytes(), FLOAT, "VEC3", len(CUBE_CORNERS),
+        min=[-0.5 * scale] * 3, max=[0.5 * scale] * 3,
+    )
+    primitive["indices"] = glb.add_accessor(index_data.tobytes(), UNSIGNED_SHORT, "SCALAR", len(indices),
+                                            target=ELEMENT_ARRAY_BUFFER)
+    glb.write(path)
+
+
+def fbx_property(kind, value):
+    if kind == "L":
+        return b"L" + struct.pack("<q", value)
+    if kind == "S":
+        data = value.encode("utf-8")
+        return b"S" + struct.pack("<I", len(data)) + data
+    # Uncompressed array: length, encoding 0, byte length, values
+    data = struct.pack(f"<{len(value)}{kind}", *value)
+    return kind.encode("ascii") + struct.pack("<III", len(value), 0, len(data)) + data
+
+
+def fbx_node(offset, name, properties=(), children=()):
+    """
+    Encodes one FBX 7.4 node record starting at file `offset`; `children`
+    are (name, properties, children) tuples.
+    """
+    props = b"".join(properties)
+    name_data = name.encode("ascii")
+    body_offset = offset + 13 + len(name_data) + len(props)
+    body = b""
+    for child in children:
+        body += fbx_node(body_offset + len(body), *child)
+    if children:
+        body += bytes(13)
+    end_offset = body_offset + len(body)
+    return struct.pack("<IIIB", end_offset, len(properties), len(props), len(name_data)) + name_data + props + body
+
+
+def write_fbx(path, scale, object_id):
+    """
+    Writes a binary FBX with a single cube mesh.
+    """
+    geometry_id, model_id = object_id * 2 + 1000, object_id * 2 + 1001
+    vertices = [coordinate * scale for corner in CUBE_CORNERS for coordinate in corner]
+    # The last index of each polygon is stored as -(index + 1)
+    polygon_indices = [i for face in CUBE_FACES for i in (*face[:-1], ~face[-1])]
+    nodes = [
+        ("Objects", (), [
+            ("Geometry", [fbx_property("L", geometry_id), fbx_property("S", "Cube\x00\x01Geometry"),
+                          fbx_property("S", "Mesh")], [
+                ("Vertices", [fbx_property("d", vertices)], ()),
+                ("PolygonVertexIndex", [fbx_property("i", polygon_indices)], ()),
+            ]),
+            ("Model", [fbx_property("L", model_id), fbx_property("S", "Cube\x00\x01Model"),
+                       fbx_property("S", "Mesh")], ()),
+        ]),
+        ("Connections", (), [
+            ("C", [fbx_property("S", "OO"), fbx_property("L", geometry_id), fbx_property("L", model_id)], ()),
+            ("C", [fbx_property("S", "OO"), fbx_property("L", model_id), fbx_property("L", 0)], ()),
+        ]),
+    ]
+    data = b"Kaydara FBX Binary  \x00\x1a\x00" + struct.pack("<I", 7400)
+    for node in nodes:
+        data += fbx_node(len(data), *node)
+    # End-of-list record, then a footer; readers expect content to end at
+    # least 176 bytes before the end of the file
+    data += bytes(13) + bytes(163)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def require_ffmpeg():
+    path = shutil.which("ffmpeg")
+    if not path:
+        raise RuntimeError("ffmpeg is required to generate video fixtures but was not found on PATH")
+    return path
+
+
+def make_video_clips(directory, count=VIDEO_VARIANTS):
+    ffmpeg = require_ffmpeg()
+    clips = []
+    for i in range(count):
+        output = os.path.join(directory, f"clip{i}.mp4")
+        subprocess.run([
+            ffmpeg, "-v", "error", "-y", "-f", "lavfi",
+            "-i", f"testsrc2=size=320x240:rate=24:duration={VIDEO_SECONDS}",
+            "-vf", f"hue=h={i * 360 // count}", "-c:v", "libx264", "-pix_fmt", "yuv420p", output,
+        ], check=True)
+        clips.append(output)
+    return clips
+
+
+def library_directories(depth, fanout):
+    directories = [""]
+    level = [""]
+    for _ in range(depth):
+        level = [f"{parent}dir{j}/" for parent in level for j in range(fanout)]
+        directories.extend(level)
+    return directories
+
+
+def generate_library(root, files=1000, depth=3, fanout=4, seed=1):
+    """
+    Writes a synthetic library under `root`. Returns {type: count}.
+    """
+    rng = random.Random(seed)
+    directories = library_directories(depth, fanout)
+    mix = list(FIXTURE_MIX)
+    clips = []
+    try:
+        clips = make_video_clips(tempfile.mkdtemp(prefix="dav-clips-"))
+    except (RuntimeError, subprocess.CalledProcessError) as error:
+        print(f"Skipping video fixtures: {error}")
+        mix = [item for item in mix if item[0] != "video"]
+
+    counts = {}
+    for i in range(files):
+        asset_type, extension, _ = rng.choices(mix, weights=[share for _, _, share in mix])[0]
+        directory = os.path.join(root, *rng.choice(directories).split("/"))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{asset_type}_{i:05d}.{extension}")
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        if asset_type == "image":
+            with open(path, "wb") as f:
+                f.write(png_bytes(IMAGE_SIZE, IMAGE_SIZE, color))
+        elif asset_type == "audio":
+            with open(path, "wb") as f:
+                f.write(wav_bytes(rng.uniform(110, 880)))
+        elif asset_type == "video":
+            shutil.copyfile(rng.choice(clips), path)
+        elif asset_type == "glb":
+            write_glb(path, rng.uniform(0.5, 2.0), color)
+        else:
+            write_fbx(path, rng.uniform(0.5, 2.0), i)
+        counts[asset_type] = counts.get(asset_type, 0) + 1
+    if clips:
+        shutil.rmtree(os.path.dirname(clips[0]), ignore_errors=True)
+    return counts
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def time_package():
+    # The packager writes into the working directory
+    previous = os.getcwd()
+    directory = tempfile.mkdtemp(prefix="dav-package-")
+    try:
+        os.chdir(directory)
+        return timed(create_zip.create_digital_asset_viewer_zip, vendor_bundle=False)
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_stages(root, jobs=None):
+    """
+    Times the pipeline stages. Returns ({metric: ms}, {stage: reason skipped}).
+    """
+    results = {}
+    skipped = {}
+    shutil.rmtree(cache_root(root), ignore_errors=True)
+    results["index_cold_ms"] = timed(update_catalog, root)
+    results["index_warm_ms"] = timed(update_catalog, root)
+    results["catalog_load_ms"] = statistics.median(timed(load_catalog, root) for _ in range(CATALOG_LOAD_REPEATS))
+    try:
+        thumbnail_atlas.require_pillow()
+        results["thumbnails_ms"] = timed(thumbnail_atlas.build_library_atlases, root, jobs=jobs)
+    except RuntimeError as error:
+        skipped["thumbnails"] = str(error)
+    results["package_ms"] = time_package()
+    return results, skipped
+
+
+def run_browser_scenarios(root, quiet_ms=BROWSER_QUIET_MS, timeout_ms=BROWSER_TIMEOUT_MS):
+    """
+    Serves the viewer and the library, and runs BROWSER_SCENARIOS in
+    headless Chromium. Returns {metric: ms}.
+    """
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        raise RuntimeError(
+            "Playwright is required for browser scenarios: pip install playwright && playwright install chromium"
+        )
+
+    paths = sorted(load_catalog(root)["assets"])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(LibraryState(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with sync_playwright() as playwright:
+            browser = playwright.chromium.launch()
+            try:
+                page = browser.new_page(viewport=BROWSER_VIEWPORT)
+                page.goto(f"http://127.0.0.1:{server.server_port}/")
+                page.wait_for_function("window.davPerf !== undefined")
+                results = page.evaluate(
+                    BROWSER_SCENARIOS, {"paths": paths, "quietMs": quiet_ms, "timeoutMs": timeout_ms}
+                )
+            finally:
+                browser.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {name: value for name, value in results.items() if value is not None}
+
+
+def load_history(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    except FileNotFoundError:
+        return {"version": HISTORY_VERSION, "runs": []}
+    if history.get("version") != HISTORY_VERSION:
+        raise ValueError(f"Unsupported benchmark history version in {path}")
+    return history
+
+
+def save_history(path, history):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=1)
+    os.replace(temp_path, path)
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=VIEWER_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+    return result.stdout.decode("ascii").strip() or None
+
+
+def find_regressions(history, run, thresholds, default_threshold=DEFAULT_THRESHOLD):
+    """
+    Compares a run with the median of the last comparable runs. Returns
+    {metric: (value, baseline)} for metrics over their threshold.
+    """
+    previous = [
+        old for old in history["runs"]
+        if old["config"] == run["config"] and old["machine"] == run["machine"]
+    ][-BASELINE_RUNS:]
+    regressions = {}
+    for name, value in run["results"].items():
+        values = [old["results"][name] for old in previous if name in old["results"]]
+        if not values:
+            continue
+        baseline = statistics.median(values)
+        threshold = thresholds.get(name, default_threshold)
+        if value > baseline * (1 + threshold) and value - baseline > MIN_REGRESSION_MS:
+            regressions[name] = (value, baseline)
+    return regressions
+
+
+def parse_thresholds(items):
+    thresholds = {}
+    for item in items:
+        name, _, ratio = item.partition("=")
+        try:
+            thresholds[name] = float(ratio)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Expected NAME=RATIO, got {item!r}")
+    return thresholds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the viewer pipeline on a synthetic asset library.")
+    parser.add_argument("--files", type=int, default=1000, help="Number of assets to generate")
+    parser.add_argument("--depth", type=int, default=3, help="Folder nesting depth")
+    parser.add_argument("--fanout", type=int, default=4, help="Subfolders per folder")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the generated library")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--browser", action="store_true", help="Also run the headless browser scenarios")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON file runs are appended to")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown over the baseline, as a ratio (default: 0.2)")
+    parser.add_argument("--metric-threshold", action="append", default=[], metavar="NAME=RATIO",
+                        help="Threshold for one metric, e.g. browser_first_page_ms=0.5")
+    parser.add_argument("--keep", metavar="DIR", help="Generate the library in DIR and keep it")
+    args = parser.parse_args()
+
+    try:
+        thresholds = parse_thresholds(args.metric_threshold)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+
+    root = os.path.abspath(args.keep) if args.keep else tempfile.mkdtemp(prefix="dav-library-")
+    if args.keep and os.path.exists(root) and os.listdir(root):
+        parser.error(f"{root} is not empty")
+    config = {"files": args.files, "depth": args.depth, "fanout": args.fanout, "seed": args.seed}
+    try:
+        start = time.perf_counter()
+        counts = generate_library(root, **config)
+        print(f"Generated {sum(counts.values())} assets {counts} in {time.perf_counter() - start:.2f}s")
+
+        results, skipped = run_stages(root, jobs=args.jobs)
+        if args.browser:
+            try:
+                results.update(run_browser_scenarios(root))
+            except RuntimeError as error:
+                skipped["browser"] = str(error)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    history = load_history(args.history)
+    run = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "config": config,
+        "counts": counts,
+        "results": {name: round(value, 2) for name, value in results.items()},
+        "skipped": skipped,
+    }
+    regressions = find_regressions(history, run, thresholds, args.threshold)
+    run["regressions"] = sorted(regressions)
+    history["runs"].append(run)
+    save_history(args.history, history)
+
+    for name, value in run["results"].items():
+        note = ""
+        if name in regressions:
+            note = f"  REGRESSION (baseline {regressions[name][1]:.1f} ms)"
+        print(f"{name:24} {value:10.1f} ms{note}")
+    for stage, reason in skipped.items():
+        print(f"Skipped {stage}: {reason}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
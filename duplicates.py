@@ -0,0 +1,377 @@
+"""
+Finds exact and near-duplicate assets in a library.
+
+Exact duplicates are found in three passes so most files are never read in
+full: files are grouped by size, same-size files are compared by a quick
+hash of their first and last blocks, and only files whose quick hashes
+still collide get a full content hash.
+
+Near duplicates are found with perceptual hashes (pHash): 64 bits taken from
+the low frequencies of a 32x32 grayscale thumbnail, which survive
+re-encoding, resizing and small colour changes. Images get one hash and
+videos one per sampled keyframe. Hashes are clustered with a BK-tree, so the
+work grows with the number of close pairs rather than with every pair.
+
+Catalog fields written:
+    "quick_hash"  hash of the first and last blocks (same-size files only)
+    "hash"        full content hash (files whose quick hashes collide)
+    "phash"       list of 16-digit hex pHashes (images and videos)
+    "dup_group"   path of the first asset of its duplicate group, set only
+                  on assets that have an exact or near duplicate
+
+Images are decoded with Pillow (pip install Pillow). Video keyframes are
+decoded with ffmpeg, which must be on PATH.
+
+Usage:
+    python duplicates.py LIBRARY_ROOT [--jobs N] [--distance N] [--force]
+    python duplicates.py LIBRARY_ROOT --similar PATH [--distance N]
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import shutil
+import subprocess
+import sys
+from collections import Counter, defaultdict
+
+from asset_catalog import (
+    TYPE_EXTENSIONS, asset_path, detect_asset_type, load_catalog, run_asset_batch, update_asset_fields, update_catalog,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+QUICK_BLOCK_SIZE = 64 * 1024
+FULL_HASH_CHUNK_SIZE = 1024 * 1024
+
+# pHash: DCT of a HASH_IMAGE_SIZE square thumbnail, keeping HASH_SIZE^2 bits
+HASH_IMAGE_SIZE = 32
+HASH_SIZE = 8
+VIDEO_KEYFRAMES = 4
+
+# Hashes at most this many bits apart are grouped as near duplicates
+DUPLICATE_DISTANCE = 6
+# Default radius for "show similar" queries
+SIMILAR_DISTANCE = 12
+
+DCT_TABLE = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * HASH_IMAGE_SIZE)) for x in range(HASH_IMAGE_SIZE)]
+    for u in range(HASH_SIZE)
+]
+
+
+def quick_hash(path, size):
+    """
+    Hashes the first and last blocks of a file, which is enough to tell
+    apart almost all different files of the same size.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(QUICK_BLOCK_SIZE))
+        if size > QUICK_BLOCK_SIZE:
+            f.seek(max(QUICK_BLOCK_SIZE, size - QUICK_BLOCK_SIZE))
+            digest.update(f.read(QUICK_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(FULL_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dct_hash(pixels):
+    """
+    Computes the pHash of a HASH_IMAGE_SIZE x HASH_IMAGE_SIZE grayscale
+    image given as a flat sequence of row-major values.
+    """
+    size = HASH_IMAGE_SIZE
+    # Separable DCT, keeping only the low frequencies: rows first...
+    rows = []
+    for y in range(size):
+        row = pixels[y * size:(y + 1) * size]
+        rows.append([sum(c * p for c, p in zip(DCT_TABLE[u], row)) for u in range(HASH_SIZE)])
+    # ...then columns
+    coefficients = []
+    for v in range(HASH_SIZE):
+        table = DCT_TABLE[v]
+        for u in range(HASH_SIZE):
+            coefficients.append(sum(table[y] * rows[y][u] for y in range(size)))
+
+    # The DC term only measures overall brightness, so leave it out of the median
+    ordered = sorted(coefficients[1:])
+    median = (ordered[len(ordered) // 2 - 1] + ordered[len(ordered) // 2]) / 2
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (coefficient > median)
+    return value
+
+
+def format_hash(value):
+    return f"{value:0{HASH_SIZE * HASH_SIZE // 4}x}"
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def image_pixels(path):
+    """
+    Decodes an image to a HASH_IMAGE_SIZE square grayscale thumbnail.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required to hash images: pip install Pillow")
+    with Image.open(path) as image:
+        # Lets the JPEG decoder skip most of the work for large photos
+        image.draft("L", (HASH_IMAGE_SIZE * 4, HASH_IMAGE_SIZE * 4))
+        thumbnail = image.convert("L").resize((HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), Image.BOX)
+        return thumbnail.tobytes()
+
+
+def video_keyframe_pixels(path, count=VIDEO_KEYFRAMES):
+    """
+    Decodes only the keyframes of a video, scaled by ffmpeg to
+    HASH_IMAGE_SIZE square grayscale thumbnails, and returns `count` of
+    them spread over its length.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg is required to hash videos but was not found on PATH")
+    size = HASH_IMAGE_SIZE
+    command = [
+        ffmpeg, "-v", "error", "-nostdin", "-skip_frame", "nokey", "-i", path, "-an",
+        "-vf", f"scale={size}:{size}:flags=area,format=gray",
+        "-vsync", "0", "-f", "rawvideo", "-",
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    frame_size = size * size
+    frames = [
+        result.stdout[start:start + frame_size]
+        for start in range(0, len(result.stdout) - frame_size + 1, frame_size)
+    ]
+    if not frames:
+        raise RuntimeError("no keyframes could be decoded")
+    # Skip the very start and end, which are often black or titles
+    picks = sorted({int(len(frames) * (i + 1) / (count + 1)) for i in range(count)})
+    return [frames[min(index, len(frames) - 1)] for index in picks]
+
+
+def perceptual_hashes(path, asset_type):
+    if asset_type == "video":
+        return [dct_hash(pixels) for pixels in video_keyframe_pixels(path)]
+    return [dct_hash(image_pixels(path))]
+
+
+def process_quick_hash(root, rel_path):
+    path = asset_path(root, rel_path)
+    return {"quick_hash": quick_hash(path, os.path.getsize(path))}
+
+
+def process_full_hash(root, rel_path):
+    return {"hash": full_hash(asset_path(root, rel_path))}
+
+
+def process_phash(root, rel_path):
+    path = asset_path(root, rel_path)
+    hashes = perceptual_hashes(path, detect_asset_type(path))
+    return {"phash": [format_hash(value) for value in hashes]}
+
+
+class BKTree:
+    """
+    Metric tree over 64-bit hashes with Hamming distance.
+
+    Each node keeps its children keyed by their distance to it, so a search
+    only descends into children whose distance lies within the search radius
+    of the query's distance to the node (triangle inequality).
+    """
+
+    def __init__(self):
+        self.root = None
+        self.count = 0
+
+    def add(self, value, item):
+        self.count += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [item], {})
+                return
+            node = child
+
+    def find(self, value, max_distance):
+        """
+        Returns (distance, item) pairs within max_distance of value.
+        """
+        results = []
+        pending = [self.root] if self.root else []
+        while pending:
+            node = pending.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, item) for item in node[1])
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    pending.append(child)
+        return results
+
+
+def build_hash_tree(catalog):
+    """
+    Builds a BK-tree of every perceptual hash in the catalog, with asset
+    paths as items.
+    """
+    tree = BKTree()
+    for rel_path, entry in catalog["assets"].items():
+        for value in entry.get("phash") or ():
+            tree.add(int(value, 16), rel_path)
+    return tree
+
+
+def find_similar(catalog, rel_path, distance=SIMILAR_DISTANCE, tree=None):
+    """
+    Returns (distance, path) pairs for the assets that look like rel_path or
+    have the same content, closest first. The asset itself is included.
+    """
+    assets = catalog["assets"]
+    entry = assets.get(rel_path)
+    if entry is None:
+        return []
+    best = {rel_path: 0}
+    if entry.get("hash"):
+        for other_path, other in assets.items():
+            if other.get("hash") == entry["hash"]:
+                best[other_path] = 0
+    if entry.get("phash"):
+        tree = tree or build_hash_tree(catalog)
+        for value in entry["phash"]:
+            for found_distance, other_path in tree.find(int(value, 16), distance):
+                best[other_path] = min(found_distance, best.get(other_path, found_distance))
+    return sorted((found_distance, path) for path, found_distance in best.items())
+
+
+def group_duplicates(catalog, distance=DUPLICATE_DISTANCE):
+    """
+    Groups assets with the same content hash or with perceptual hashes at
+    most `distance` bits apart. Returns {path: group path} for every asset
+    in a group of two or more, where the group path is the group's first
+    path in sort order.
+    """
+    parents = {}
+
+    def find(path):
+        parents.setdefault(path, path)
+        while parents[path] != path:
+            parents[path] = parents[parents[path]]
+            path = parents[path]
+        return path
+
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parents[max(root_a, root_b)] = min(root_a, root_b)
+
+    by_hash = defaultdict(list)
+    for rel_path, entry in catalog["assets"].items():
+        if entry.get("hash"):
+            by_hash[entry["hash"]].append(rel_path)
+    for paths in by_hash.values():
+        for other in paths[1:]:
+            union(paths[0], other)
+
+    tree = build_hash_tree(catalog)
+    for rel_path, entry in catalog["assets"].items():
+        for value in entry.get("phash") or ():
+            for _, other in tree.find(int(value, 16), distance):
+                if other != rel_path:
+                    union(rel_path, other)
+
+    sizes = Counter(find(path) for path in parents)
+    return {path: find(path) for path in parents if sizes[find(path)] > 1}
+
+
+def find_library_duplicates(root, jobs=None, distance=DUPLICATE_DISTANCE, force=False):
+    """
+    Hashes the assets of a library and records duplicate groups in its
+    catalog. Returns the number of assets that could not be hashed.
+    """
+    all_types = tuple(TYPE_EXTENSIONS)
+    catalog = update_catalog(root)
+
+    # Only files that share their size with another file can be exact duplicates
+    size_counts = Counter(entry["size"] for entry in catalog["assets"].values())
+    failures = run_asset_batch(
+        root, all_types, process_quick_hash, jobs=jobs, catalog=catalog,
+        needs_update=lambda entry: size_counts[entry["size"]] > 1 and entry["size"] > 0
+        and (force or "quick_hash" not in entry),
+        error_fields=("quick_hash",), label="Quick-hashing",
+    )
+
+    catalog = load_catalog(root)
+    quick_counts = Counter(
+        (entry["size"], entry["quick_hash"]) for entry in catalog["assets"].values() if entry.get("quick_hash")
+    )
+    failures += run_asset_batch(
+        root, all_types, process_full_hash, jobs=jobs, catalog=catalog,
+        needs_update=lambda entry: quick_counts[(entry["size"], entry.get("quick_hash"))] > 1
+        and (force or "hash" not in entry),
+        error_fields=("hash",), label="Hashing",
+    )
+
+    catalog = load_catalog(root)
+    failures += run_asset_batch(
+        root, ("image", "video"), process_phash, jobs=jobs, catalog=catalog,
+        needs_update=lambda entry: force or "phash" not in entry,
+        error_fields=("phash",), label="Computing perceptual hashes for",
+    )
+
+    catalog = load_catalog(root)
+    groups = group_duplicates(catalog, distance)
+    update_asset_fields(root, {path: {"dup_group": groups.get(path)} for path in catalog["assets"]})
+    print(f"Found {len(set(groups.values()))} duplicate groups covering {len(groups)} assets")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find exact and near-duplicate assets in a library.")
+    parser.add_argument("root", help="Library root folder")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--distance", type=int, default=None,
+                        help=f"Maximum pHash distance in bits (default: {DUPLICATE_DISTANCE} for grouping, "
+                             f"{SIMILAR_DISTANCE} for --similar)")
+    parser.add_argument("--force", action="store_true", help="Recompute hashes that are up to date")
+    parser.add_argument("--similar", metavar="PATH", help="List the assets similar to one asset and exit")
+    args = parser.parse_args()
+
+    if args.similar:
+        distance = SIMILAR_DISTANCE if args.distance is None else args.distance
+        for found_distance, path in find_similar(load_catalog(args.root), args.similar, distance):
+            print(f"{found_distance:3d}  {path}")
+        return
+
+    distance = DUPLICATE_DISTANCE if args.distance is None else args.distance
+    failures = find_library_duplicates(args.root, jobs=args.jobs, distance=distance, force=args.force)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
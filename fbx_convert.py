@@ -0,0 +1,116 @@
+"""
+Converts FBX models to GLB once, so the viewer can show them with
+model-viewer instead of parsing the FBX with three.js FBXLoader.
+
+Conversions are stored as ``.dav_cache/converted/<content hash>.glb``, keyed
+by the full blake2b hash of the FBX (the same hash duplicates.py records).
+Renamed, moved or duplicated FBX files reuse the existing conversion, and
+an edited file gets a new one.
+
+Conversion needs FBX2glTF (https://github.com/godotengine/FBX2glTF) on
+PATH.
+
+Catalog fields written:
+    "hash"  content hash of the FBX
+    "glb"   cache path of the converted GLB
+
+Usage:
+    python fbx_convert.py LIBRARY_ROOT [--jobs N] [--force]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from functools import partial
+
+from asset_catalog import asset_path, cache_relative, cache_root, load_catalog, named_as_type, run_asset_batch
+from duplicates import full_hash
+
+CONVERTED_DIR_NAME = "converted"
+FBX2GLTF_NAMES = ("FBX2glTF", "fbx2gltf")
+
+
+def find_converter():
+    for name in FBX2GLTF_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+    raise RuntimeError("FBX2glTF is required to convert FBX models but was not found on PATH")
+
+
+def convert_fbx(source, output):
+    """
+    Converts one FBX file to a binary GLB at `output`.
+    """
+    converter = find_converter()
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output)) as temp_dir, \
+            named_as_type(source, "fbx") as named_source:
+        # FBX2glTF adds the .glb extension to the output name itself
+        base = os.path.join(temp_dir, "model")
+        command = [converter, "--binary", "--input", named_source, "--output", base]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0 or not os.path.exists(base + ".glb"):
+            message = (result.stderr or result.stdout).decode("utf-8", "replace").strip()
+            raise RuntimeError(f"FBX2glTF failed: {message}")
+        os.replace(base + ".glb", output)
+
+
+def process_asset(root, rel_path, force=False):
+    """
+    Batch-mode worker: converts one FBX unless a conversion of the same
+    content exists, and returns its catalog fields.
+    """
+    source = asset_path(root, rel_path)
+    content_hash = full_hash(source)
+    output = os.path.join(cache_root(root), CONVERTED_DIR_NAME, content_hash + ".glb")
+    if force or not os.path.exists(output):
+        convert_fbx(source, output)
+    return {"hash": content_hash, "glb": cache_relative(root, output)}
+
+
+def remove_stale_conversions(root):
+    """
+    Deletes conversions no cataloged FBX refers to any more.
+    """
+    converted_dir = os.path.join(cache_root(root), CONVERTED_DIR_NAME)
+    if not os.path.isdir(converted_dir):
+        return
+    current = {entry["glb"] for entry in load_catalog(root)["assets"].values() if entry.get("glb")}
+    for name in os.listdir(converted_dir):
+        if name.endswith(".glb") and f"{CONVERTED_DIR_NAME}/{name}" not in current:
+            os.remove(os.path.join(converted_dir, name))
+
+
+def convert_library(root, jobs=None, force=False):
+    """
+    Converts every FBX in a library that has no current conversion. Returns
+    the number of models that could not be converted.
+    """
+    find_converter()
+    failures = run_asset_batch(
+        root, ("fbx",), partial(process_asset, force=force),
+        jobs=jobs,
+        needs_update=None if force else (lambda entry: "glb" not in entry),
+        error_fields=("glb",), label="Converting",
+    )
+    remove_stale_conversions(root)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert FBX models to cached GLB files.")
+    parser.add_argument("root", help="Library root folder")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Convert models that already have a conversion")
+    args = parser.parse_args()
+
+    failures = convert_library(args.root, jobs=args.jobs, force=args.force)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Writes compressed copies of GLB models for faster loading.
+
+Geometry is re-encoded with meshopt (the default) or Draco, and textures
+are transcoded to KTX2/Basis, which the GPU keeps compressed instead of
+expanding to RGBA. The viewer loads ``.dav_cache/compressed/<path>.<codec>.glb``
+in place of the original when it is current, decoding with the decoders in
+``vendor/`` (see vendor.py). Copies are named after their codec, so
+switching codecs writes new ones.
+
+Tools (must be on PATH):
+    meshopt  gltfpack (https://github.com/zeux/meshoptimizer)
+    draco    gltf-transform (npm install -g @gltf-transform/cli), which
+             needs toktx from KTX-Software for the texture step
+
+Catalog field written:
+    "compressed"  {"file": cache path, "codec": "meshopt" | "draco", "bytes": n}
+
+Usage:
+    python glb_compress.py LIBRARY_ROOT [--codec meshopt|draco] [--jobs N] [--force]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from functools import partial
+
+from asset_catalog import asset_path, cache_relative, derived_path, is_fresh, named_as_type, run_asset_batch
+
+CODECS = ("meshopt", "draco")
+DEFAULT_CODEC = "meshopt"
+
+
+def require_tool(name):
+    path = shutil.which(name)
+    if not path:
+        raise RuntimeError(f"{name} is required for this codec but was not found on PATH")
+    return path
+
+
+def run_tool(command):
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        message = (result.stderr or result.stdout).decode("utf-8", "replace").strip()
+        raise RuntimeError(f"{os.path.basename(command[0])} failed: {message}")
+
+
+def compress_meshopt(source, output):
+    # -cc: meshopt-compressed geometry, -tc: KTX2 textures with Basis Universal
+    run_tool([require_tool("gltfpack"), "-i", source, "-o", output, "-cc", "-tc"])
+
+
+def compress_draco(source, output):
+    gltf_transform = require_tool("gltf-transform")
+    run_tool([gltf_transform, "draco", source, output])
+    # ETC1S is the smallest Basis mode; fine for preview textures
+    run_tool([gltf_transform, "etc1s", output, output])
+
+
+COMPRESSORS = {"meshopt": compress_meshopt, "draco": compress_draco}
+
+
+def compress_glb(source, output, codec=DEFAULT_CODEC):
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    temp_path = output + ".tmp.glb"
+    try:
+        with named_as_type(source, "glb") as named_source:
+            COMPRESSORS[codec](named_source, temp_path)
+        os.replace(temp_path, output)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def process_asset(root, rel_path, codec=DEFAULT_CODEC, force=False):
+    """
+    Batch-mode worker: writes the compressed copy of one GLB and returns
+    its catalog fields.
+    """
+    source = asset_path(root, rel_path)
+    output = derived_path(root, "compressed", rel_path, f".{codec}.glb")
+    if force or not is_fresh(output, source):
+        compress_glb(source, output, codec)
+    return {"compressed": {"file": cache_relative(root, output), "codec": codec, "bytes": os.path.getsize(output)}}
+
+
+def compress_library(root, codec=DEFAULT_CODEC, jobs=None, force=False):
+    return run_asset_batch(
+        root, ("glb",), partial(process_asset, codec=codec, force=force),
+        jobs=jobs,
+        needs_update=lambda entry: force or (entry.get("compressed") or {}).get("codec") != codec,
+        error_fields=("compressed",), label="Compressing",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write meshopt/Draco + KTX2 compressed copies of GLB models.")
+    parser.add_argument("root", help="Library root folder")
+    parser.add_argument("--codec", choices=CODECS, default=DEFAULT_CODEC, help="Geometry compression")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Recompress models that are up to date")
+    args = parser.parse_args()
+
+    failures = compress_library(args.root, codec=args.codec, jobs=args.jobs, force=args.force)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
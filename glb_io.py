@@ -0,0 +1,250 @@
+"""
+Reading and writing GLB files for the model tools.
+
+A GLB is loaded as its glTF JSON plus one bytes-like object per buffer view,
+so tools can replace individual views (simplified geometry, smaller
+textures) and write the result back with unused data dropped.
+"""
+
+import json
+import os
+import struct
+import sys
+from array import array
+
+GLB_MAGIC = b"glTF"
+GLB_JSON_CHUNK = 0x4E4F534A
+GLB_BIN_CHUNK = 0x004E4942
+
+COMPONENT_TYPES = {5120: "b", 5121: "B", 5122: "h", 5123: "H", 5125: "I", 5126: "f"}
+COMPONENT_COUNTS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+# Extensions that keep references to buffer data outside the core fields,
+# which prune() would not see
+BUFFER_EXTENSIONS = {"KHR_draco_mesh_compression", "EXT_meshopt_compression", "EXT_mesh_gpu_instancing"}
+
+
+class GLBFile:
+    """
+    A GLB held as glTF JSON plus the data of each buffer view.
+    """
+
+    def __init__(self, gltf, views):
+        self.gltf = gltf
+        self.views = views
+
+    @classmethod
+    def read(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, _ = struct.unpack_from("<4sII", data, 0)
+        if magic != GLB_MAGIC:
+            raise ValueError("Not a GLB file")
+        if version != 2:
+            raise ValueError(f"Unsupported glTF version {version}")
+
+        gltf = None
+        binary = b""
+        offset = 12
+        while offset + 8 <= len(data):
+            length, chunk_type = struct.unpack_from("<II", data, offset)
+            chunk = memoryview(data)[offset + 8:offset + 8 + length]
+            if chunk_type == GLB_JSON_CHUNK:
+                gltf = json.loads(bytes(chunk).decode("utf-8"))
+            elif chunk_type == GLB_BIN_CHUNK and not binary:
+                binary = chunk
+            offset += 8 + length
+        if gltf is None:
+            raise ValueError("GLB has no JSON chunk")
+
+        buffers = gltf.get("buffers", [])
+        if any("uri" in buffer for buffer in buffers):
+            raise ValueError("GLB references external buffers")
+        views = [
+            binary[view.get("byteOffset", 0):view.get("byteOffset", 0) + view["byteLength"]]
+            for view in gltf.get("bufferViews", [])
+        ]
+        return cls(gltf, views)
+
+    def extensions_used(self):
+        return set(self.gltf.get("extensionsUsed", []))
+
+    def add_view(self, data, target=None, stride=None):
+        view = {"buffer": 0, "byteLength": len(data)}
+        if target:
+            view["target"] = target
+        if stride:
+            view["byteStride"] = stride
+        self.gltf.setdefault("bufferViews", []).append(view)
+        self.views.append(data)
+        return len(self.views) - 1
+
+    def add_accessor(self, data, component_type, accessor_type, count, target=None, **fields):
+        accessor = {
+            "bufferView": self.add_view(data, target),
+            "componentType": component_type,
+            "type": accessor_type,
+            "count": count,
+            **fields,
+        }
+        self.gltf.setdefault("accessors", []).append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def element_size(self, accessor):
+        return struct.calcsize("<" + COMPONENT_TYPES[accessor["componentType"]]) * COMPONENT_COUNTS[accessor["type"]]
+
+    def accessor_bytes(self, index):
+        """
+        Returns the tightly packed element data of an accessor.
+        """
+        accessor = self.gltf["accessors"][index]
+        if "sparse" in accessor:
+            raise ValueError("Sparse accessors are not supported")
+        size = self.element_size(accessor)
+        count = accessor["count"]
+        if "bufferView" not in accessor:
+            return bytes(size * count)
+        view = self.gltf["bufferViews"][accessor["bufferView"]]
+        data = self.views[accessor["bufferView"]]
+        start = accessor.get("byteOffset", 0)
+        stride = view.get("byteStride") or size
+        if stride == size:
+            return bytes(data[start:start + size * count])
+        return b"".join(bytes(data[start + i * stride:start + i * stride + size]) for i in range(count))
+
+    def accessor_values(self, index):
+        """
+        Returns the components of an accessor as a flat array.
+        """
+        accessor = self.gltf["accessors"][index]
+        values = array(COMPONENT_TYPES[accessor["componentType"]])
+        values.frombytes(self.accessor_bytes(index))
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def referenced_accessors(self):
+        gltf = self.gltf
+        used = set()
+        for mesh in gltf.get("meshes", []):
+            for primitive in mesh.get("primitives", []):
+                used.update(primitive.get("attributes", {}).values())
+                if "indices" in primitive:
+                    used.add(primitive["indices"])
+                for target in primitive.get("targets", []):
+                    used.update(target.values())
+        for skin in gltf.get("skins", []):
+            if "inverseBindMatrices" in skin:
+                used.add(skin["inverseBindMatrices"])
+        for animation in gltf.get("animations", []):
+            for sampler in animation.get("samplers", []):
+                used.add(sampler["input"])
+                used.add(sampler["output"])
+        return used
+
+    def prune(self):
+        """
+        Drops accessors and buffer views nothing refers to any more, and
+        renumbers the references to those that remain.
+        """
+        unsupported = self.extensions_used() & BUFFER_EXTENSIONS
+        if unsupported:
+            raise ValueError(f"Cannot rewrite GLBs using {', '.join(sorted(unsupported))}")
+        gltf = self.gltf
+        accessors = gltf.get("accessors", [])
+        kept_accessors = sorted(self.referenced_accessors())
+        accessor_map = {old: new for new, old in enumerate(kept_accessors)}
+
+        used_views = set()
+        for index in kept_accessors:
+            accessor = accessors[index]
+            if "bufferView" in accessor:
+                used_views.add(accessor["bufferView"])
+            sparse = accessor.get("sparse")
+            if sparse:
+                used_views.add(sparse["indices"]["bufferView"])
+                used_views.add(sparse["values"]["bufferView"])
+        for image in gltf.get("images", []):
+            if "bufferView" in image:
+                used_views.add(image["bufferView"])
+        kept_views = sorted(used_views)
+        view_map = {old: new for new, old in enumerate(kept_views)}
+
+        new_accessors = []
+        for index in kept_accessors:
+            accessor = dict(accessors[index])
+            if "bufferView" in accessor:
+                accessor["bufferView"] = view_map[accessor["bufferView"]]
+            if "sparse" in accessor:
+                sparse = json.loads(json.dumps(accessor["sparse"]))
+                sparse["indices"]["bufferView"] = view_map[sparse["indices"]["bufferView"]]
+                sparse["values"]["bufferView"] = view_map[sparse["values"]["bufferView"]]
+                accessor["sparse"] = sparse
+            new_accessors.append(accessor)
+        gltf["accessors"] = new_accessors
+
+        for mesh in gltf.get("meshes", []):
+            for primitive in mesh.get("primitives", []):
+                primitive["attributes"] = {k: accessor_map[v] for k, v in primitive.get("attributes", {}).items()}
+                if "indices" in primitive:
+                    primitive["indices"] = accessor_map[primitive["indices"]]
+                if "targets" in primitive:
+                    primitive["targets"] = [{k: accessor_map[v] for k, v in t.items()} for t in primitive["targets"]]
+        for skin in gltf.get("skins", []):
+            if "inverseBindMatrices" in skin:
+                skin["inverseBindMatrices"] = accessor_map[skin["inverseBindMatrices"]]
+        for animation in gltf.get("animations", []):
+            for sampler in animation.get("samplers", []):
+                sampler["input"] = accessor_map[sampler["input"]]
+                sampler["output"] = accessor_map[sampler["output"]]
+        for image in gltf.get("images", []):
+            if "bufferView" in image:
+                image["bufferView"] = view_map[image["bufferView"]]
+
+        views = gltf.get("bufferViews", [])
+        gltf["bufferViews"] = [views[index] for index in kept_views]
+        self.views = [self.views[index] for index in kept_views]
+
+    def write(self, path):
+        """
+        Writes the GLB atomically, with all views packed into a single buffer.
+        """
+        self.prune()
+        chunks = []
+        offset = 0
+        for view, data in zip(self.gltf.get("bufferViews", []), self.views):
+            # Vertex data must be aligned to its component size; 4 covers all
+            padding = -offset % 4
+            if padding:
+                chunks.append(bytes(padding))
+                offset += padding
+            view["buffer"] = 0
+            view["byteOffset"] = offset
+            view["byteLength"] = len(data)
+            chunks.append(data)
+            offset += len(data)
+        binary = b"".join(bytes(chunk) for chunk in chunks)
+        binary += bytes(-len(binary) % 4)
+        if binary:
+            self.gltf["buffers"] = [{"byteLength": len(binary)}]
+        else:
+            self.gltf.pop("buffers", None)
+
+        json_data = json.dumps(self.gltf, separators=(",", ":")).encode("utf-8")
+        json_data += b" " * (-len(json_data) % 4)
+        total = 12 + 8 + len(json_data) + (8 + len(binary) if binary else 0)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(struct.pack("<4sII", GLB_MAGIC, 2, total))
+            f.write(struct.pack("<II", len(json_data), GLB_JSON_CHUNK))
+            f.write(json_data)
+            if binary:
+                f.write(struct.pack("<II", len(binary), GLB_BIN_CHUNK))
+                f.write(binary)
+        os.replace(temp_path, path)
@@ -0,0 +1,83 @@
+// hdr_preview.js
+// Previews of high dynamic range images (OpenEXR and Radiance .hdr), which
+// browsers cannot decode. Files are parsed to float pixels with the three.js
+// loaders, downscaled and tone mapped to 8-bit sRGB. three.js is only
+// loaded once the first HDR image is shown.
+import { registerRenderers } from './asset_types.js';
+import { loadCachedPreview } from './image_preview.js';
+
+// Larger files are not previewed: the whole image is decoded to 16 bytes
+// per pixel before it is downscaled
+export const HDR_PREVIEW_MAX_BYTES = 128 * 1024 * 1024;
+
+const EXR_MAGIC = 0x01312f76;
+
+let hdrLoaders = null;
+
+function loadHdrLoaders() {
+  if (!hdrLoaders) {
+    hdrLoaders = Promise.all([
+      import('three'),
+      import('three/addons/loaders/EXRLoader.js'),
+      import('three/addons/loaders/RGBELoader.js'),
+    ]).then(([THREE, exr, rgbe]) => ({
+      FloatType: THREE.FloatType,
+      EXRLoader: exr.EXRLoader,
+      RGBELoader: rgbe.RGBELoader,
+    }));
+    // Let a later attempt retry after a network error
+    hdrLoaders.catch(() => { hdrLoaders = null; });
+  }
+  return hdrLoaders;
+}
+
+// Filmic curve (Narkowicz's fit of ACES) followed by the sRGB transfer
+// function, from linear radiance to 0-255
+export function toneMap(value) {
+  const x = value > 0 ? value : 0;
+  const mapped = Math.min(1, (x * (2.51 * x + 0.03)) / (x * (2.43 * x + 0.59) + 0.14));
+  const encoded = mapped <= 0.0031308 ? 12.92 * mapped : 1.055 * Math.pow(mapped, 1 / 2.4) - 0.055;
+  return Math.round(encoded * 255);
+}
+
+// Decode `file` to an ImageBitmap at most `maxSize` pixels on its longest side
+async function decodeHdr(file, maxSize) {
+  if (file.size > HDR_PREVIEW_MAX_BYTES) {
+    throw new Error(`${file.name} is too large to preview`);
+  }
+  const [{ FloatType, EXRLoader, RGBELoader }, buffer] = await Promise.all([loadHdrLoaders(), file.arrayBuffer()]);
+  // Pick the loader by content, as the file may have been sniffed
+  const isExr = buffer.byteLength >= 4 && new DataView(buffer).getUint32(0, true) === EXR_MAGIC;
+  const loader = isExr ? new EXRLoader() : new RGBELoader();
+  const { width, height, data } = loader.setDataType(FloatType).parse(buffer);
+  const channels = data.length / (width * height);
+
+  // Nearest-neighbour sampling keeps this to one pass over the output
+  const scale = Math.min(1, maxSize / Math.max(width, height));
+  const outWidth = Math.max(1, Math.round(width * scale));
+  const outHeight = Math.max(1, Math.round(height * scale));
+  const pixels = new ImageData(outWidth, outHeight);
+  const out = pixels.data;
+  let o = 0;
+  for (let y = 0; y < outHeight; y++) {
+    const sourceY = Math.min(height - 1, Math.floor((y + 0.5) * height / outHeight));
+    // EXRLoader returns the rows bottom-up, as textures expect them
+    const row = isExr ? height - 1 - sourceY : sourceY;
+    for (let x = 0; x < outWidth; x++) {
+      const sourceX = Math.min(width - 1, Math.floor((x + 0.5) * width / outWidth));
+      const i = (row * width + sourceX) * channels;
+      const r = data[i];
+      out[o++] = toneMap(r);
+      out[o++] = toneMap(channels >= 3 ? data[i + 1] : r);
+      out[o++] = toneMap(channels >= 3 ? data[i + 2] : r);
+      out[o++] = 255;
+    }
+  }
+  return createImageBitmap(pixels);
+}
+
+export function loadHdrPreview({ model, key, maxSize, signal }) {
+  return loadCachedPreview(key, maxSize, (size) => decodeHdr(model.file, size), signal);
+}
+
+registerRenderers('hdr', { thumbnail: loadHdrPreview });
@@ -0,0 +1,36 @@
+// image_decode_worker.js
+// Decodes image files off the main thread straight to tile resolution.
+// Only the downscaled ImageBitmap is transferred back; the full-size
+// decode never reaches the main thread.
+
+self.onmessage = async (event) => {
+  const { id, file, maxSize } = event.data;
+  try {
+    const bitmap = await decodePreview(file, maxSize);
+    self.postMessage({ id, bitmap }, [bitmap]);
+  } catch (error) {
+    self.postMessage({ id, error: error.message || String(error) });
+  }
+};
+
+// Decode `file` so that its longest side is at most `maxSize` pixels
+async function decodePreview(file, maxSize) {
+  // Let the decoder scale to the tile width; height keeps the aspect ratio
+  const scaled = await createImageBitmap(file, {
+    resizeWidth: maxSize,
+    resizeQuality: 'medium'
+  });
+  if (scaled.height <= maxSize) {
+    return scaled;
+  }
+
+  // Portrait images are still too tall - fit them into the tile box
+  const ratio = maxSize / scaled.height;
+  const width = Math.max(1, Math.round(scaled.width * ratio));
+  const canvas = new OffscreenCanvas(width, maxSize);
+  const ctx = canvas.getContext('2d');
+  ctx.imageSmoothingQuality = 'high';
+  ctx.drawImage(scaled, 0, 0, width, maxSize);
+  scaled.close();
+  return canvas.transferToImageBitmap();
+}
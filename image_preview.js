@@ -0,0 +1,153 @@
+// image_preview.js
+// Tile-resolution image previews decoded in Web Workers, with an LRU cache
+// bounded by the total size of the decoded bitmaps.
+import { registerMemorySource } from './memory_diagnostics.js';
+
+// Maximum bytes of decoded preview pixels kept in memory (RGBA)
+export const PREVIEW_MEMORY_BUDGET = 256 * 1024 * 1024;
+
+// Preview sizes are rounded up to this step so nearby tile sizes share cache entries
+const SIZE_STEP = 64;
+const WORKER_COUNT = Math.min(2, navigator.hardwareConcurrency || 1);
+
+class BitmapCache {
+  constructor(maxBytes) {
+    this.maxBytes = maxBytes;
+    this.bytes = 0;
+    this.entries = new Map(); // key -> ImageBitmap, oldest first
+  }
+
+  static sizeOf(bitmap) {
+    return bitmap.width * bitmap.height * 4;
+  }
+
+  get(key) {
+    const bitmap = this.entries.get(key);
+    if (bitmap) {
+      // Move to the most recently used position
+      this.entries.delete(key);
+      this.entries.set(key, bitmap);
+    }
+    return bitmap;
+  }
+
+  set(key, bitmap) {
+    this.delete(key);
+    this.entries.set(key, bitmap);
+    this.bytes += BitmapCache.sizeOf(bitmap);
+    for (const [oldKey] of this.entries) {
+      if (this.bytes <= this.maxBytes || oldKey === key) break;
+      this.delete(oldKey);
+    }
+  }
+
+  delete(key) {
+    const bitmap = this.entries.get(key);
+    if (!bitmap) return;
+    this.entries.delete(key);
+    this.bytes -= BitmapCache.sizeOf(bitmap);
+    bitmap.close();
+  }
+
+  clear() {
+    for (const key of [...this.entries.keys()]) {
+      this.delete(key);
+    }
+  }
+}
+
+export const previewCache = new BitmapCache(PREVIEW_MEMORY_BUDGET);
+registerMemorySource(() => [{ type: 'bitmap cache', cacheBytes: previewCache.bytes }]);
+
+const inFlight = new Map(); // key -> Promise<ImageBitmap>
+const pendingRequests = new Map(); // request id -> { resolve, reject }
+let workers = null;
+let nextRequestId = 0;
+
+// Whether the browser can decode and scale images inside a worker
+export function supportsWorkerDecode() {
+  return typeof Worker !== 'undefined' &&
+    typeof OffscreenCanvas !== 'undefined' &&
+    typeof createImageBitmap !== 'undefined';
+}
+
+function getWorkers() {
+  if (!workers) {
+    workers = Array.from({ length: WORKER_COUNT }, () => {
+      const worker = new Worker(new URL('./image_decode_worker.js', import.meta.url));
+      worker.onmessage = (event) => {
+        const { id, bitmap, error } = event.data;
+        const request = pendingRequests.get(id);
+        if (!request) return;
+        pendingRequests.delete(id);
+        if (error) {
+          request.reject(new Error(error));
+        } else {
+          request.resolve(bitmap);
+        }
+      };
+      return worker;
+    });
+  }
+  return workers;
+}
+
+function decodeInWorker(file, maxSize) {
+  const id = nextRequestId++;
+  const pool = getWorkers();
+  return new Promise((resolve, reject) => {
+    pendingRequests.set(id, { resolve, reject });
+    pool[id % pool.length].postMessage({ id, file, maxSize });
+  });
+}
+
+// Round a pixel size up to the cache bucket
+export function previewSizeFor(pixels) {
+  return Math.max(SIZE_STEP, Math.ceil(pixels / SIZE_STEP) * SIZE_STEP);
+}
+
+// Get a downscaled bitmap for `file`, decoding it in a worker on a cache miss.
+// `key` identifies the file; the same key and size share one decode.
+export function loadImagePreview(key, file, maxSize, signal) {
+  return loadCachedPreview(key, maxSize, (size) => decodeInWorker(file, size), signal);
+}
+
+// Get the bitmap cached for `key` at `maxSize`, or make it with
+// `decode(size)` (resolving to an ImageBitmap at most `size` pixels on its
+// longest side) and cache it. For previews decoded some other way.
+export async function loadCachedPreview(key, maxSize, decode, signal) {
+  const size = previewSizeFor(maxSize);
+  const cacheKey = `${key}@${size}`;
+
+  let bitmap = previewCache.get(cacheKey);
+  if (!bitmap) {
+    let decoding = inFlight.get(cacheKey);
+    if (!decoding) {
+      decoding = decode(size)
+        .then(result => {
+          previewCache.set(cacheKey, result);
+          return result;
+        })
+        .finally(() => inFlight.delete(cacheKey));
+      inFlight.set(cacheKey, decoding);
+    }
+    bitmap = await decoding;
+    if (bitmap.width === 0) {
+      // Evicted (and closed) by another decode before we got to it
+      return loadCachedPreview(key, maxSize, decode, signal);
+    }
+  }
+
+  if (signal?.aborted) {
+    throw new DOMException('Image preview aborted', 'AbortError');
+  }
+  return bitmap;
+}
+
+// Copy a cached bitmap into a canvas. The canvas keeps its own pixels, so
+// the cache is free to evict and close the bitmap afterwards.
+export function drawPreview(canvas, bitmap) {
+  canvas.width = bitmap.width;
+  canvas.height = bitmap.height;
+  canvas.getContext('2d').drawImage(bitmap, 0, 0);
+}
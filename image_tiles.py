@@ -0,0 +1,414 @@
+"""
+Builds deep-zoom tile pyramids of large and high dynamic range images, so
+the viewer can pan and zoom a 16K texture while only loading the tiles in
+view.
+
+Pyramids use the Deep Zoom layout: level 0 is one pixel, each level is
+twice the size of the one before (rounding up), and the last level is the
+full image. Every level is cut into TILE_SIZE WebP tiles without overlap:
+
+    .dav_cache/tiles/<path>.json                          manifest ("tiles" in the catalog)
+    .dav_cache/tiles/<path>_files/<level>/<column>_<row>.webp
+
+Images are processed in bands of TILE_SIZE rows. Each band is cut into
+tiles, halved and handed to the next level down, so only about one band
+per level is held in memory. OpenEXR and Radiance .hdr sources are read
+band by band as well, and their pixels are tone mapped with the filmic
+curve the viewer uses (hdr_preview.js). Other formats are decoded whole by
+Pillow. Formats browsers cannot display (EXR, HDR, TIFF, ...) always get a
+pyramid; others only if their longest side is at least --min-size pixels.
+
+Requires numpy and Pillow (pip install numpy Pillow). EXR files also need
+the OpenEXR bindings (pip install OpenEXR).
+
+Usage:
+    python image_tiles.py LIBRARY_ROOT [--min-size PX] [--exposure STOPS] [--jobs N] [--force]
+    python image_tiles.py --file texture.exr --output texture
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+from functools import partial
+
+from asset_catalog import asset_path, cache_relative, derived_path, is_fresh, run_asset_batch, update_catalog
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+else:
+    # Very large textures are what this tool is for
+    Image.MAX_IMAGE_PIXELS = None
+
+try:
+    import Imath
+    import OpenEXR
+except ImportError:
+    OpenEXR = None
+
+MANIFEST_VERSION = 1
+TILE_SIZE = 256
+TILE_QUALITY = 85
+DEFAULT_MIN_SIZE = 4096
+
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+# Pillow formats every browser decodes; other images are always tiled
+BROWSER_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+
+def require_libraries():
+    if np is None or Image is None:
+        raise RuntimeError("numpy and Pillow are required to build image tiles: pip install numpy Pillow")
+
+
+def tone_map(pixels, exposure=0.0):
+    """
+    Maps linear float RGB to 8-bit sRGB with Narkowicz's fit of the ACES
+    filmic curve, as hdr_preview.js does. `exposure` is in stops.
+    """
+    x = np.nan_to_num(pixels, nan=0.0, posinf=65504.0, neginf=0.0) * (2.0 ** exposure)
+    x = np.maximum(x, 0.0)
+    mapped = np.clip(x * (2.51 * x + 0.03) / (x * (2.43 * x + 0.59) + 0.14), 0.0, 1.0)
+    encoded = np.where(mapped <= 0.0031308, 12.92 * mapped, 1.055 * np.power(mapped, 1 / 2.4) - 0.055)
+    return np.round(encoded * 255).astype(np.uint8)
+
+
+def gray_to_rgb(band):
+    return np.repeat(band[..., np.newaxis], 3, axis=2)
+
+
+def halve(band):
+    """
+    Downscales an 8-bit RGB band by two with a 2x2 box filter, repeating the
+    last row and column of odd sizes.
+    """
+    if band.shape[0] % 2:
+        band = np.concatenate([band, band[-1:]], axis=0)
+    if band.shape[1] % 2:
+        band = np.concatenate([band, band[:, -1:]], axis=1)
+    summed = (band[0::2, 0::2].astype(np.uint16) + band[1::2, 0::2] + band[0::2, 1::2] + band[1::2, 1::2])
+    return ((summed + 2) // 4).astype(np.uint8)
+
+
+class ImageSource:
+    """
+    An image read in bands of rows. `hdr` sources yield linear float RGB,
+    the others 8-bit RGB. `always_tiled` is set for formats browsers cannot
+    display.
+    """
+
+    width = height = 0
+    hdr = False
+    always_tiled = True
+
+    def bands(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PillowSource(ImageSource):
+    def __init__(self, path):
+        self.image = Image.open(path)
+        self.width, self.height = self.image.size
+        # Float images (e.g. 32-bit TIFF) hold linear values
+        self.hdr = self.image.mode == "F"
+        self.always_tiled = self.image.format not in BROWSER_FORMATS
+
+    def bands(self):
+        image = self.image
+        if image.mode == "F":
+            pixels = np.asarray(image, dtype=np.float32)
+            convert = gray_to_rgb
+        elif image.mode.startswith("I"):
+            # 16-bit integer images are display-referred, only deeper
+            pixels = np.asarray(image)
+            convert = lambda band: gray_to_rgb(np.clip(band / 257.0, 0, 255).round().astype(np.uint8))
+        else:
+            pixels = np.asarray(image.convert("RGB"))
+            convert = lambda band: band
+        for y in range(0, self.height, TILE_SIZE):
+            yield convert(pixels[y:y + TILE_SIZE])
+
+    def close(self):
+        self.image.close()
+
+
+class ExrSource(ImageSource):
+    hdr = True
+
+    def __init__(self, path):
+        if OpenEXR is None:
+            raise RuntimeError("The OpenEXR bindings are required to tile EXR images: pip install OpenEXR")
+        self.file = OpenEXR.InputFile(path)
+        header = self.file.header()
+        window = header["dataWindow"]
+        self.first_row, self.last_row = window.min.y, window.max.y
+        self.width = window.max.x - window.min.x + 1
+        self.height = window.max.y - window.min.y + 1
+        channels = header["channels"]
+        if all(name in channels for name in "RGB"):
+            self.channels = ["R", "G", "B"]
+        elif "Y" in channels:
+            self.channels = ["Y"]
+        else:
+            self.file.close()
+            raise ValueError(f"No R, G, B or Y channel among {sorted(channels)}")
+
+    def bands(self):
+        pixel_type = Imath.PixelType(Imath.PixelType.FLOAT)
+        for y in range(self.first_row, self.last_row + 1, TILE_SIZE):
+            last = min(y + TILE_SIZE - 1, self.last_row)
+            planes = [
+                np.frombuffer(data, dtype=np.float32).reshape(-1, self.width)
+                for data in self.file.channels(self.channels, pixel_type, y, last)
+            ]
+            yield np.stack(planes * 3 if len(planes) == 1 else planes, axis=-1)
+
+    def close(self):
+        self.file.close()
+
+
+class RgbeSource(ImageSource):
+    """
+    Radiance RGBE (.hdr) reader for the usual top-to-bottom layout, with
+    flat or run-length encoded scanlines.
+    """
+
+    hdr = True
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            if not self.file.readline().startswith(b"#?"):
+                raise ValueError("Not a Radiance image")
+            while True:
+                line = self.file.readline()
+                if not line:
+                    raise ValueError("Truncated Radiance header")
+                if not line.strip():
+                    break
+                if line.startswith(b"FORMAT=") and b"32-bit_rle_rgbe" not in line:
+                    raise ValueError(f"Unsupported Radiance format {line.strip().decode('ascii', 'replace')}")
+            resolution = self.file.readline().split()
+            if len(resolution) != 4 or resolution[0] != b"-Y" or resolution[2] != b"+X":
+                raise ValueError("Only top-to-bottom, left-to-right Radiance images are supported")
+            self.height, self.width = int(resolution[1]), int(resolution[3])
+        except Exception:
+            self.file.close()
+            raise
+
+    def read(self, count):
+        data = self.file.read(count)
+        if len(data) != count:
+            raise ValueError("Truncated Radiance image")
+        return data
+
+    def read_scanline(self):
+        """
+        Returns one scanline as a (width, 4) array of RGBE bytes.
+        """
+        width = self.width
+        head = self.read(4)
+        if 8 <= width < 0x8000 and head[0] == 2 and head[1] == 2 and (head[2] << 8 | head[3]) == width:
+            # Each component is run-length encoded on its own
+            planes = []
+            for _ in range(4):
+                plane = bytearray()
+                while len(plane) < width:
+                    count = self.read(1)[0]
+                    if count > 128:
+                        plane += self.read(1) * (count - 128)
+                    else:
+                        plane += self.read(count)
+                if len(plane) != width:
+                    raise ValueError("Bad run length in Radiance image")
+                planes.append(plane)
+            return np.frombuffer(b"".join(planes), dtype=np.uint8).reshape(4, width).T
+        if head[:3] == b"\x01\x01\x01":
+            raise ValueError("Old-style run-length encoded Radiance images are not supported")
+        return np.frombuffer(head + self.read(width * 4 - 4), dtype=np.uint8).reshape(width, 4)
+
+    def bands(self):
+        for y in range(0, self.height, TILE_SIZE):
+            rgbe = np.stack([self.read_scanline() for _ in range(min(TILE_SIZE, self.height - y))])
+            exponent = rgbe[..., 3].astype(np.int32)
+            scale = np.where(exponent > 0, np.ldexp(1.0, exponent - 136), 0.0).astype(np.float32)
+            yield (rgbe[..., :3].astype(np.float32) + 0.5) * scale[..., np.newaxis]
+
+    def close(self):
+        self.file.close()
+
+
+def open_image(path):
+    """
+    Opens an image as an ImageSource, choosing the reader by content.
+    """
+    require_libraries()
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic == EXR_MAGIC:
+        return ExrSource(path)
+    if magic.startswith(b"#?"):
+        return RgbeSource(path)
+    return PillowSource(path)
+
+
+def level_count(width, height):
+    return math.ceil(math.log2(max(width, height, 1))) + 1
+
+
+class PyramidLevel:
+    """
+    One level of a pyramid being built. Collects rows until a band of
+    TILE_SIZE rows is complete, writes its tiles and passes the band, halved,
+    to the next coarser level.
+    """
+
+    def __init__(self, tiles_dir, level, width, coarser):
+        self.dir = os.path.join(tiles_dir, str(level))
+        os.makedirs(self.dir, exist_ok=True)
+        self.width = width
+        self.coarser = coarser
+        self.pending = []
+        self.pending_rows = 0
+        self.tile_row = 0
+
+    def add(self, rows):
+        self.pending.append(rows)
+        self.pending_rows += len(rows)
+        while self.pending_rows >= TILE_SIZE:
+            self.write_band(TILE_SIZE)
+
+    def finish(self):
+        if self.pending_rows:
+            self.write_band(self.pending_rows)
+        if self.coarser:
+            self.coarser.finish()
+
+    def write_band(self, rows):
+        pending = np.concatenate(self.pending) if len(self.pending) > 1 else self.pending[0]
+        band, rest = pending[:rows], pending[rows:]
+        self.pending = [rest] if len(rest) else []
+        self.pending_rows = len(rest)
+        for column, x in enumerate(range(0, self.width, TILE_SIZE)):
+            tile = Image.fromarray(np.ascontiguousarray(band[:, x:x + TILE_SIZE]), "RGB")
+            tile.save(os.path.join(self.dir, f"{column}_{self.tile_row}.webp"), "WEBP", quality=TILE_QUALITY)
+        self.tile_row += 1
+        if self.coarser:
+            self.coarser.add(halve(band))
+
+
+def build_pyramid(source, manifest_path, tiles_dir, exposure=0.0):
+    """
+    Writes the tile pyramid of an ImageSource and its manifest. The tiles
+    are built next to the old ones and swapped in once complete.
+    """
+    levels = level_count(source.width, source.height)
+    temp_dir = tiles_dir + ".tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    finest = None
+    for level in range(levels):
+        scale = 2 ** (levels - 1 - level)
+        finest = PyramidLevel(temp_dir, level, math.ceil(source.width / scale), finest)
+    for band in source.bands():
+        finest.add(tone_map(band, exposure) if source.hdr else band)
+    finest.finish()
+    shutil.rmtree(tiles_dir, ignore_errors=True)
+    os.replace(temp_dir, tiles_dir)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "width": source.width,
+        "height": source.height,
+        "tile_size": TILE_SIZE,
+        "levels": levels,
+        "format": "webp",
+        # Relative to the folder of the manifest
+        "tiles": os.path.basename(tiles_dir),
+    }
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def process_tiles(root, rel_path, min_size=DEFAULT_MIN_SIZE, exposure=0.0, force=False):
+    """
+    Batch-mode worker: builds the pyramid of one image if it needs one and
+    returns its catalog fields. "tiles" is False for images small enough
+    for the browser to show whole.
+    """
+    source_path = asset_path(root, rel_path)
+    manifest_path = derived_path(root, "tiles", rel_path, ".json")
+    if not force and is_fresh(manifest_path, source_path):
+        return {"tiles": cache_relative(root, manifest_path)}
+    with open_image(source_path) as source:
+        if not source.always_tiled and not source.hdr and max(source.width, source.height) < min_size:
+            return {"tiles": False}
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        build_pyramid(source, manifest_path, derived_path(root, "tiles", rel_path, "_files"), exposure)
+    return {"tiles": cache_relative(root, manifest_path)}
+
+
+def build_library_tiles(root, jobs=None, force=False, min_size=DEFAULT_MIN_SIZE, exposure=0.0):
+    """
+    Builds the missing pyramids of a library. Returns the number of images
+    that could not be tiled.
+    """
+    catalog = update_catalog(root)
+    return run_asset_batch(
+        root, ("image", "hdr"), partial(process_tiles, min_size=min_size, exposure=exposure, force=force),
+        jobs=jobs, catalog=catalog, needs_update=lambda entry: force or "tiles" not in entry,
+        error_fields=("tiles",), label="Tiling",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build deep-zoom tile pyramids of large and HDR images.")
+    parser.add_argument("root", nargs="?", help="Library root to process in batch mode")
+    parser.add_argument("--file", help="Tile a single image instead of a library")
+    parser.add_argument("--output", help="Name of the manifest (.json) and tile folder (_files) in single-file mode")
+    parser.add_argument("--min-size", type=int, default=DEFAULT_MIN_SIZE, metavar="PX",
+                        help="Tile browser-readable images whose longest side is at least PX pixels "
+                             f"(default: {DEFAULT_MIN_SIZE}; use --force to apply a new value to checked images)")
+    parser.add_argument("--exposure", type=float, default=0.0, metavar="STOPS",
+                        help="Exposure adjustment applied to HDR images before tone mapping")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Worker processes (default: CPU count). Images other than EXR and HDR are "
+                             "decoded whole, so lower this for very large ones")
+    parser.add_argument("--force", action="store_true", help="Rebuild pyramids that are up to date")
+    args = parser.parse_args()
+
+    if args.file:
+        output = args.output or os.path.splitext(args.file)[0]
+        with open_image(args.file) as source:
+            manifest = build_pyramid(source, output + ".json", output + "_files", args.exposure)
+        print(f"Wrote {manifest['levels']} levels of {manifest['width']}x{manifest['height']} to '{output}_files'")
+    elif args.root:
+        failures = build_library_tiles(
+            args.root, jobs=args.jobs, force=args.force, min_size=args.min_size, exposure=args.exposure,
+        )
+        sys.exit(1 if failures else 0)
+    else:
+        parser.error("either a library root or --file is required")
+
+
+if __name__ == "__main__":
+    main()
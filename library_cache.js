@@ -0,0 +1,136 @@
+// library_cache.js
+// Read-only access to the .dav_cache folder that the Python asset tools
+// (asset_catalog.py, waveform_peaks.py, ...) write into a library root.
+// Derived files mirror the library layout, so they can be found from an
+// asset's path relative to its root. Every root of the library has its own
+// cache; assets name theirs with `model.root`.
+
+export const CACHE_DIR_NAME = '.dav_cache';
+
+// Root name -> { dir, catalog, atlasManifest }; the last two are promises
+const rootCaches = new Map();
+
+// Open the cache of a library root. Resolves to true if it has one.
+export async function setLibraryRoot(dirHandle, root) {
+  let dir = null;
+  try {
+    dir = await dirHandle.getDirectoryHandle(CACHE_DIR_NAME);
+  } catch {
+    dir = null;
+  }
+  rootCaches.set(root, { dir, catalog: null, atlasManifest: null });
+  return dir !== null;
+}
+
+export function closeLibraryRoot(root) {
+  rootCaches.delete(root);
+}
+
+export function hasLibraryCache(root) {
+  return Boolean(rootCaches.get(root)?.dir);
+}
+
+// Get a folder handle by its path inside the cache folder of a root, or
+// null if it is missing
+export async function getCacheDirectory(cachePath, root) {
+  let dir = rootCaches.get(root)?.dir;
+  if (!dir) return null;
+  try {
+    for (const part of cachePath.split('/').filter(part => part)) {
+      dir = await dir.getDirectoryHandle(part);
+    }
+    return dir;
+  } catch {
+    return null;
+  }
+}
+
+// Get a file by its path inside the cache folder of a root, or null if it
+// is missing
+export async function getCacheFile(cachePath, root) {
+  const slash = cachePath.lastIndexOf('/');
+  const dir = await getCacheDirectory(cachePath.slice(0, slash + 1), root);
+  if (!dir) return null;
+  try {
+    const fileHandle = await dir.getFileHandle(cachePath.slice(slash + 1));
+    return await fileHandle.getFile();
+  } catch {
+    return null;
+  }
+}
+
+// Get the file a tool derived from an asset (e.g. kind 'peaks', suffix
+// '.peaks'), ignoring it if the asset changed after it was generated
+export async function getDerivedFile(kind, model, suffix) {
+  if (!model.relativePath) return null;
+  const file = await getCacheFile(`${kind}/${model.relativePath}${suffix}`, model.root);
+  if (!file || file.lastModified < model.file.lastModified) return null;
+  return file;
+}
+
+// Parse a JSON file in the cache folder of a root, or null if it is missing
+function loadCacheJSON(cachePath, description, root) {
+  return getCacheFile(cachePath, root)
+    .then(file => file ? file.text() : null)
+    .then(text => text ? JSON.parse(text) : null)
+    .catch(error => {
+      console.error(`Error reading ${description}:`, error);
+      return null;
+    });
+}
+
+// Parsed catalog.json of a root, or null if it has not been cataloged
+export function loadCatalog(root) {
+  const cache = rootCaches.get(root);
+  if (!cache) return Promise.resolve(null);
+  if (!cache.catalog) {
+    cache.catalog = loadCacheJSON('catalog.json', `catalog of '${root}'`, root);
+  }
+  return cache.catalog;
+}
+
+// Thumbnail atlas manifest written by thumbnail_atlas.py for a root, or null
+export function loadAtlasManifest(root) {
+  const cache = rootCaches.get(root);
+  if (!cache) return Promise.resolve(null);
+  if (!cache.atlasManifest) {
+    cache.atlasManifest = loadCacheJSON('atlases/manifest.json', `atlas manifest of '${root}'`, root);
+  }
+  return cache.atlasManifest;
+}
+
+// Catalog entry for an asset, or null if it is missing or describes an
+// older version of the file
+export async function getCatalogEntry(model) {
+  if (!model.relativePath) return null;
+  const catalog = await loadCatalog(model.root);
+  const entry = catalog?.assets?.[model.relativePath];
+  if (!entry || entry.size !== model.file.size) return null;
+  // The catalog stores mtime in seconds; allow for filesystem rounding
+  if (Math.abs(entry.mtime * 1000 - model.file.lastModified) > 2000) return null;
+  return entry;
+}
+
+// Decimated levels of a GLB written by lod_chain.py, coarsest first, or an
+// empty list if there are none that are current
+export async function getLodFiles(model) {
+  const entry = await getCatalogEntry(model);
+  if (!entry?.lods?.length) return [];
+  const files = await Promise.all(entry.lods.map(lod => getCacheFile(lod.file, model.root)));
+  return files.filter(file => file && file.lastModified >= model.file.lastModified);
+}
+
+// GLB conversion of an FBX written by fbx_convert.py, or null. Conversions
+// are named by content hash, so a current catalog entry is enough to trust one.
+export async function getConvertedGLB(model) {
+  const entry = await getCatalogEntry(model);
+  return entry?.glb ? getCacheFile(entry.glb, model.root) : null;
+}
+
+// Meshopt/Draco + KTX2 copy of a GLB written by glb_compress.py, or null
+export async function getCompressedGLB(model) {
+  const entry = await getCatalogEntry(model);
+  if (!entry?.compressed?.file) return null;
+  const file = await getCacheFile(entry.compressed.file, model.root);
+  return file && file.lastModified >= model.file.lastModified ? file : null;
+}
@@ -0,0 +1,140 @@
+// library_roots.js
+// The folders a library is made of, e.g. one per project. Every root is
+// scanned by its own worker (scan_worker.js) and keeps its own file list
+// and .dav_cache, so adding, refreshing or removing one root never rescans
+// the others; switching between them is a filter on the merged list.
+// Root handles and their scan rules (scan_rules.js) are kept in IndexedDB
+// so the set survives reloads. The browser asks for read permission again
+// before a restored root is scanned.
+import { scanDirectory } from './library_scan.js';
+
+const DB_NAME = 'dav-library';
+const STORE_NAME = 'roots';
+const ROOTS_KEY = 'roots';
+
+// { name, handle, rules, files: null until scanned }, in the order they
+// were added
+export const libraryRoots = [];
+
+function openDatabase() {
+  return new Promise((resolve, reject) => {
+    const request = indexedDB.open(DB_NAME, 1);
+    request.onupgradeneeded = () => request.result.createObjectStore(STORE_NAME);
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+async function storeRequest(mode, makeRequest) {
+  const db = await openDatabase();
+  try {
+    return await new Promise((resolve, reject) => {
+      const request = makeRequest(db.transaction(STORE_NAME, mode).objectStore(STORE_NAME));
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+  } finally {
+    db.close();
+  }
+}
+
+// Persist the roots that have a directory handle
+export async function saveLibraryRoots() {
+  const saved = libraryRoots.filter(root => root.handle).map(({ name, handle, rules }) => ({ name, handle, rules }));
+  try {
+    await storeRequest('readwrite', store => store.put(saved, ROOTS_KEY));
+  } catch (error) {
+    console.warn('Could not save library roots:', error);
+  }
+}
+
+// Restore the roots of the last session, unscanned
+export async function restoreLibraryRoots() {
+  let saved = null;
+  try {
+    saved = await storeRequest('readonly', store => store.get(ROOTS_KEY));
+  } catch (error) {
+    console.warn('Could not restore library roots:', error);
+  }
+  for (const { name, handle, rules = null } of saved || []) {
+    libraryRoots.push({ name, handle, rules, files: null });
+  }
+  return libraryRoots;
+}
+
+// Name for a new root: the folder name, numbered if another root has it
+function uniqueRootName(name) {
+  const taken = new Set(libraryRoots.map(root => root.name));
+  let unique = name;
+  for (let n = 2; taken.has(unique); n++) unique = `${name} (${n})`;
+  return unique;
+}
+
+export function getLibraryRoot(name) {
+  return libraryRoots.find(root => root.name === name) || null;
+}
+
+// The root for a picked folder: the existing one if the folder was added
+// before, otherwise a new, unscanned root
+export async function addLibraryRoot(handle) {
+  for (const root of libraryRoots) {
+    if (root.handle && await root.handle.isSameEntry(handle)) return root;
+  }
+  const root = { name: uniqueRootName(handle.name), handle, rules: null, files: null };
+  libraryRoots.push(root);
+  return root;
+}
+
+// A root without a folder behind it, e.g. for dropped files. It replaces an
+// earlier root of the same name and is not saved.
+export function setDetachedRoot(name, files) {
+  removeLibraryRoot(name);
+  const root = { name, handle: null, rules: null, files };
+  libraryRoots.push(root);
+  return root;
+}
+
+export function removeLibraryRoot(name) {
+  const index = libraryRoots.findIndex(root => root.name === name);
+  if (index >= 0) libraryRoots.splice(index, 1);
+}
+
+// Resolves to true if the root can be read, asking the user if needed.
+// Asking only works while handling a user gesture.
+export async function ensureRootPermission(root, ask = true) {
+  if (!root.handle?.queryPermission) return Boolean(root.handle);
+  if (await root.handle.queryPermission({ mode: 'read' }) === 'granted') return true;
+  return ask && await root.handle.requestPermission({ mode: 'read' }) === 'granted';
+}
+
+// Scan a root in a worker, falling back to the main thread where workers
+// cannot be used or cannot receive directory handles. Resolves to
+// [{ name, relativePath, file, type }].
+export function scanRoot(root, options) {
+  return new Promise((resolve, reject) => {
+    const scanHere = (reason) => {
+      console.warn(`Scanning '${root.name}' on the main thread:`, reason);
+      scanDirectory(root.handle, options).then(resolve, reject);
+    };
+    let worker;
+    try {
+      worker = new Worker(new URL('./scan_worker.js', import.meta.url), { type: 'module' });
+      worker.postMessage({ handle: root.handle, ...options });
+    } catch (error) {
+      worker?.terminate();
+      scanHere(error);
+      return;
+    }
+    worker.onmessage = (event) => {
+      worker.terminate();
+      const { files, error } = event.data;
+      if (error) reject(new Error(error));
+      else resolve(files);
+    };
+    worker.onerror = (event) => {
+      event.preventDefault();
+      worker.terminate();
+      scanHere(event.message);
+    };
+  });
+}
@@ -0,0 +1,177 @@
+"""
+Libraries made of several roots, e.g. one per project.
+
+A roots file lists the roots by name:
+
+    {
+      "roots": [
+        {"name": "hero", "path": "/mnt/projects/hero", "exclude": ["**/cache/**", ".git"]},
+        {"name": "props", "path": "D:/assets/props", "include": ["*.fbx", "*.png"], "max_depth": 2}
+      ]
+    }
+
+Relative paths are resolved against the folder of the roots file, and the
+name defaults to the folder name. "include", "exclude" and "max_depth" are
+the scan rules of a root (see scan_rules.py); they replace the rules saved
+in its catalog on every run. Every root keeps its own ``.dav_cache``
+folder and catalog, so roots are indexed independently and incrementally,
+each in its own worker process, and the tools built on run_asset_batch can
+still be run on one root at a time.
+
+The merged catalog keys every asset by "<root name>/<path in root>" and adds
+a "root" field to its entry, which search_index.py offers as the root:
+filter and facet. asset_server.py accepts a roots file in place of a
+library root and serves the merged catalog.
+
+Usage:
+    python library_roots.py ROOTS_FILE [--jobs N]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from asset_catalog import CACHE_DIR_NAME, CATALOG_FILE_NAME, CATALOG_VERSION, load_catalog, update_catalog
+from scan_rules import RULE_FIELDS
+
+
+def is_roots_file(path):
+    """
+    Returns True if a path names a roots file rather than a library root.
+    """
+    return os.path.isfile(path) and path.lower().endswith(".json")
+
+
+def load_roots(path):
+    """
+    Reads a roots file into a list of {"name", "path"} dicts with absolute paths.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    roots = []
+    names = set()
+    for item in config.get("roots", []):
+        if isinstance(item, str):
+            item = {"path": item}
+        root_path = os.path.abspath(os.path.join(base, os.path.expanduser(item["path"])))
+        name = item.get("name") or os.path.basename(root_path.rstrip(os.sep))
+        if "/" in name or name in names:
+            raise ValueError(f"Root names must be unique and contain no '/': {name!r}")
+        if name == CACHE_DIR_NAME:
+            raise ValueError(f"{CACHE_DIR_NAME!r} cannot be used as a root name")
+        names.add(name)
+        roots.append({**item, "name": name, "path": root_path})
+    if not roots:
+        raise ValueError(f"No roots listed in '{path}'")
+    return roots
+
+
+def catalog_path(root):
+    return os.path.join(root["path"], CACHE_DIR_NAME, CATALOG_FILE_NAME)
+
+
+def scan_rules_of(root):
+    return {field: root.get(field) for field in RULE_FIELDS}
+
+
+def _update_root(root):
+    start = time.perf_counter()
+    catalog = update_catalog(root["path"], scan_rules_of(root))
+    return root["name"], len(catalog["assets"]), time.perf_counter() - start
+
+
+def update_roots(roots, jobs=None):
+    """
+    Refreshes the catalog of every root, one worker process per root.
+
+    A root that fails to scan keeps its previous catalog. Returns the
+    names of the roots that failed.
+    """
+    failed = []
+    with ProcessPoolExecutor(max_workers=jobs or len(roots)) as executor:
+        futures = {executor.submit(_update_root, root): root["name"] for root in roots}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                _, count, seconds = future.result()
+            except Exception as error:
+                failed.append(name)
+                print(f"Failed to catalog root '{name}': {error}")
+                continue
+            print(f"Cataloged {count} assets in '{name}' in {seconds:.2f}s")
+    return failed
+
+
+def merge_catalogs(roots, catalogs):
+    """
+    Merges per-root catalogs into one, keyed by "<root name>/<path in root>".
+
+    Duplicate groups are named by a path in their root, so they get the
+    same prefix; otherwise groups of different roots would merge.
+    """
+    assets = {}
+    for root, catalog in zip(roots, catalogs):
+        name = root["name"]
+        for rel_path, entry in catalog["assets"].items():
+            merged = {**entry, "root": name}
+            if entry.get("dup_group"):
+                merged["dup_group"] = f"{name}/{entry['dup_group']}"
+            assets[f"{name}/{rel_path}"] = merged
+    updated = [catalog["updated"] for catalog in catalogs if catalog.get("updated")]
+    return {
+        "version": CATALOG_VERSION,
+        "roots": [{"name": root["name"], "path": root["path"]} for root in roots],
+        "updated": max(updated) if updated else None,
+        "assets": assets,
+    }
+
+
+def load_merged_catalog(roots):
+    """
+    Loads the saved catalog of every root and merges them.
+    """
+    return merge_catalogs(roots, [load_catalog(root["path"]) for root in roots])
+
+
+def load_library_catalog(path):
+    """
+    Loads the catalog of a library root, or the merged catalog of a roots file.
+    """
+    if is_roots_file(path):
+        return load_merged_catalog(load_roots(path))
+    return load_catalog(path)
+
+
+def resolve_asset(roots, key):
+    """
+    Splits a merged catalog key into (root, path in root), or returns
+    (None, None) if it names no configured root.
+    """
+    name, _, rel_path = key.partition("/")
+    for root in roots:
+        if root["name"] == name:
+            return root, rel_path
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the catalogs of every root in a roots file.")
+    parser.add_argument("roots_file", help="JSON file listing the library roots")
+    parser.add_argument("--jobs", type=int, help="Number of roots scanned at once (default: all)")
+    args = parser.parse_args()
+
+    roots = load_roots(args.roots_file)
+    start = time.perf_counter()
+    failed = update_roots(roots, args.jobs)
+    catalog = load_merged_catalog(roots)
+    elapsed = time.perf_counter() - start
+    print(f"Cataloged {len(catalog['assets'])} assets in {len(roots)} roots in {elapsed:.2f}s")
+    if failed:
+        raise SystemExit(f"Failed roots: {', '.join(sorted(failed))}")
+
+
+if __name__ == "__main__":
+    main()
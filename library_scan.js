@@ -0,0 +1,39 @@
+// library_scan.js
+// Directory walk for one library root, used inside scan_worker.js and on
+// the main thread when module workers cannot take directory handles.
+import { CACHE_DIR_NAME } from './library_cache.js';
+import { compileScanRules } from './scan_rules.js';
+import { typeFromName, sniffType } from './asset_types.js';
+
+// Asset files under `dirHandle` that pass the scan `rules` (see
+// scan_rules.js), as { name, relativePath, file, type }, in no particular
+// order. Rules are checked while walking, so excluded folders and folders
+// below max_depth are never opened. The cache folder is always skipped.
+export async function scanDirectory(dirHandle, { rules = null } = {}) {
+  const { entersFolder, acceptsFile, sniff } = compileScanRules(rules);
+  const files = [];
+
+  async function walk(dir, depth, pathPrefix) {
+    const subfolders = [];
+    const reads = [];
+    for await (const [name, handle] of dir.entries()) {
+      const relativePath = pathPrefix + name;
+      if (handle.kind === 'file') {
+        const type = typeFromName(name);
+        if ((!type && !sniff) || !acceptsFile(relativePath)) continue;
+        reads.push(handle.getFile().then(async file => {
+          // Only files with an unknown extension are read to sniff them
+          const fileType = type || await sniffType(file);
+          if (fileType) files.push({ name, relativePath, file, type: fileType });
+        }));
+      } else if (name !== CACHE_DIR_NAME && entersFolder(relativePath, depth + 1)) {
+        subfolders.push(walk(handle, depth + 1, `${relativePath}/`));
+      }
+    }
+    // Sibling folders and file stats are read concurrently
+    await Promise.all([...reads, ...subfolders]);
+  }
+
+  await walk(dirHandle, 0, '');
+  return files;
+}
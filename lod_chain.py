@@ -0,0 +1,289 @@
+"""
+Builds level-of-detail chains for GLB models.
+
+Each model gets decimated copies with about LOD_TRIANGLES triangles and
+textures no larger than LOD_TEXTURE_SIZES, coarsest first. The viewer shows
+the coarsest level at once and swaps in finer levels, ending with the
+original file, as they load.
+
+Geometry is simplified with ``gltfpack`` (meshoptimizer) when it is on PATH.
+Otherwise a built-in vertex-clustering simplifier is used: vertices are
+snapped to a grid sized to reach the target triangle count, and each grid
+cell keeps one of its vertices with all of its attributes. It is much
+slower and rougher than gltfpack, but fine for a first preview. Textures
+are downscaled with Pillow (pip install Pillow) when it is installed.
+
+Catalog field written:
+    "lods"  [{"file": cache path, "triangles": n}, ...], coarsest first
+
+Usage:
+    python lod_chain.py LIBRARY_ROOT [--jobs N] [--force]
+    python lod_chain.py --file model.glb --triangles 5000 --output model.lod.glb
+"""
+
+import argparse
+import io
+import math
+import os
+import shutil
+import subprocess
+import sys
+from array import array
+from functools import partial
+
+from asset_catalog import asset_path, cache_relative, derived_path, is_fresh, named_as_type, run_asset_batch
+from glb_io import BUFFER_EXTENSIONS, ELEMENT_ARRAY_BUFFER, FLOAT, UNSIGNED_INT, UNSIGNED_SHORT, GLBFile
+from model_metadata import MODE_TRIANGLES, primitive_triangles
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Target triangle counts of the generated levels; the original is the last level
+LOD_TRIANGLES = (5000, 50000)
+LOD_TEXTURE_SIZES = (512, 2048)
+# Levels within this factor of the original are not worth generating
+MIN_REDUCTION = 2
+# Grid resolution refinement passes of the built-in simplifier
+CLUSTER_PASSES = 3
+JPEG_QUALITY = 85
+
+
+def model_triangles(glb):
+    return sum(
+        primitive_triangles(glb.gltf, primitive)
+        for mesh in glb.gltf.get("meshes", [])
+        for primitive in mesh.get("primitives", [])
+        if "POSITION" in primitive.get("attributes", {})
+    )
+
+
+def cluster_triangles(positions, indices, resolution, bounds):
+    """
+    Snaps vertices to a resolution^3 grid over `bounds`, keeping the first
+    vertex of each cell, and returns the triangles that do not collapse as a
+    flat array of original vertex indices.
+    """
+    (min_x, min_y, min_z), (max_x, max_y, max_z) = bounds
+    scale_x = resolution / max(max_x - min_x, 1e-12)
+    scale_y = resolution / max(max_y - min_y, 1e-12)
+    scale_z = resolution / max(max_z - min_z, 1e-12)
+    top = resolution - 1
+    cells = {}
+    representative = array("I", bytes(4 * (len(positions) // 3)))
+    for vertex in range(len(positions) // 3):
+        x = min(top, int((positions[vertex * 3] - min_x) * scale_x))
+        y = min(top, int((positions[vertex * 3 + 1] - min_y) * scale_y))
+        z = min(top, int((positions[vertex * 3 + 2] - min_z) * scale_z))
+        representative[vertex] = cells.setdefault((x * resolution + y) * resolution + z, vertex)
+
+    triangles = array("I")
+    for i in range(0, len(indices) - 2, 3):
+        a = representative[indices[i]]
+        b = representative[indices[i + 1]]
+        c = representative[indices[i + 2]]
+        if a != b and b != c and a != c:
+            triangles.extend((a, b, c))
+    return triangles
+
+
+def simplify_primitive(glb, primitive, target):
+    """
+    Replaces a triangle primitive's geometry with a vertex-clustered version
+    of about `target` triangles. Returns False if it cannot be simplified.
+    """
+    gltf = glb.gltf
+    accessors = gltf["accessors"]
+    attributes = primitive.get("attributes", {})
+    position = attributes.get("POSITION")
+    if primitive.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or position is None:
+        return False
+    used = list(attributes.values()) + [a for t in primitive.get("targets", []) for a in t.values()]
+    if accessors[position]["componentType"] != FLOAT or any("sparse" in accessors[a] for a in used):
+        return False
+
+    positions = glb.accessor_values(position)
+    vertex_count = accessors[position]["count"]
+    if "indices" in primitive:
+        indices = glb.accessor_values(primitive["indices"])
+    else:
+        indices = array("I", range(vertex_count))
+    current = len(indices) // 3
+    if current <= target:
+        return False
+
+    bounds = (
+        [min(positions[axis::3]) for axis in range(3)],
+        [max(positions[axis::3]) for axis in range(3)],
+    )
+    # A surface keeps roughly 2 triangles per occupied cell, and occupied
+    # cells grow with the square of the resolution
+    resolution = max(2, int(math.sqrt(target / 2)))
+    best = None
+    for _ in range(CLUSTER_PASSES):
+        triangles = cluster_triangles(positions, indices, resolution, bounds)
+        if best is None or abs(len(triangles) // 3 - target) < abs(len(best) // 3 - target):
+            best = triangles
+        count = max(1, len(triangles) // 3)
+        if abs(count - target) < target * 0.15:
+            break
+        resolution = max(2, int(resolution * math.sqrt(target / count)))
+    if not best:
+        return False
+
+    # Keep only the representative vertices, renumbered in order
+    kept = sorted(set(best))
+    remap = {old: new for new, old in enumerate(kept)}
+
+    def compact(accessor_index):
+        accessor = accessors[accessor_index]
+        size = glb.element_size(accessor)
+        data = glb.accessor_bytes(accessor_index)
+        packed = b"".join(data[v * size:(v + 1) * size] for v in kept)
+        fields = {k: accessor[k] for k in ("normalized", "name") if k in accessor}
+        if accessor_index == position:
+            values = array("f")
+            values.frombytes(packed)
+            fields["min"] = [min(values[axis::3]) for axis in range(3)]
+            fields["max"] = [max(values[axis::3]) for axis in range(3)]
+        return glb.add_accessor(packed, accessor["componentType"], accessor["type"], len(kept), **fields)
+
+    primitive["attributes"] = {name: compact(index) for name, index in attributes.items()}
+    if "targets" in primitive:
+        primitive["targets"] = [{name: compact(index) for name, index in t.items()} for t in primitive["targets"]]
+    new_indices = array("I" if len(kept) > 65535 else "H", (remap[v] for v in best))
+    if sys.byteorder == "big":
+        new_indices.byteswap()
+    primitive["indices"] = glb.add_accessor(
+        new_indices.tobytes(), UNSIGNED_INT if new_indices.typecode == "I" else UNSIGNED_SHORT,
+        "SCALAR", len(new_indices), target=ELEMENT_ARRAY_BUFFER,
+    )
+    return True
+
+
+def simplify_model(glb, target):
+    """
+    Simplifies every primitive in proportion to its share of the triangles.
+    """
+    total = model_triangles(glb)
+    for mesh in glb.gltf.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            if "POSITION" not in primitive.get("attributes", {}):
+                continue
+            share = primitive_triangles(glb.gltf, primitive) / max(total, 1)
+            simplify_primitive(glb, primitive, max(12, int(target * share)))
+
+
+def downscale_textures(glb, max_size):
+    """
+    Re-encodes embedded images larger than max_size. Skipped without Pillow.
+    """
+    if Image is None:
+        return
+    for image_info in glb.gltf.get("images", []):
+        mime_type = image_info.get("mimeType")
+        if "bufferView" not in image_info or mime_type not in ("image/png", "image/jpeg"):
+            continue
+        with Image.open(io.BytesIO(bytes(glb.views[image_info["bufferView"]]))) as image:
+            if max(image.size) <= max_size:
+                continue
+            image.thumbnail((max_size, max_size))
+            output = io.BytesIO()
+            if mime_type == "image/jpeg":
+                image.convert("RGB").save(output, "JPEG", quality=JPEG_QUALITY)
+            else:
+                image.save(output, "PNG", optimize=True)
+        image_info["bufferView"] = glb.add_view(output.getvalue())
+
+
+def simplify_with_gltfpack(gltfpack, input_path, output_path, ratio):
+    temp_path = output_path + ".gltfpack.glb"
+    # -noq keeps plain float attributes, which every loader understands
+    command = [gltfpack, "-i", input_path, "-o", temp_path, "-si", f"{ratio:.6f}", "-noq"]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"gltfpack failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return temp_path
+
+
+def build_level(input_path, output_path, triangles, texture_size):
+    """
+    Writes one LOD of a GLB and returns its triangle count.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    gltfpack = shutil.which("gltfpack")
+    if gltfpack:
+        total = model_triangles(GLBFile.read(input_path))
+        with named_as_type(input_path, "glb") as named_path:
+            packed = simplify_with_gltfpack(gltfpack, named_path, output_path, triangles / max(total, 1))
+        try:
+            glb = GLBFile.read(packed)
+        finally:
+            os.remove(packed)
+    else:
+        glb = GLBFile.read(input_path)
+        simplify_model(glb, triangles)
+    downscale_textures(glb, texture_size)
+    glb.write(output_path)
+    return model_triangles(glb)
+
+
+def process_asset(root, rel_path, force=False):
+    """
+    Batch-mode worker: writes the LOD chain of one GLB and returns its
+    catalog fields. Draco- and meshopt-compressed models get no levels, as
+    their geometry cannot be rewritten.
+    """
+    source = asset_path(root, rel_path)
+    glb = GLBFile.read(source)
+    if glb.extensions_used() & BUFFER_EXTENSIONS:
+        return {"lods": []}
+    total = model_triangles(glb)
+    lods = []
+    for level, (triangles, texture_size) in enumerate(zip(LOD_TRIANGLES, LOD_TEXTURE_SIZES)):
+        if triangles * MIN_REDUCTION > total:
+            break
+        output = derived_path(root, "lods", rel_path, f".lod{level}.glb")
+        if force or not is_fresh(output, source):
+            count = build_level(source, output, triangles, texture_size)
+        else:
+            count = model_triangles(GLBFile.read(output))
+        lods.append({"file": cache_relative(root, output), "triangles": count})
+    return {"lods": lods}
+
+
+def generate_library_lods(root, jobs=None, force=False):
+    return run_asset_batch(
+        root, ("glb",), partial(process_asset, force=force),
+        jobs=jobs,
+        needs_update=None if force else (lambda entry: "lods" not in entry),
+        error_fields=("lods",), label="Building LOD chains for",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build decimated LOD chains for GLB models.")
+    parser.add_argument("root", nargs="?", help="Library root to process in batch mode")
+    parser.add_argument("--file", help="Simplify a single GLB instead of a library")
+    parser.add_argument("--triangles", type=int, default=LOD_TRIANGLES[0], help="Target triangles in single-file mode")
+    parser.add_argument("--texture-size", type=int, default=LOD_TEXTURE_SIZES[0],
+                        help="Largest texture size in single-file mode")
+    parser.add_argument("--output", help="GLB to write in single-file mode")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild levels that are up to date")
+    args = parser.parse_args()
+
+    if args.file:
+        output = args.output or os.path.splitext(args.file)[0] + ".lod.glb"
+        count = build_level(args.file, output, args.triangles, args.texture_size)
+        print(f"Wrote '{output}' with {count} triangles")
+    elif args.root:
+        failures = generate_library_lods(args.root, jobs=args.jobs, force=args.force)
+        sys.exit(1 if failures else 0)
+    else:
+        parser.error("either a library root or --file is required")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
 // main.js
 import * as AssetLoading from './asset_loading.js';
 import * as UI from './ui.js';
-import FBXViewer from './viewer_fbx.js';
+import { isPerfHudRequested, showPerfHud } from './perf_trace.js';
+import { isMemoryDiagnosticsRequested, enableMemoryDiagnostics } from './memory_diagnostics.js';
+
+if (isPerfHudRequested()) showPerfHud();
+if (isMemoryDiagnosticsRequested()) enableMemoryDiagnostics();
+
+// Cache the viewer's files for fast and offline reloads (see sw.js)
+if ('serviceWorker' in navigator && window.isSecureContext) {
+  navigator.serviceWorker.register(new URL('./sw.js', import.meta.url)).catch(error => {
+    console.warn('Service worker registration failed:', error);
+  });
+}
 
 // Initialize UI and set up event listeners
 UI.initializeUI().then(() => {
@@ -0,0 +1,249 @@
+// memory_diagnostics.js
+// Memory profiling mode: running counts of the resources the viewer holds
+// (object URLs, WebGL contexts, three.js geometries and textures, media
+// elements, tiles, cache sizes), broken down by asset type. Snapshots are
+// taken at every page flip so leaks show up as counts that keep growing.
+//
+// Enable with ?memory in the URL or localStorage.davMemory = '1'.
+
+const MAX_SNAPSHOTS = 50;
+const HUD_REFRESH_MS = 1000;
+// measureUserAgentSpecificMemory can take several seconds; sample it rarely
+const UA_MEMORY_INTERVAL_MS = 30000;
+
+const COLUMNS = [
+  ['tiles', 'tiles'],
+  ['urls', 'URLs'],
+  ['urlBytes', 'URL MB'],
+  ['media', 'media'],
+  ['contexts', 'GL ctx'],
+  ['geometries', 'geoms'],
+  ['textures', 'textures'],
+  ['cacheBytes', 'cache MB'],
+];
+const BYTE_COLUMNS = new Set(['urlBytes', 'cacheBytes']);
+
+let enabled = false;
+const liveURLs = new Map(); // object URL -> { type, bytes }
+const liveContexts = new Set(); // WeakRef of canvases with a WebGL context
+const sources = new Set();
+const snapshots = [];
+let uaMemory = null;
+let hud = null;
+
+export function isMemoryDiagnosticsRequested() {
+  return new URLSearchParams(location.search).has('memory') || localStorage.getItem('davMemory') === '1';
+}
+
+export function isMemoryDiagnosticsEnabled() {
+  return enabled;
+}
+
+// Register a function returning extra records to count, each
+// { type } or { element } (attributed to the tile it is in) plus counters
+// named as in COLUMNS. Sources cost nothing until diagnostics are enabled.
+export function registerMemorySource(sample) {
+  sources.add(sample);
+}
+
+function blobType(blob) {
+  const name = (blob.name || '').toLowerCase();
+  if (name.endsWith('.glb')) return 'glb';
+  if (name.endsWith('.fbx')) return 'fbx';
+  const mime = blob.type.split('/')[0];
+  return ['image', 'video', 'audio'].includes(mime) ? mime : 'other';
+}
+
+// Asset type of the tile an element is in
+function elementType(element) {
+  if (!element?.isConnected) return 'detached';
+  const tile = element.closest('.model-tile');
+  if (tile) return tile.dataset.modelType;
+  return element.closest('#fullscreenOverlay') ? 'fullscreen' : 'other';
+}
+
+function installHooks() {
+  const createObjectURL = URL.createObjectURL;
+  const revokeObjectURL = URL.revokeObjectURL;
+  URL.createObjectURL = function (object) {
+    const url = createObjectURL.call(URL, object);
+    if (object instanceof Blob) liveURLs.set(url, { type: blobType(object), bytes: object.size });
+    return url;
+  };
+  URL.revokeObjectURL = function (url) {
+    liveURLs.delete(url);
+    return revokeObjectURL.call(URL, url);
+  };
+
+  const getContext = HTMLCanvasElement.prototype.getContext;
+  const seen = new WeakSet();
+  HTMLCanvasElement.prototype.getContext = function (kind, ...args) {
+    const context = getContext.call(this, kind, ...args);
+    if (context && /webgl/.test(kind) && !seen.has(this)) {
+      seen.add(this);
+      const ref = new WeakRef(this);
+      liveContexts.add(ref);
+      this.addEventListener('webglcontextlost', () => liveContexts.delete(ref), { once: true });
+    }
+    return context;
+  };
+}
+
+function emptyRow() {
+  return Object.fromEntries(COLUMNS.map(([key]) => [key, 0]));
+}
+
+// Current counters as { type: { tiles, urls, ... } }
+export function sampleMemory() {
+  const rows = {};
+  const add = (type, counters) => {
+    const row = rows[type] || (rows[type] = emptyRow());
+    for (const [key, value] of Object.entries(counters)) row[key] = (row[key] || 0) + value;
+  };
+
+  for (const tile of document.querySelectorAll('.model-tile')) {
+    add(tile.dataset.modelType, { tiles: 1 });
+  }
+  for (const { type, bytes } of liveURLs.values()) {
+    add(type, { urls: 1, urlBytes: bytes });
+  }
+  // Only media elements in the document can be found; detached ones show
+  // up through their object URLs
+  for (const media of document.querySelectorAll('video, audio')) {
+    if (media.currentSrc || media.srcObject) add(elementType(media), { media: 1 });
+  }
+  for (const ref of liveContexts) {
+    const canvas = ref.deref();
+    if (!canvas) {
+      liveContexts.delete(ref);
+      continue;
+    }
+    add(elementType(canvas), { contexts: 1 });
+  }
+  for (const sample of sources) {
+    for (const { type, element, ...counters } of sample()) {
+      add(type || elementType(element), counters);
+    }
+  }
+  return rows;
+}
+
+async function sampleUserAgentMemory() {
+  // Needs a cross-origin isolated page; Chrome's performance.memory is the fallback
+  if (self.crossOriginIsolated && performance.measureUserAgentSpecificMemory) {
+    try {
+      const result = await performance.measureUserAgentSpecificMemory();
+      const breakdown = {};
+      for (const entry of result.breakdown) {
+        const key = entry.types.join('/') || 'unattributed';
+        breakdown[key] = (breakdown[key] || 0) + entry.bytes;
+      }
+      uaMemory = { bytes: result.bytes, breakdown, time: performance.now() };
+    } catch (error) {
+      console.warn('measureUserAgentSpecificMemory failed:', error);
+    }
+  } else if (performance.memory) {
+    uaMemory = { bytes: performance.memory.usedJSHeapSize, breakdown: { 'JS heap': performance.memory.usedJSHeapSize }, time: performance.now() };
+  }
+}
+
+export function takeMemorySnapshot(label = `snapshot ${snapshots.length + 1}`) {
+  const snapshot = { label, time: performance.now(), rows: sampleMemory(), uaMemory };
+  snapshots.push(snapshot);
+  if (snapshots.length > MAX_SNAPSHOTS) snapshots.shift();
+  return snapshot;
+}
+
+// Per-type change of every counter from snapshot `a` to snapshot `b`
+export function diffMemorySnapshots(a, b) {
+  const diff = {};
+  for (const type of new Set([...Object.keys(a.rows), ...Object.keys(b.rows)])) {
+    const before = a.rows[type] || emptyRow();
+    const after = b.rows[type] || emptyRow();
+    const row = {};
+    for (const [key] of COLUMNS) row[key] = (after[key] || 0) - (before[key] || 0);
+    if (Object.values(row).some(value => value !== 0)) diff[type] = row;
+  }
+  return diff;
+}
+
+// Called on page flips: snapshots the page being left and logs what changed
+// since the previous checkpoint
+export function memoryCheckpoint(label) {
+  if (!enabled) return;
+  const previous = snapshots[snapshots.length - 1];
+  const snapshot = takeMemorySnapshot(label);
+  if (previous) {
+    console.log(`[memory] ${previous.label} -> ${snapshot.label}`);
+    console.table(formatRows(diffMemorySnapshots(previous, snapshot)));
+  }
+  renderHud();
+}
+
+function formatRows(rows) {
+  const formatted = {};
+  for (const [type, row] of Object.entries(rows)) {
+    formatted[type] = Object.fromEntries(COLUMNS.map(([key, title]) => [
+      title, BYTE_COLUMNS.has(key) ? +(row[key] / 1048576).toFixed(1) : row[key],
+    ]));
+  }
+  return formatted;
+}
+
+function exportSnapshots() {
+  const blob = new Blob([JSON.stringify({ snapshots, current: takeMemorySnapshot('export') }, null, 1)], { type: 'application/json' });
+  const url = URL.createObjectURL(blob);
+  const link = document.createElement('a');
+  link.href = url;
+  link.download = `dav-memory-${new Date().toISOString().replace(/[:.]/g, '-')}.json`;
+  link.click();
+  setTimeout(() => URL.revokeObjectURL(url), 0);
+}
+
+function renderHud() {
+  if (!hud) return;
+  const rows = sampleMemory();
+  const baseline = snapshots[snapshots.length - 1];
+  const diff = baseline ? diffMemorySnapshots(baseline, { rows }) : {};
+  const header = COLUMNS.map(([, title]) => `<th>${title}</th>`).join('');
+  const body = Object.entries(formatRows(rows)).map(([type, row]) => {
+    const cells = COLUMNS.map(([key, title]) => {
+      const change = diff[type]?.[key] || 0;
+      const delta = change === 0 ? '' : ` <span class="memory-delta">${change > 0 ? '+' : ''}${
+        BYTE_COLUMNS.has(key) ? (change / 1048576).toFixed(1) : change}</span>`;
+      return `<td>${row[title]}${delta}</td>`;
+    }).join('');
+    return `<tr><td>${type}</td>${cells}</tr>`;
+  }).join('');
+  const heap = uaMemory
+    ? Object.entries(uaMemory.breakdown).map(([key, bytes]) => `${key} ${(bytes / 1048576).toFixed(1)} MB`).join(', ')
+    : 'not available';
+  hud.querySelector('table').innerHTML = `<thead><tr><th>type</th>${header}</tr></thead><tbody>${body}</tbody>`;
+  hud.querySelector('.memory-hud-heap').textContent = `Memory: ${heap}` +
+    (baseline ? ` (changes since ${baseline.label})` : '');
+}
+
+function showHud() {
+  hud = document.createElement('div');
+  hud.className = 'memory-hud';
+  hud.innerHTML = `
+    <table></table>
+    <div class="memory-hud-heap"></div>
+    <button type="button" class="memory-hud-snapshot">Snapshot</button>
+    <button type="button" class="memory-hud-export">Export</button>`;
+  hud.querySelector('.memory-hud-snapshot').addEventListener('click', () => memoryCheckpoint(`snapshot ${snapshots.length + 1}`));
+  hud.querySelector('.memory-hud-export').addEventListener('click', exportSnapshots);
+  document.body.appendChild(hud);
+  setInterval(renderHud, HUD_REFRESH_MS);
+  renderHud();
+}
+
+export function enableMemoryDiagnostics() {
+  if (enabled) return;
+  enabled = true;
+  installHooks();
+  sampleUserAgentMemory();
+  setInterval(sampleUserAgentMemory, UA_MEMORY_INTERVAL_MS);
+  showHud();
+  window.davMemory = { sample: sampleMemory, snapshot: takeMemorySnapshot, diff: diffMemorySnapshots, snapshots };
+}
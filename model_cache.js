@@ -0,0 +1,115 @@
+// model_cache.js
+// Parsed 3D models shared between tile and fullscreen viewers. Each viewer
+// gets a clone that shares geometry, materials and textures with the cached
+// original. Entries are reference counted, and unused ones are evicted,
+// least recently used first, once the cache is over its byte budget.
+import { clone as cloneSkinned } from 'three/addons/utils/SkeletonUtils.js';
+import { disposeObject } from './viewer_fbx.js';
+import { registerMemorySource } from './memory_diagnostics.js';
+
+// Maximum bytes of geometry and texture data kept for unused models
+export const MODEL_MEMORY_BUDGET = 256 * 1024 * 1024;
+
+// Rough GPU footprint of a model: vertex and index buffers plus RGBA textures
+function estimateBytes(object) {
+  const seen = new Set();
+  let bytes = 0;
+  const count = (item, size) => {
+    if (!item || seen.has(item)) return;
+    seen.add(item);
+    bytes += size(item);
+  };
+  object.traverse(child => {
+    const geometry = child.geometry;
+    if (geometry) {
+      for (const attribute of Object.values(geometry.attributes)) {
+        count(attribute.array, array => array.byteLength);
+      }
+      count(geometry.index?.array, array => array.byteLength);
+    }
+    const materials = Array.isArray(child.material) ? child.material : [child.material];
+    for (const material of materials) {
+      for (const value of Object.values(material || {})) {
+        if (value?.isTexture) {
+          count(value.image, image => (image.width || 0) * (image.height || 0) * 4);
+        }
+      }
+    }
+  });
+  return bytes;
+}
+
+class ModelCache {
+  constructor(maxBytes) {
+    this.maxBytes = maxBytes;
+    this.bytes = 0;
+    this.entries = new Map(); // key -> { promise, object, bytes, refs }, oldest first
+  }
+
+  // Resolves to { object, release } where `object` is a clone of the model
+  // stored under `key`, loaded with `load()` (a promise of an Object3D) if
+  // it is not cached. Call release() once the clone is no longer shown.
+  async acquire(key, load) {
+    let entry = this.entries.get(key);
+    if (entry) {
+      // Move to the most recently used position
+      this.entries.delete(key);
+    } else {
+      entry = { promise: null, object: null, bytes: 0, refs: 0 };
+      entry.promise = Promise.resolve().then(load).then(object => {
+        entry.object = object;
+        entry.bytes = estimateBytes(object);
+        this.bytes += entry.bytes;
+        this.evict();
+        return object;
+      });
+    }
+    this.entries.set(key, entry);
+    entry.refs++;
+
+    let object;
+    try {
+      object = await entry.promise;
+    } catch (error) {
+      entry.refs--;
+      if (this.entries.get(key) === entry) this.entries.delete(key);
+      throw error;
+    }
+    const copy = cloneSkinned(object);
+    copy.animations = object.animations;
+
+    let released = false;
+    const release = () => {
+      if (released) return;
+      released = true;
+      entry.refs--;
+      this.evict();
+    };
+    return { object: copy, release };
+  }
+
+  // Drop unused models until the cache fits its budget
+  evict() {
+    for (const [key, entry] of this.entries) {
+      if (this.bytes <= this.maxBytes) break;
+      if (entry.refs > 0 || !entry.object) continue;
+      this.entries.delete(key);
+      this.bytes -= entry.bytes;
+      disposeObject(entry.object);
+    }
+  }
+
+  clear() {
+    for (const [key, entry] of this.entries) {
+      if (entry.refs > 0 || !entry.object) continue;
+      this.entries.delete(key);
+      this.bytes -= entry.bytes;
+      disposeObject(entry.object);
+    }
+  }
+}
+
+export const modelCache = new ModelCache(MODEL_MEMORY_BUDGET);
+registerMemorySource(() => [{ type: 'model cache', cacheBytes: modelCache.bytes }]);
+
+export default ModelCache;
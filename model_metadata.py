@@ -0,0 +1,592 @@
+"""
+Extracts metadata from GLB and binary FBX models without loading them.
+
+GLB files are read up to the end of their JSON chunk: vertex and triangle
+counts come from accessor counts, and bounds from the POSITION accessor
+min/max transformed through the node hierarchy.
+
+FBX files are walked node record by node record, skipping subtrees that are
+not needed. Vertex counts come from array headers; only the polygon index
+and vertex arrays are decompressed, to count triangles and compute bounds.
+
+Results are stored under the "model" field of each catalog entry:
+    {
+        "format": "glb" | "fbx",
+        "vertices": int, "triangles": int, "meshes": int,
+        "materials": int, "textures": int,
+        "animations": [{"name": str, "duration": seconds}],
+        "bounds": {"min": [x, y, z], "max": [x, y, z]} | None
+    }
+
+The viewer uses the bounds to frame FBX models without measuring them.
+
+Usage:
+    python model_metadata.py LIBRARY_ROOT [--jobs N] [--force]
+    python model_metadata.py --file model.fbx
+"""
+
+import argparse
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+
+from asset_catalog import asset_path, detect_asset_type, run_asset_batch
+
+GLB_MAGIC = b"glTF"
+GLB_JSON_CHUNK = 0x4E4F534A
+FBX_BINARY_MAGIC = b"Kaydara FBX Binary  \x00"
+# FBX time units per second
+FBX_KTIME_SECOND = 46186158000
+
+# Scale applied to normalized integer accessor values, by glTF component type
+NORMALIZED_DIVISORS = {5120: 127, 5121: 255, 5122: 32767, 5123: 65535}
+
+# glTF primitive modes
+MODE_TRIANGLES = 4
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+
+# --- Matrix helpers (4x4, row-major nested lists, column vectors) ---
+
+IDENTITY = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+
+def mat_mul(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)]
+
+
+def mat_chain(*matrices):
+    result = IDENTITY
+    for matrix in matrices:
+        result = mat_mul(result, matrix)
+    return result
+
+
+def translation_matrix(x, y, z):
+    return [[1.0, 0.0, 0.0, x], [0.0, 1.0, 0.0, y], [0.0, 0.0, 1.0, z], [0.0, 0.0, 0.0, 1.0]]
+
+
+def scale_matrix(x, y, z):
+    return [[x, 0.0, 0.0, 0.0], [0.0, y, 0.0, 0.0], [0.0, 0.0, z, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+
+def axis_rotation_matrix(axis, degrees):
+    c = math.cos(math.radians(degrees))
+    s = math.sin(math.radians(degrees))
+    if axis == "X":
+        return [[1.0, 0.0, 0.0, 0.0], [0.0, c, -s, 0.0], [0.0, s, c, 0.0], [0.0, 0.0, 0.0, 1.0]]
+    if axis == "Y":
+        return [[c, 0.0, s, 0.0], [0.0, 1.0, 0.0, 0.0], [-s, 0.0, c, 0.0], [0.0, 0.0, 0.0, 1.0]]
+    return [[c, -s, 0.0, 0.0], [s, c, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+
+def euler_matrix(degrees_xyz, order):
+    """
+    Rotation matrix for Euler angles in degrees. `order` follows the three.js
+    convention: "ZYX" means the matrix Rz * Ry * Rx.
+    """
+    angles = dict(zip("XYZ", degrees_xyz))
+    return mat_chain(*(axis_rotation_matrix(axis, angles[axis]) for axis in order))
+
+
+def quaternion_matrix(x, y, z, w):
+    return [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w), 0.0],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w), 0.0],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y), 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+
+
+def transform_point(matrix, point):
+    x, y, z = point
+    return [matrix[i][0] * x + matrix[i][1] * y + matrix[i][2] * z + matrix[i][3] for i in range(3)]
+
+
+class Bounds:
+    """
+    Axis-aligned bounding box that grows to include transformed boxes.
+    """
+
+    def __init__(self):
+        self.min = [math.inf] * 3
+        self.max = [-math.inf] * 3
+
+    def add_box(self, box_min, box_max, matrix=IDENTITY):
+        for corner in ((x, y, z) for x in (box_min[0], box_max[0])
+                       for y in (box_min[1], box_max[1])
+                       for z in (box_min[2], box_max[2])):
+            point = transform_point(matrix, corner)
+            for axis in range(3):
+                self.min[axis] = min(self.min[axis], point[axis])
+                self.max[axis] = max(self.max[axis], point[axis])
+
+    def to_dict(self):
+        if self.min[0] == math.inf:
+            return None
+        return {"min": [round(v, 6) for v in self.min], "max": [round(v, 6) for v in self.max]}
+
+
+# --- GLB ---
+
+def read_glb_json(f):
+    """
+    Reads the JSON chunk of a GLB file without touching the binary chunk.
+    """
+    header = f.read(12)
+    if len(header) < 12:
+        raise ValueError("File is too short to be a GLB")
+    magic, version, _ = struct.unpack("<4sII", header)
+    if magic != GLB_MAGIC:
+        raise ValueError("Not a GLB file")
+    if version != 2:
+        raise ValueError(f"Unsupported glTF version {version}")
+    chunk_length, chunk_type = struct.unpack("<II", f.read(8))
+    if chunk_type != GLB_JSON_CHUNK:
+        raise ValueError("GLB does not start with a JSON chunk")
+    return json.loads(f.read(chunk_length).decode("utf-8"))
+
+
+def gltf_node_matrix(node):
+    if "matrix" in node:
+        m = node["matrix"]  # column-major
+        return [[m[0], m[4], m[8], m[12]], [m[1], m[5], m[9], m[13]],
+                [m[2], m[6], m[10], m[14]], [m[3], m[7], m[11], m[15]]]
+    t = node.get("translation", (0, 0, 0))
+    r = node.get("rotation", (0, 0, 0, 1))
+    s = node.get("scale", (1, 1, 1))
+    return mat_chain(translation_matrix(*t), quaternion_matrix(*r), scale_matrix(*s))
+
+
+def accessor_bounds(accessor):
+    box_min = accessor.get("min")
+    box_max = accessor.get("max")
+    if not box_min or not box_max:
+        return None
+    if accessor.get("normalized"):
+        divisor = NORMALIZED_DIVISORS.get(accessor.get("componentType"), 1)
+        box_min = [v / divisor for v in box_min]
+        box_max = [v / divisor for v in box_max]
+    return box_min[:3], box_max[:3]
+
+
+def primitive_triangles(gltf, primitive):
+    accessors = gltf.get("accessors", [])
+    mode = primitive.get("mode", MODE_TRIANGLES)
+    if "indices" in primitive:
+        count = accessors[primitive["indices"]]["count"]
+    else:
+        count = accessors[primitive["attributes"]["POSITION"]]["count"]
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(0, count - 2)
+    return 0
+
+
+def extract_glb_metadata(path):
+    with open(path, "rb") as f:
+        gltf = read_glb_json(f)
+
+    accessors = gltf.get("accessors", [])
+    meshes = gltf.get("meshes", [])
+    nodes = gltf.get("nodes", [])
+
+    vertices = 0
+    triangles = 0
+    for mesh in meshes:
+        for primitive in mesh.get("primitives", []):
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is not None:
+                vertices += accessors[position]["count"]
+                triangles += primitive_triangles(gltf, primitive)
+
+    # Bounds of every mesh instance in the default scene
+    bounds = Bounds()
+    scenes = gltf.get("scenes", [])
+    if scenes:
+        roots = scenes[gltf.get("scene", 0)].get("nodes", [])
+    else:
+        children = {child for node in nodes for child in node.get("children", [])}
+        roots = [i for i in range(len(nodes)) if i not in children]
+    stack = [(index, IDENTITY) for index in roots]
+    while stack:
+        index, parent_matrix = stack.pop()
+        node = nodes[index]
+        matrix = mat_mul(parent_matrix, gltf_node_matrix(node))
+        if "mesh" in node:
+            for primitive in meshes[node["mesh"]].get("primitives", []):
+                position = primitive.get("attributes", {}).get("POSITION")
+                box = accessor_bounds(accessors[position]) if position is not None else None
+                if box:
+                    bounds.add_box(box[0], box[1], matrix)
+        stack.extend((child, matrix) for child in node.get("children", []))
+
+    animations = []
+    for i, animation in enumerate(gltf.get("animations", [])):
+        duration = 0.0
+        for sampler in animation.get("samplers", []):
+            input_max = accessors[sampler["input"]].get("max")
+            if input_max:
+                duration = max(duration, input_max[0])
+        animations.append({"name": animation.get("name") or f"animation_{i}", "duration": round(duration, 4)})
+
+    return {
+        "format": "glb",
+        "vertices": vertices,
+        "triangles": triangles,
+        "meshes": len(meshes),
+        "materials": len(gltf.get("materials", [])),
+        "textures": len(gltf.get("textures", [])),
+        "animations": animations,
+        "bounds": bounds.to_dict(),
+    }
+
+
+# --- FBX ---
+
+class FBXNode:
+    __slots__ = ("name", "properties", "children")
+
+    def __init__(self, name, properties, children):
+        self.name = name
+        self.properties = properties
+        self.children = children
+
+    def child(self, name):
+        for node in self.children:
+            if node.name == name:
+                return node
+        return None
+
+
+class FBXArray:
+    """
+    An array property whose data is only decoded on demand.
+    """
+
+    __slots__ = ("type_code", "length", "encoding", "data")
+
+    TYPECODES = {"f": "f", "d": "d", "l": "q", "i": "i", "b": "b"}
+
+    def __init__(self, type_code, length, encoding, data):
+        self.type_code = type_code
+        self.length = length
+        self.encoding = encoding
+        self.data = data
+
+    def raw_bytes(self):
+        return zlib.decompress(self.data) if self.encoding == 1 else self.data
+
+    def decode(self):
+        values = array(self.TYPECODES[self.type_code])
+        values.frombytes(self.raw_bytes())
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+
+class FBXReader:
+    """
+    Reads the node records of a binary FBX file.
+
+    Only the subtrees listed in `wanted` (by path of node names) are parsed;
+    everything else is skipped using the record end offsets, so large
+    unrelated nodes are never read into memory.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        header = f.read(27)
+        if not header.startswith(FBX_BINARY_MAGIC):
+            raise ValueError("Not a binary FBX file (ASCII FBX is not supported)")
+        self.version = struct.unpack("<I", header[23:27])[0]
+        self.wide = self.version >= 7500
+        self.record_header = struct.Struct("<QQQB" if self.wide else "<IIIB")
+
+    def read_property(self):
+        code = self.f.read(1).decode("ascii")
+        if code == "Y":
+            return struct.unpack("<h", self.f.read(2))[0]
+        if code == "C":
+            return self.f.read(1) != b"\x00"
+        if code == "I":
+            return struct.unpack("<i", self.f.read(4))[0]
+        if code == "F":
+            return struct.unpack("<f", self.f.read(4))[0]
+        if code == "D":
+            return struct.unpack("<d", self.f.read(8))[0]
+        if code == "L":
+            return struct.unpack("<q", self.f.read(8))[0]
+        if code in "fdlib":
+            length, encoding, compressed_length = struct.unpack("<III", self.f.read(12))
+            return FBXArray(code, length, encoding, self.f.read(compressed_length))
+        if code in "SR":
+            length = struct.unpack("<I", self.f.read(4))[0]
+            data = self.f.read(length)
+            return data.decode("utf-8", "replace") if code == "S" else data
+        raise ValueError(f"Unknown FBX property type {code!r}")
+
+    def read_node(self, wanted, path=()):
+        """
+        Reads one node record, or returns None at the end of a node list.
+
+        Nodes outside the wanted paths come back without properties or children.
+        """
+        raw = self.f.read(self.record_header.size)
+        if len(raw) < self.record_header.size:
+            return None
+        end_offset, num_properties, property_list_length, name_length = self.record_header.unpack(raw)
+        if end_offset == 0:
+            return None
+        name = self.f.read(name_length).decode("ascii", "replace")
+        node_path = path + (name,)
+        if not any(node_path == w[:len(node_path)] for w in wanted):
+            self.f.seek(end_offset)
+            return FBXNode(name, [], [])
+
+        properties_start = self.f.tell()
+        properties = [self.read_property() for _ in range(num_properties)]
+        self.f.seek(properties_start + property_list_length)
+
+        children = []
+        while self.f.tell() < end_offset:
+            child = self.read_node(wanted, node_path)
+            if child is None:
+                break
+            children.append(child)
+        self.f.seek(end_offset)
+        return FBXNode(name, properties, children)
+
+    def read_top_level(self, wanted):
+        nodes = {}
+        while True:
+            node = self.read_node(wanted)
+            if node is None:
+                break
+            nodes[node.name] = node
+        return nodes
+
+
+def fbx_properties70(node):
+    """
+    Returns {name: values} from a node's Properties70 block.
+    """
+    result = {}
+    block = node.child("Properties70")
+    if block:
+        for p in block.children:
+            if p.name == "P" and p.properties:
+                result[p.properties[0]] = p.properties[4:]
+    return result
+
+
+# Three.js Euler orders matching FBX RotationOrder enum values (as FBXLoader)
+FBX_EULER_ORDERS = ["ZYX", "YZX", "XZY", "ZXY", "YXZ", "XYZ"]
+
+
+def fbx_model_matrix(props):
+    """
+    Local transform of an FBX Model, following FBXLoader's generateTransform:
+    pivots and offsets only move the origin, rotation and scale are applied
+    as they are.
+    """
+    order_index = props.get("RotationOrder", [0])[0]
+    order = FBX_EULER_ORDERS[order_index] if 0 <= order_index < len(FBX_EULER_ORDERS) else "ZYX"
+    translation = props.get("Lcl Translation", (0, 0, 0))
+    rotation = props.get("Lcl Rotation", (0, 0, 0))
+    scaling = props.get("Lcl Scaling", (1, 1, 1))
+    pre_rotation = props.get("PreRotation", (0, 0, 0))
+    post_rotation = props.get("PostRotation", (0, 0, 0))
+    rotation_offset = props.get("RotationOffset", (0, 0, 0))
+    rotation_pivot = props.get("RotationPivot", (0, 0, 0))
+    scaling_offset = props.get("ScalingOffset", (0, 0, 0))
+    scaling_pivot = props.get("ScalingPivot", (0, 0, 0))
+    # The inverse of a rotation is its transpose
+    post = euler_matrix(post_rotation, order)
+    post_inverse = [[post[j][i] for j in range(4)] for i in range(4)]
+    rotation_matrix = mat_chain(euler_matrix(pre_rotation, order), euler_matrix(rotation, order), post_inverse)
+    with_pivots = mat_chain(
+        translation_matrix(*translation),
+        translation_matrix(*rotation_offset),
+        translation_matrix(*rotation_pivot),
+        rotation_matrix,
+        translation_matrix(*(-v for v in rotation_pivot)),
+        translation_matrix(*scaling_offset),
+        translation_matrix(*scaling_pivot),
+        scale_matrix(*scaling),
+        translation_matrix(*(-v for v in scaling_pivot)),
+    )
+    origin = [row[3] for row in with_pivots[:3]]
+    return mat_chain(translation_matrix(*origin), rotation_matrix, scale_matrix(*scaling))
+
+
+def fbx_geometric_matrix(props):
+    return mat_chain(
+        translation_matrix(*props.get("GeometricTranslation", (0, 0, 0))),
+        euler_matrix(props.get("GeometricRotation", (0, 0, 0)), "ZYX"),
+        scale_matrix(*props.get("GeometricScaling", (1, 1, 1))),
+    )
+
+
+def count_negative_int32(raw):
+    """
+    Counts negative little-endian int32 values in raw bytes without decoding them.
+    """
+    high_bytes = raw[3::4]
+    return len(high_bytes) - len(high_bytes.translate(None, bytes(range(128, 256))))
+
+
+def extract_fbx_metadata(path):
+    wanted = [
+        ("Objects", "Geometry", "Vertices"),
+        ("Objects", "Geometry", "PolygonVertexIndex"),
+        ("Objects", "Model", "Properties70", "P"),
+        ("Objects", "AnimationStack", "Properties70", "P"),
+        ("Objects", "Material"),
+        ("Objects", "Texture"),
+        ("Connections", "C"),
+    ]
+    with open(path, "rb") as f:
+        top = FBXReader(f).read_top_level(wanted)
+
+    objects = top.get("Objects")
+    if objects is None:
+        raise ValueError("FBX file has no Objects section")
+
+    geometries = {}
+    models = {}
+    animations = []
+    materials = 0
+    textures = 0
+    vertices = 0
+    triangles = 0
+    for node in objects.children:
+        if node.name == "Geometry" and node.properties and node.properties[-1] == "Mesh":
+            vertex_node = node.child("Vertices")
+            index_node = node.child("PolygonVertexIndex")
+            if vertex_node is None or not vertex_node.properties:
+                continue
+            vertex_array = vertex_node.properties[0]
+            vertices += vertex_array.length // 3
+            if index_node is not None and index_node.properties:
+                index_array = index_node.properties[0]
+                polygons = count_negative_int32(index_array.raw_bytes())
+                triangles += index_array.length - 2 * polygons
+            geometries[node.properties[0]] = vertex_array
+        elif node.name == "Model" and node.properties:
+            models[node.properties[0]] = fbx_properties70(node)
+        elif node.name == "Material":
+            materials += 1
+        elif node.name == "Texture":
+            textures += 1
+        elif node.name == "AnimationStack" and len(node.properties) >= 2:
+            props = fbx_properties70(node)
+            start = props.get("LocalStart", [0])[0]
+            stop = props.get("LocalStop", [0])[0]
+            name = node.properties[1].split("\x00")[0]
+            animations.append({"name": name, "duration": round(max(0, stop - start) / FBX_KTIME_SECOND, 4)})
+
+    # Object -> parent links (object-object connections only)
+    parents = {}
+    connections = top.get("Connections")
+    if connections:
+        for c in connections.children:
+            if c.name == "C" and len(c.properties) >= 3 and c.properties[0] == "OO":
+                parents.setdefault(c.properties[1], c.properties[2])
+
+    world_matrices = {}
+
+    def world_matrix(model_id):
+        if model_id not in world_matrices:
+            local = fbx_model_matrix(models[model_id])
+            parent = parents.get(model_id)
+            if parent in models:
+                local = mat_mul(world_matrix(parent), local)
+            world_matrices[model_id] = local
+        return world_matrices[model_id]
+
+    bounds = Bounds()
+    for geometry_id, vertex_array in geometries.items():
+        model_id = parents.get(geometry_id)
+        if model_id not in models:
+            continue
+        positions = vertex_array.decode()
+        if not positions:
+            continue
+        box_min = [min(positions[axis::3]) for axis in range(3)]
+        box_max = [max(positions[axis::3]) for axis in range(3)]
+        matrix = mat_mul(world_matrix(model_id), fbx_geometric_matrix(models[model_id]))
+        bounds.add_box(box_min, box_max, matrix)
+
+    return {
+        "format": "fbx",
+        "vertices": vertices,
+        "triangles": triangles,
+        "meshes": len(geometries),
+        "materials": materials,
+        "textures": textures,
+        "animations": animations,
+        "bounds": bounds.to_dict(),
+    }
+
+
+def extract_metadata(path):
+    """
+    Extracts model metadata from a GLB or binary FBX file. Files without a
+    model extension are recognized by their content.
+    """
+    asset_type = detect_asset_type(path)
+    if asset_type == "glb":
+        return extract_glb_metadata(path)
+    if asset_type == "fbx":
+        return extract_fbx_metadata(path)
+    raise ValueError(f"Unsupported model format: {path}")
+
+
+def process_asset(root, rel_path):
+    """
+    Batch-mode worker: returns the catalog fields for one model.
+    """
+    return {"model": extract_metadata(asset_path(root, rel_path))}
+
+
+def extract_library_metadata(root, jobs=None, force=False):
+    """
+    Extracts metadata for every model in a library and records it in the catalog.
+
+    Catalog entries are reset when their file changes, so models that still
+    have a "model" field are up to date and skipped unless `force` is set.
+    """
+    return run_asset_batch(
+        root, ("glb", "fbx"), process_asset,
+        jobs=jobs,
+        needs_update=None if force else (lambda entry: "model" not in entry),
+        error_fields=("model",),
+        label="Extracting model metadata for",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract GLB/FBX metadata into the library catalog.")
+    parser.add_argument("root", nargs="?", help="Library root to process in batch mode")
+    parser.add_argument("--file", help="Print the metadata of a single model instead")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-extract models that already have metadata")
+    args = parser.parse_args()
+
+    if args.file:
+        print(json.dumps(extract_metadata(args.file), indent=2))
+    elif args.root:
+        failures = extract_library_metadata(args.root, jobs=args.jobs, force=args.force)
+        sys.exit(1 if failures else 0)
+    else:
+        parser.error("either a library root or --file is required")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+// perf_trace.js
+// Performance API instrumentation: spans are recorded as performance
+// marks/measures (visible in the browser's performance panel), checked
+// against a budget, optionally shown in an on-screen HUD, and can be
+// exported as a Chrome trace (chrome://tracing, Perfetto) to compare builds.
+//
+// Enable the HUD with ?perf in the URL or localStorage.davPerfHud = '1'.
+
+const PREFIX = 'dav:';
+const MAX_ENTRIES = 5000;
+const HUD_ROWS = 12;
+
+// Budgets in milliseconds; spans over budget are logged and highlighted
+export const PERF_BUDGETS = {
+  'folder-pick': 3000,
+  'folder-pick:scan': 1500,
+  'folder-pick:classify': 1000,
+  'folder-pick:sort': 50,
+  'folder-pick:index': 500,
+  'folder-pick:filter': 100,
+  'render-page': 50,
+  'first-tile': 1000,
+  'tile:image': 300,
+  'tile:video': 500,
+  'tile:audio': 300,
+  'tile:glb': 2000,
+  'tile:fbx': 3000,
+  'fbx-load': 3000,
+};
+
+const entries = [];
+const stats = new Map(); // name -> { count, total, max }
+let spanId = 0;
+let hud = null;
+let hudFrame = null;
+
+function record(measure, detail) {
+  const name = measure.name.slice(PREFIX.length);
+  entries.push({ name, start: measure.startTime, duration: measure.duration, detail });
+  if (entries.length > MAX_ENTRIES) entries.shift();
+
+  const stat = stats.get(name) || { count: 0, total: 0, max: 0 };
+  stat.count++;
+  stat.total += measure.duration;
+  stat.max = Math.max(stat.max, measure.duration);
+  stats.set(name, stat);
+
+  const budget = PERF_BUDGETS[name];
+  if (budget !== undefined && measure.duration > budget) {
+    console.warn(`[perf] ${name} took ${measure.duration.toFixed(1)} ms (budget ${budget} ms)`, detail || '');
+  }
+  scheduleHudUpdate();
+}
+
+// Start a span; call the returned function to end it. `detail` is attached
+// to the measure and to the exported trace event.
+export function startSpan(name, detail = null) {
+  const startMark = `${PREFIX}${name}#${++spanId}`;
+  performance.mark(startMark);
+  let ended = false;
+  return (endDetail = null) => {
+    if (ended) return;
+    ended = true;
+    const merged = endDetail ? { ...detail, ...endDetail } : detail;
+    const measure = performance.measure(`${PREFIX}${name}`, { start: startMark, detail: merged });
+    performance.clearMarks(startMark);
+    record(measure, merged);
+  };
+}
+
+// Time a sync or async function as one span
+export async function traceSpan(name, fn, detail = null) {
+  const end = startSpan(name, detail);
+  try {
+    return await fn();
+  } finally {
+    end();
+  }
+}
+
+// Record a span from an earlier performance.now() timestamp to now
+export function measureSince(name, startTime, detail = null) {
+  const measure = performance.measure(`${PREFIX}${name}`, { start: startTime, detail });
+  record(measure, detail);
+}
+
+export function getPerfEntries() {
+  return entries.slice();
+}
+
+// Chrome trace event format: complete ("X") events in microseconds
+export function exportTrace() {
+  return {
+    displayTimeUnit: 'ms',
+    metadata: {
+      userAgent: navigator.userAgent,
+      timeOrigin: performance.timeOrigin,
+      url: location.href,
+    },
+    traceEvents: entries.map(entry => ({
+      name: entry.name,
+      cat: entry.name.split(':')[0],
+      ph: 'X',
+      ts: Math.round(entry.start * 1000),
+      dur: Math.round(entry.duration * 1000),
+      pid: 1,
+      tid: 1,
+      args: entry.detail || {},
+    })),
+  };
+}
+
+export function downloadTrace() {
+  const blob = new Blob([JSON.stringify(exportTrace())], { type: 'application/json' });
+  const url = URL.createObjectURL(blob);
+  const link = document.createElement('a');
+  link.href = url;
+  link.download = `dav-trace-${new Date().toISOString().replace(/[:.]/g, '-')}.json`;
+  link.click();
+  setTimeout(() => URL.revokeObjectURL(url), 0);
+}
+
+function scheduleHudUpdate() {
+  if (!hud || hudFrame) return;
+  hudFrame = requestAnimationFrame(() => {
+    hudFrame = null;
+    renderHud();
+  });
+}
+
+function renderHud() {
+  const rows = [...stats.entries()]
+    .sort((a, b) => b[1].total - a[1].total)
+    .slice(0, HUD_ROWS)
+    .map(([name, stat]) => {
+      const budget = PERF_BUDGETS[name];
+      const over = budget !== undefined && stat.max > budget;
+      const average = stat.total / stat.count;
+      return `<tr class="${over ? 'over-budget' : ''}"><td>${name}</td><td>${stat.count}</td>` +
+        `<td>${average.toFixed(1)}</td><td>${stat.max.toFixed(1)}</td></tr>`;
+    });
+  hud.querySelector('tbody').innerHTML = rows.join('');
+}
+
+export function showPerfHud() {
+  if (hud) return;
+  hud = document.createElement('div');
+  hud.className = 'perf-hud';
+  hud.innerHTML = `
+    <table>
+      <thead><tr><th>span</th><th>n</th><th>avg ms</th><th>max ms</th></tr></thead>
+      <tbody></tbody>
+    </table>
+    <button type="button" class="perf-hud-export">Export trace</button>`;
+  hud.querySelector('.perf-hud-export').addEventListener('click', downloadTrace);
+  document.body.appendChild(hud);
+  renderHud();
+}
+
+export function isPerfHudRequested() {
+  return new URLSearchParams(location.search).has('perf') || localStorage.getItem('davPerfHud') === '1';
+}
+
+// For comparing builds from the console: davPerf.exportTrace()
+window.davPerf = { exportTrace, downloadTrace, getPerfEntries, showPerfHud, budgets: PERF_BUDGETS };
@@ -0,0 +1,104 @@
+// scan_rules.js
+// Include/exclude rules and a depth limit for library scans; the twin of
+// scan_rules.py, so the viewer and the indexer scan a root the same way.
+// Rules are { include: [glob], exclude: [glob], max_depth, sniff }, saved
+// per root; with `sniff`, files with a missing or unknown extension are
+// typed by their content (asset_types.js).
+//
+// "*" matches within a name, "?" one character, "**" any number of
+// folders. Patterns without a "/" match file and folder names anywhere,
+// patterns with one match the path from the root ("/build" only at the
+// top). A trailing "/" matches folders only. Case is ignored.
+
+export const RULE_FIELDS = ['include', 'exclude', 'max_depth', 'sniff'];
+
+function globToRegExp(pattern) {
+  let source = '';
+  for (let i = 0; i < pattern.length; i++) {
+    const char = pattern[i];
+    if (pattern.startsWith('**/', i)) {
+      source += '(?:.*/)?';
+      i += 2;
+    } else if (pattern.startsWith('**', i)) {
+      source += '.*';
+      i += 1;
+    } else if (char === '*') {
+      source += '[^/]*';
+    } else if (char === '?') {
+      source += '[^/]';
+    } else {
+      source += char.replace(/[.+^${}()|[\]\\]/g, '\\$&');
+    }
+  }
+  return new RegExp(`^${source}$`, 'i');
+}
+
+function compilePattern(pattern) {
+  const foldersOnly = pattern.endsWith('/');
+  const anchored = pattern.startsWith('/');
+  const body = anchored ? pattern.replace(/^\/+|\/+$/g, '') : pattern.replace(/\/+$/, '');
+  const regex = globToRegExp(body);
+  const onPath = anchored || body.includes('/');
+  return (relativePath, isFolder) => {
+    if (foldersOnly && !isFolder) return false;
+    if (!onPath) return regex.test(relativePath.slice(relativePath.lastIndexOf('/') + 1));
+    // "chars/**" and "**/cache/**" also cover the folder itself
+    return regex.test(relativePath) || (isFolder && regex.test(`${relativePath}/`));
+  };
+}
+
+// Rules without empty fields, as saved
+export function normalizeScanRules(rules) {
+  const normalized = {};
+  for (const field of RULE_FIELDS) {
+    const value = rules?.[field];
+    if (value != null && value !== false && !(Array.isArray(value) && value.length === 0)) normalized[field] = value;
+  }
+  return normalized;
+}
+
+// Compile rules into the checks the directory walk makes
+export function compileScanRules(rules) {
+  const include = (rules?.include || []).map(compilePattern);
+  const exclude = (rules?.exclude || []).map(compilePattern);
+  const maxDepth = rules?.max_depth ?? Infinity;
+  return {
+    sniff: Boolean(rules?.sniff),
+    // `depth` is the number of folder levels below the root
+    entersFolder: (relativePath, depth) =>
+      depth <= maxDepth && !exclude.some(matches => matches(relativePath, true)),
+    acceptsFile: (relativePath) =>
+      !exclude.some(matches => matches(relativePath, false)) &&
+      (include.length === 0 || include.some(matches => matches(relativePath, false)))
+  };
+}
+
+// Rules as one line for editing: "-**/cache/** -*.bak +*.fbx depth:3 sniff"
+export function formatScanRules(rules) {
+  return [
+    ...(rules?.exclude || []).map(pattern => `-${pattern}`),
+    ...(rules?.include || []).map(pattern => `+${pattern}`),
+    ...(rules?.max_depth != null ? [`depth:${rules.max_depth}`] : []),
+    ...(rules?.sniff ? ['sniff'] : [])
+  ].join(' ');
+}
+
+// Parse the format of formatScanRules(). Words without a prefix are
+// excludes, the common case ("-sniff" for a file named "sniff").
+export function parseScanRules(text) {
+  const rules = { include: [], exclude: [], max_depth: null, sniff: false };
+  for (const word of text.split(/\s+/).filter(Boolean)) {
+    const depth = /^depth:(\d+)$/i.exec(word);
+    if (depth) {
+      rules.max_depth = parseInt(depth[1]);
+    } else if (word.toLowerCase() === 'sniff') {
+      rules.sniff = true;
+    } else if (word.startsWith('+')) {
+      if (word.length > 1) rules.include.push(word.slice(1));
+    } else {
+      const pattern = word.startsWith('-') ? word.slice(1) : word;
+      if (pattern) rules.exclude.push(pattern);
+    }
+  }
+  return normalizeScanRules(rules);
+}
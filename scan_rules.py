@@ -0,0 +1,94 @@
+"""
+Include/exclude rules and a depth limit for library scans.
+
+This is the twin of scan_rules.js; both scanners apply the same rules while
+they walk the library, so an excluded folder is never opened. Rules are a
+dict, saved with each root (in its catalog, or in the roots file of
+library_roots.py):
+
+    {"include": ["*.fbx", "chars/**"], "exclude": ["**/cache/**", "*.bak", ".git"], "max_depth": 3, "sniff": true}
+
+Patterns use "*" (within a name), "?" and "**" (any number of folders).
+A pattern without a "/" is matched against file and folder names anywhere
+in the tree; one with a "/" is matched against the path from the root. A
+trailing "/" makes a pattern match folders only. Matching ignores case.
+Files must match one of the include patterns if there are any. max_depth
+is the number of folder levels below the root to scan (0: the root only).
+With "sniff", files with a missing or unknown extension are typed by their
+first bytes (see asset_catalog.sniff_asset_type).
+"""
+
+import re
+
+RULE_FIELDS = ("include", "exclude", "max_depth", "sniff")
+
+
+def glob_to_regex(pattern):
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile("^" + "".join(parts) + "$", re.IGNORECASE)
+
+
+class GlobPattern:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.folders_only = pattern.endswith("/")
+        pattern = pattern.strip("/") if pattern.startswith("/") else pattern.rstrip("/")
+        # Anchored patterns ("/build") and patterns with a folder part match paths
+        self.on_path = "/" in pattern or self.pattern.startswith("/")
+        self.regex = glob_to_regex(pattern)
+
+    def matches(self, rel_path, is_dir):
+        if self.folders_only and not is_dir:
+            return False
+        if not self.on_path:
+            return bool(self.regex.match(rel_path.rsplit("/", 1)[-1]))
+        # "chars/**" and "**/cache/**" also cover the folder itself
+        return bool(self.regex.match(rel_path) or (is_dir and self.regex.match(rel_path + "/")))
+
+
+class ScanRules:
+    """
+    Compiled scan rules. An empty dict (or None) accepts everything.
+    """
+
+    def __init__(self, rules=None):
+        rules = rules or {}
+        self.rules = {
+            field: rules[field] for field in RULE_FIELDS
+            if rules.get(field) is not None and rules[field] is not False and rules[field] != []
+        }
+        self.include = [GlobPattern(pattern) for pattern in rules.get("include") or ()]
+        self.exclude = [GlobPattern(pattern) for pattern in rules.get("exclude") or ()]
+        max_depth = rules.get("max_depth")
+        self.max_depth = float("inf") if max_depth is None else int(max_depth)
+        self.sniff = bool(rules.get("sniff"))
+
+    def enters_folder(self, rel_path, depth):
+        """
+        Returns True if the folder at `rel_path`, `depth` levels below the
+        root, should be scanned.
+        """
+        return depth <= self.max_depth and not any(pattern.matches(rel_path, True) for pattern in self.exclude)
+
+    def accepts_file(self, rel_path):
+        if any(pattern.matches(rel_path, False) for pattern in self.exclude):
+            return False
+        return not self.include or any(pattern.matches(rel_path, False) for pattern in self.include)
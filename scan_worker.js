@@ -0,0 +1,16 @@
+// scan_worker.js
+// Module worker that scans one library root, so listing a large folder
+// tree never blocks the page and several roots are scanned in parallel.
+// Messages:
+//   { handle, rules }  -> { files: [{ name, relativePath, file, type }] }
+//                        or { error }
+import { scanDirectory } from './library_scan.js';
+
+self.onmessage = async (event) => {
+  const { handle, ...options } = event.data;
+  try {
+    self.postMessage({ files: await scanDirectory(handle, options) });
+  } catch (error) {
+    self.postMessage({ error: error.message });
+  }
+};
@@ -0,0 +1,94 @@
+// search.js
+// Client for the asset search index. The index runs in search_worker.js when
+// module workers are available and on the main thread otherwise.
+import SearchIndex from './search_index.js';
+import { getCatalogEntry } from './library_cache.js';
+
+let worker = null;
+let localIndex = null;
+let indexedDocs = [];
+let requestId = 0;
+const pending = new Map();
+
+try {
+  worker = new Worker(new URL('./search_worker.js', import.meta.url), { type: 'module' });
+  worker.onmessage = (event) => {
+    const { type, id, ids, facets } = event.data;
+    if (type !== 'results') return;
+    const resolve = pending.get(id);
+    pending.delete(id);
+    resolve?.({ ids, facets });
+  };
+  worker.onerror = (error) => {
+    console.warn('Search worker failed, searching on the main thread:', error.message);
+    worker = null;
+    // Answer anything the worker dropped from the local index
+    for (const [id, resolve] of pending) resolve(null);
+    pending.clear();
+  };
+} catch (error) {
+  console.warn('Search worker unavailable, searching on the main thread:', error);
+  worker = null;
+}
+
+// Search document for one loaded asset, including catalog metadata if any
+function toSearchDoc(model, entry) {
+  const path = model.relativePath || model.name;
+  const slash = path.lastIndexOf('/');
+  const info = entry?.model;
+  // Duplicate groups are named by a path in their root, so two roots can
+  // both have a group "x.png"
+  const group = entry?.dup_group ? (model.root ? `${model.root}/${entry.dup_group}` : entry.dup_group) : null;
+  return {
+    path,
+    root: model.root || '',
+    type: model.type,
+    ext: model.name.slice(model.name.lastIndexOf('.') + 1).toLowerCase(),
+    size: model.file.size,
+    mtime: model.file.lastModified,
+    folder: slash >= 0 ? path.slice(0, slash) : '',
+    tris: info?.triangles ?? null,
+    verts: info?.vertices ?? null,
+    anim: info?.animations?.map(animation => animation.name).join(' ') || '',
+    group,
+    phash: entry?.phash || null
+  };
+}
+
+// (Re)build the index for a list of assets. Ids returned by searchAssets()
+// are positions in this list. Resolves to the search documents, in the same order.
+export async function indexAssets(models) {
+  const entries = await Promise.all(models.map(model => getCatalogEntry(model)));
+  // Keep the docs so the main thread can take over if the worker fails
+  indexedDocs = models.map((model, i) => toSearchDoc(model, entries[i]));
+  localIndex = null;
+  worker?.postMessage({ type: 'index', docs: indexedDocs });
+  return indexedDocs;
+}
+
+// Query that lists the assets similar to one asset. Paths are only unique
+// within a root, so the root is part of it.
+export function similarQuery(doc) {
+  return `similar:${encodeURIComponent(doc.root ? `${doc.root}/${doc.path}` : doc.path)}`;
+}
+
+function searchLocally(query) {
+  if (!localIndex) localIndex = new SearchIndex(indexedDocs);
+  return localIndex.search(query);
+}
+
+// Resolves to { ids, facets }, or null if a newer search was started before
+// this one finished
+export function searchAssets(query) {
+  const id = ++requestId;
+  if (!worker) {
+    return Promise.resolve(searchLocally(query));
+  }
+  return new Promise(resolve => {
+    pending.set(id, resolve);
+    worker.postMessage({ type: 'search', id, query });
+  }).then(result => {
+    if (id !== requestId) return null;
+    return result || searchLocally(query);
+  });
+}
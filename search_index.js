@@ -0,0 +1,488 @@
+// search_index.js
+// Trigram search index with facets over the loaded assets. Used inside
+// search_worker.js; the query language matches search_index.py.
+//
+// Query syntax - words must all appear in the path (or type); filters:
+//   type:fbx  ext:png  folder:chars/hero  anim:run
+//   size:>10mb  size:<500kb  size:1mb..5mb
+//   date:2024  date:2024-05  date:>2024-01-15
+//   tris:>10000  verts:<5000
+//   similar:<url-encoded path>  (same duplicate group or a close pHash,
+//                                from duplicates.py)
+//   root:hero                   (assets of one library root)
+
+export const SIZE_BUCKETS = [
+  { label: '<100 KB', max: 100 * 1024 },
+  { label: '100 KB-1 MB', max: 1024 ** 2 },
+  { label: '1-10 MB', max: 10 * 1024 ** 2 },
+  { label: '10-100 MB', max: 100 * 1024 ** 2 },
+  { label: '100 MB-1 GB', max: 1024 ** 3 },
+  { label: '>1 GB', max: Infinity }
+];
+
+const SIZE_UNITS = { b: 1, kb: 1024, mb: 1024 ** 2, gb: 1024 ** 3 };
+const TEXT_FILTERS = new Set(['type', 'ext', 'folder', 'anim', 'similar', 'root']);
+const NUMERIC_FILTERS = new Set(['size', 'date', 'tris', 'verts']);
+const MAX_FOLDER_FACETS = 20;
+// Years are stored as offsets from this year
+const BASE_YEAR = 1970;
+const EMPTY = new Uint32Array(0);
+// Default pHash radius for similar: queries - keep in sync with duplicates.py
+export const SIMILAR_DISTANCE = 12;
+// pHashes are split into this many 16-bit chunks for multi-index hashing
+const HASH_CHUNKS = 4;
+
+export function sizeBucket(size) {
+  return SIZE_BUCKETS.findIndex(bucket => size < bucket.max);
+}
+
+// Trigrams are packed into 30-bit integers (10 bits per character) so they
+// stay small-integer Map keys. Characters above U+03FF can collide, which
+// only adds candidates - matches() verifies every term against the text.
+function trigramsOf(text) {
+  const grams = new Set();
+  for (let i = 0; i + 3 <= text.length; i++) {
+    grams.add(
+      ((text.charCodeAt(i) & 0x3ff) << 20) |
+      ((text.charCodeAt(i + 1) & 0x3ff) << 10) |
+      (text.charCodeAt(i + 2) & 0x3ff)
+    );
+  }
+  return grams;
+}
+
+function parseSize(value) {
+  const match = /^(\d+(?:\.\d+)?)\s*(b|kb|mb|gb)?$/.exec(value);
+  return match ? parseFloat(match[1]) * SIZE_UNITS[match[2] || 'b'] : NaN;
+}
+
+// Parse a date filter value into a [start, end) range in ms
+function parseDateRange(value) {
+  const match = /^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$/.exec(value);
+  if (!match) return null;
+  const year = parseInt(match[1]);
+  if (match[3]) {
+    const start = Date.UTC(year, parseInt(match[2]) - 1, parseInt(match[3]));
+    return [start, start + 86400000];
+  }
+  if (match[2]) {
+    const month = parseInt(match[2]) - 1;
+    return [Date.UTC(year, month, 1), Date.UTC(year, month + 1, 1)];
+  }
+  return [Date.UTC(year, 0, 1), Date.UTC(year + 1, 0, 1)];
+}
+
+// Parse a numeric filter ("<5", ">5", "1..5", "5") into [min, max)
+function parseRange(field, value) {
+  const parse = field === 'size' ? parseSize : field === 'date' ? null : Number;
+  let op = '=';
+  if (value.startsWith('>') || value.startsWith('<')) {
+    op = value[0];
+    value = value.slice(1);
+  }
+
+  if (field === 'date') {
+    const range = parseDateRange(value);
+    if (!range) return null;
+    if (op === '>') return [range[1], Infinity];
+    if (op === '<') return [-Infinity, range[0]];
+    return range;
+  }
+
+  if (op === '=' && value.includes('..')) {
+    const [low, high] = value.split('..').map(parse);
+    return Number.isNaN(low) || Number.isNaN(high) ? null : [low, high];
+  }
+  const number = parse(value);
+  if (Number.isNaN(number)) return null;
+  if (op === '>') return [number + (field === 'size' ? 0 : 1), Infinity];
+  if (op === '<') return [-Infinity, number];
+  return [number, number + 1];
+}
+
+// similar: values are URL-encoded so paths with spaces stay one token
+function decodePath(value) {
+  try {
+    return decodeURIComponent(value);
+  } catch {
+    return value;
+  }
+}
+
+// Split a query into lower-case words and field filters
+export function parseQuery(query) {
+  const terms = [];
+  const filters = [];
+  for (const token of query.toLowerCase().split(/\s+/).filter(Boolean)) {
+    const colon = token.indexOf(':');
+    const field = colon > 0 ? token.slice(0, colon) : null;
+    const value = colon > 0 ? token.slice(colon + 1) : token;
+    if (field && TEXT_FILTERS.has(field) && value) {
+      filters.push({ field, value });
+    } else if (field && NUMERIC_FILTERS.has(field) && value) {
+      const range = parseRange(field, value);
+      if (range) filters.push({ field, range });
+    } else {
+      terms.push(token);
+    }
+  }
+  return { terms, filters };
+}
+
+function popcount(n) {
+  n = n - ((n >>> 1) & 0x55555555);
+  n = (n & 0x33333333) + ((n >>> 2) & 0x33333333);
+  return (((n + (n >>> 4)) & 0x0f0f0f0f) * 0x01010101) >>> 24;
+}
+
+const maskCache = new Map();
+
+// All 16-bit masks with at most `radius` bits set
+function chunkMasks(radius) {
+  let masks = maskCache.get(radius);
+  if (!masks) {
+    masks = [];
+    for (let mask = 0; mask < 0x10000; mask++) {
+      if (popcount(mask) <= radius) masks.push(mask);
+    }
+    maskCache.set(radius, masks);
+  }
+  return masks;
+}
+
+// Intersect two ascending id lists
+function intersect(a, b) {
+  const result = new Uint32Array(Math.min(a.length, b.length));
+  let i = 0, j = 0, n = 0;
+  while (i < a.length && j < b.length) {
+    if (a[i] === b[j]) { result[n++] = a[i]; i++; j++; }
+    else if (a[i] < b[j]) i++;
+    else j++;
+  }
+  return result.subarray(0, n);
+}
+
+class Dictionary {
+  constructor() {
+    this.codes = new Map();
+    this.labels = [];
+  }
+
+  code(label) {
+    let code = this.codes.get(label);
+    if (code === undefined) {
+      code = this.labels.length;
+      this.codes.set(label, code);
+      this.labels.push(label);
+    }
+    return code;
+  }
+}
+
+export class SearchIndex {
+  // docs: [{ path, root, type, ext, size, mtime (ms), folder, tris, verts,
+  //          anim, group, phash: [hex] }]
+  // A document's id is its position in `docs`.
+  constructor(docs) {
+    const count = docs.length;
+    this.count = count;
+    this.texts = new Array(count);
+    this.folders = new Array(count);
+    this.anims = new Array(count);
+    this.sizes = new Float64Array(count);
+    this.mtimes = new Float64Array(count);
+    this.tris = new Float64Array(count).fill(NaN);
+    this.verts = new Float64Array(count).fill(NaN);
+    this.typeCodes = new Uint16Array(count);
+    this.extCodes = new Uint16Array(count);
+    this.sizeBuckets = new Uint8Array(count);
+    this.years = new Uint8Array(count);
+    this.topFolderCodes = new Uint32Array(count);
+    this.rootCodes = new Uint16Array(count);
+    this.typeDict = new Dictionary();
+    this.extDict = new Dictionary();
+    this.folderDict = new Dictionary();
+    this.rootDict = new Dictionary();
+    this.allResult = null;
+    // Duplicate groups; code 0 means the asset has no duplicates
+    this.groupCodes = new Uint32Array(count);
+    this.groupDict = new Dictionary();
+    this.groupDict.code('');
+    // pHashes as 32-bit halves; those of doc i are hashStart[i]..hashStart[i + 1]
+    this.hashStart = new Uint32Array(count + 1);
+    const hashHi = [];
+    const hashLo = [];
+    // Built on the first similar: query
+    this.pathIds = null;
+    this.hashTables = null;
+
+    const postingLists = new Map();
+    docs.forEach((doc, id) => {
+      const text = `${doc.path} ${doc.type}`.toLowerCase();
+      this.texts[id] = text;
+      this.folders[id] = (doc.folder || '').toLowerCase();
+      this.anims[id] = (doc.anim || '').toLowerCase();
+      this.sizes[id] = doc.size;
+      this.mtimes[id] = doc.mtime;
+      if (doc.tris != null) this.tris[id] = doc.tris;
+      if (doc.verts != null) this.verts[id] = doc.verts;
+      this.typeCodes[id] = this.typeDict.code(doc.type);
+      this.extCodes[id] = this.extDict.code(doc.ext);
+      this.sizeBuckets[id] = sizeBucket(doc.size);
+      this.years[id] = Math.max(0, new Date(doc.mtime).getUTCFullYear() - BASE_YEAR);
+      this.topFolderCodes[id] = this.folderDict.code(doc.folder ? doc.folder.split('/')[0] : '');
+      this.rootCodes[id] = this.rootDict.code(doc.root || '');
+      this.groupCodes[id] = this.groupDict.code(doc.group || '');
+      for (const hash of doc.phash || []) {
+        hashHi.push(parseInt(hash.slice(0, 8), 16));
+        hashLo.push(parseInt(hash.slice(8, 16), 16));
+      }
+      this.hashStart[id + 1] = hashHi.length;
+
+      // Rolling version of trigramsOf(); checking the last id dedupes
+      // repeated trigrams without a per-document Set
+      let gram = ((text.charCodeAt(0) & 0x3ff) << 10) | (text.charCodeAt(1) & 0x3ff);
+      for (let i = 2; i < text.length; i++) {
+        gram = ((gram & 0xfffff) << 10) | (text.charCodeAt(i) & 0x3ff);
+        let list = postingLists.get(gram);
+        if (!list) {
+          list = [];
+          postingLists.set(gram, list);
+        }
+        if (list[list.length - 1] !== id) list.push(id);
+      }
+    });
+
+    this.hashHi = Uint32Array.from(hashHi);
+    this.hashLo = Uint32Array.from(hashLo);
+    this.hashDocs = new Uint32Array(hashHi.length);
+    for (let id = 0; id < count; id++) {
+      this.hashDocs.fill(id, this.hashStart[id], this.hashStart[id + 1]);
+    }
+
+    // Ids were added in order, so every list is already sorted
+    this.postings = new Map();
+    for (const [gram, list] of postingLists) {
+      this.postings.set(gram, Uint32Array.from(list));
+    }
+  }
+
+  // Candidate ids containing every trigram of every term, or null if no
+  // term is long enough to use the index
+  candidates(terms) {
+    const lists = [];
+    for (const term of terms) {
+      for (const gram of trigramsOf(term)) {
+        lists.push(this.postings.get(gram) || EMPTY);
+      }
+    }
+    if (lists.length === 0) return null;
+    // Intersecting the two rarest lists is enough to narrow the candidates;
+    // substring verification in matches() removes the remaining misses
+    lists.sort((a, b) => a.length - b.length);
+    return lists.length > 1 ? intersect(lists[0], lists[1]) : lists[0];
+  }
+
+  hashChunk(index, chunk) {
+    const half = chunk < 2 ? this.hashHi[index] : this.hashLo[index];
+    return chunk % 2 === 0 ? half >>> 16 : half & 0xffff;
+  }
+
+  // Multi-index hashing: one table per 16-bit chunk of the pHashes. Two
+  // hashes within distance d agree to within d / HASH_CHUNKS bits on at
+  // least one chunk, so only those table buckets need checking.
+  buildHashTables() {
+    this.hashTables = [];
+    for (let chunk = 0; chunk < HASH_CHUNKS; chunk++) {
+      const table = new Map();
+      for (let i = 0; i < this.hashHi.length; i++) {
+        const key = this.hashChunk(i, chunk);
+        let bucket = table.get(key);
+        if (!bucket) {
+          bucket = [];
+          table.set(key, bucket);
+        }
+        bucket.push(i);
+      }
+      this.hashTables.push(table);
+    }
+  }
+
+  // Hash indices within `distance` bits of hash `index`
+  nearHashes(index, distance, masks) {
+    const hi = this.hashHi[index];
+    const lo = this.hashLo[index];
+    const seen = new Set();
+    const found = [];
+    for (let chunk = 0; chunk < HASH_CHUNKS; chunk++) {
+      const key = this.hashChunk(index, chunk);
+      const table = this.hashTables[chunk];
+      for (const mask of masks) {
+        const bucket = table.get(key ^ mask);
+        if (!bucket) continue;
+        for (const other of bucket) {
+          if (seen.has(other)) continue;
+          seen.add(other);
+          if (popcount(hi ^ this.hashHi[other]) + popcount(lo ^ this.hashLo[other]) <= distance) {
+            found.push(other);
+          }
+        }
+      }
+    }
+    return found;
+  }
+
+  // Ids of the asset at `path` and of everything in its duplicate group or
+  // with a pHash within `distance` bits of one of its own
+  similarIds(path, distance = SIMILAR_DISTANCE) {
+    if (!this.pathIds) {
+      // Texts are "<path> <type>", already lower-cased. Paths are only
+      // unique within a root, so they are keyed as "<root>/<path>".
+      const roots = this.rootDict.labels.map(label => label && `${label.toLowerCase()}/`);
+      this.pathIds = new Map(this.texts.map((text, id) =>
+        [roots[this.rootCodes[id]] + text.slice(0, text.lastIndexOf(' ')), id]));
+    }
+    const id = this.pathIds.get(path);
+    if (id === undefined) return EMPTY;
+
+    const found = new Set([id]);
+    const group = this.groupCodes[id];
+    if (group !== 0) {
+      for (let other = 0; other < this.count; other++) {
+        if (this.groupCodes[other] === group) found.add(other);
+      }
+    }
+    if (this.hashStart[id] < this.hashStart[id + 1]) {
+      if (!this.hashTables) this.buildHashTables();
+      const masks = chunkMasks(Math.floor(distance / HASH_CHUNKS));
+      for (let i = this.hashStart[id]; i < this.hashStart[id + 1]; i++) {
+        for (const other of this.nearHashes(i, distance, masks)) found.add(this.hashDocs[other]);
+      }
+    }
+    return Uint32Array.from(found).sort();
+  }
+
+  // Build one predicate per filter so the per-document loop does no parsing
+  compileFilters(filters) {
+    return filters.map(filter => {
+      switch (filter.field) {
+        case 'type': {
+          const code = this.typeDict.codes.get(filter.value);
+          return id => this.typeCodes[id] === code;
+        }
+        case 'ext': {
+          const code = this.extDict.codes.get(filter.value.replace(/^\./, ''));
+          return id => this.extCodes[id] === code;
+        }
+        case 'folder': {
+          const prefix = filter.value.replace(/^\/+|\/+$/g, '');
+          return id => this.folders[id].startsWith(prefix);
+        }
+        case 'anim':
+          return id => this.anims[id].includes(filter.value);
+        case 'root': {
+          const code = this.rootDict.labels.findIndex(label => label.toLowerCase() === filter.value);
+          return id => this.rootCodes[id] === code;
+        }
+
+        default: {
+          const values = filter.field === 'size' ? this.sizes
+            : filter.field === 'date' ? this.mtimes
+            : filter.field === 'tris' ? this.tris : this.verts;
+          const [low, high] = filter.range;
+          // NaN (no metadata) fails every comparison
+          return id => values[id] >= low && values[id] < high;
+        }
+      }
+    });
+  }
+
+  matches(id, terms, predicates) {
+    const text = this.texts[id];
+    for (let i = 0; i < terms.length; i++) {
+      if (!text.includes(terms[i])) return false;
+    }
+    for (let i = 0; i < predicates.length; i++) {
+      if (!predicates[i](id)) return false;
+    }
+    return true;
+  }
+
+  countFacets(ids) {
+    const typeCounts = new Uint32Array(this.typeDict.labels.length);
+    const extCounts = new Uint32Array(this.extDict.labels.length);
+    const sizeCounts = new Uint32Array(SIZE_BUCKETS.length);
+    const folderCounts = new Uint32Array(this.folderDict.labels.length);
+    const rootCounts = new Uint32Array(this.rootDict.labels.length);
+    const yearCounts = new Uint32Array(256);
+    for (let i = 0; i < ids.length; i++) {
+      const id = ids[i];
+      typeCounts[this.typeCodes[id]]++;
+      extCounts[this.extCodes[id]]++;
+      sizeCounts[this.sizeBuckets[id]]++;
+      folderCounts[this.topFolderCodes[id]]++;
+      rootCounts[this.rootCodes[id]]++;
+      yearCounts[this.years[id]]++;
+    }
+
+    const toObject = (labels, counts, limit = Infinity) => Object.fromEntries(
+      labels.map((label, code) => [label, counts[code]])
+        .filter(([, n]) => n > 0)
+        .sort((a, b) => b[1] - a[1])
+        .slice(0, limit)
+    );
+    // Assets outside any root are not a facet value
+    const roots = toObject(this.rootDict.labels, rootCounts);
+    delete roots[''];
+    return {
+      type: toObject(this.typeDict.labels, typeCounts),
+      ext: toObject(this.extDict.labels, extCounts),
+      size: toObject(SIZE_BUCKETS.map(bucket => bucket.label), sizeCounts),
+      folder: toObject(this.folderDict.labels, folderCounts, MAX_FOLDER_FACETS),
+      date: Object.fromEntries(
+        [...yearCounts.entries()]
+          .filter(([, n]) => n > 0)
+          .reverse()
+          .map(([year, n]) => [String(BASE_YEAR + year), n])
+      ),
+      root: roots
+    };
+  }
+
+  // Returns { ids: Uint32Array (ascending), facets }
+  search(query) {
+    const { terms, filters } = parseQuery(query);
+    if (terms.length === 0 && filters.length === 0) {
+      // The unfiltered result is requested on every reset, so keep it
+      if (!this.allResult) {
+        const ids = new Uint32Array(this.count);
+        for (let id = 0; id < this.count; id++) ids[id] = id;
+        this.allResult = { ids, facets: this.countFacets(ids) };
+      }
+      return { ids: this.allResult.ids.slice(), facets: this.allResult.facets };
+    }
+    // similar: narrows the candidates instead of testing every document
+    const similar = filters.filter(filter => filter.field === 'similar');
+    const predicates = this.compileFilters(filters.filter(filter => filter.field !== 'similar'));
+    let candidates = this.candidates(terms);
+    for (const filter of similar) {
+      const ids = this.similarIds(decodePath(filter.value));
+      candidates = candidates ? intersect(candidates, ids) : ids;
+    }
+    const ids = new Uint32Array(candidates ? candidates.length : this.count);
+    let n = 0;
+    if (candidates) {
+      for (let i = 0; i < candidates.length; i++) {
+        if (this.matches(candidates[i], terms, predicates)) ids[n++] = candidates[i];
+      }
+    } else {
+      for (let id = 0; id < this.count; id++) {
+        if (this.matches(id, terms, predicates)) ids[n++] = id;
+      }
+    }
+    const result = ids.slice(0, n);
+    return { ids: result, facets: this.countFacets(result) };
+  }
+}
+
+export default SearchIndex;
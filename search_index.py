@@ -0,0 +1,324 @@
+"""
+Trigram search index with facets over an asset catalog.
+
+This is the server-side twin of search_index.js and accepts the same query
+language: words must all appear in the asset path (or type), and filters
+narrow the result further:
+
+    type:fbx  ext:png  folder:chars/hero  anim:run
+    size:>10mb  size:<500kb  size:1mb..5mb
+    date:2024  date:2024-05  date:>2024-01-15
+    tris:>10000  verts:<5000
+    similar:<url-encoded path>   same duplicate group or a close pHash
+                                 (see duplicates.py)
+    root:hero                    assets of one root of a multi-root
+                                 library (see library_roots.py)
+
+Usage:
+    python search_index.py LIBRARY_ROOT|ROOTS_FILE "hero type:fbx" [--limit N]
+"""
+
+import argparse
+import calendar
+import re
+import time
+from collections import Counter, defaultdict
+from urllib.parse import unquote
+
+from duplicates import SIMILAR_DISTANCE, BKTree
+from library_roots import load_library_catalog
+
+SIZE_BUCKETS = (
+    ("<100 KB", 100 * 1024),
+    ("100 KB-1 MB", 1024 ** 2),
+    ("1-10 MB", 10 * 1024 ** 2),
+    ("10-100 MB", 100 * 1024 ** 2),
+    ("100 MB-1 GB", 1024 ** 3),
+    (">1 GB", float("inf")),
+)
+
+SIZE_UNITS = {"b": 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+TEXT_FILTERS = ("type", "ext", "folder", "anim", "similar", "root")
+NUMERIC_FILTERS = ("size", "date", "tris", "verts")
+MAX_FOLDER_FACETS = 20
+
+SIZE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*(b|kb|mb|gb)?$")
+DATE_PATTERN = re.compile(r"^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$")
+
+
+def size_bucket(size):
+    for index, (_, limit) in enumerate(SIZE_BUCKETS):
+        if size < limit:
+            return index
+    return len(SIZE_BUCKETS) - 1
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def parse_size(value):
+    match = SIZE_PATTERN.match(value)
+    if not match:
+        return None
+    return float(match.group(1)) * SIZE_UNITS[match.group(2) or "b"]
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_date_range(value):
+    """
+    Parses a date filter value into a [start, end) range of UTC timestamps.
+    """
+    match = DATE_PATTERN.match(value)
+    if not match:
+        return None
+    year = int(match.group(1))
+    month = int(match.group(2) or 1)
+    day = int(match.group(3) or 1)
+    try:
+        start = calendar.timegm((year, month, day, 0, 0, 0))
+    except ValueError:
+        return None
+    if match.group(3):
+        end = start + 86400
+    elif match.group(2):
+        end = calendar.timegm((year + month // 12, month % 12 + 1, 1, 0, 0, 0))
+    else:
+        end = calendar.timegm((year + 1, 1, 1, 0, 0, 0))
+    return start, end
+
+
+def parse_range(field, value):
+    """
+    Parses a numeric filter ("<5", ">5", "1..5", "5") into a [min, max) range.
+    """
+    op = "="
+    if value[:1] in "<>":
+        op, value = value[0], value[1:]
+
+    if field == "date":
+        date_range = parse_date_range(value)
+        if date_range is None:
+            return None
+        if op == ">":
+            return date_range[1], float("inf")
+        if op == "<":
+            return float("-inf"), date_range[0]
+        return date_range
+
+    parse = parse_size if field == "size" else parse_number
+    if op == "=" and ".." in value:
+        low, high = (parse(part) for part in value.split("..", 1))
+        return None if low is None or high is None else (low, high)
+    number = parse(value)
+    if number is None:
+        return None
+    if op == ">":
+        return number + (0 if field == "size" else 1), float("inf")
+    if op == "<":
+        return float("-inf"), number
+    return number, number + 1
+
+
+def parse_query(query):
+    """
+    Splits a query into lower-case words and (field, value) filters.
+    """
+    terms = []
+    filters = []
+    for token in query.lower().split():
+        field, colon, value = token.partition(":")
+        if colon and field in TEXT_FILTERS and value:
+            filters.append((field, value))
+        elif colon and field in NUMERIC_FILTERS and value:
+            value_range = parse_range(field, value)
+            if value_range is not None:
+                filters.append((field, value_range))
+        else:
+            terms.append(token)
+    return terms, filters
+
+
+class SearchIndex:
+    """
+    In-memory index over the assets of a catalog.
+
+    Document ids are positions in `self.paths`. Each trigram maps to an
+    ascending list of the ids whose text contains it.
+    """
+
+    def __init__(self, catalog):
+        assets = catalog["assets"]
+        self.paths = sorted(assets)
+        self.entries = [assets[path] for path in self.paths]
+        self.texts = []
+        self.folders = []
+        self.anims = []
+        self.postings = {}
+        # Per-document columns, so filters and facet counts never touch the entries
+        self.columns = {field: [] for field in ("type", "ext", "size", "date", "tris", "verts", "size_bucket", "top_folder", "year", "root")}
+        columns = self.columns
+        for doc_id, entry in enumerate(self.entries):
+            text = f"{entry['path']} {entry['type']}".lower()
+            folder = entry["path"].rpartition("/")[0].lower()
+            model = entry.get("model") or {}
+            self.texts.append(text)
+            self.folders.append(folder)
+            self.anims.append(" ".join(animation["name"] for animation in model.get("animations") or []).lower())
+            columns["type"].append(entry["type"])
+            columns["ext"].append(entry["ext"])
+            columns["size"].append(entry["size"])
+            columns["date"].append(entry["mtime"])
+            columns["tris"].append(model.get("triangles"))
+            columns["verts"].append(model.get("vertices"))
+            columns["size_bucket"].append(SIZE_BUCKETS[size_bucket(entry["size"])][0])
+            columns["top_folder"].append(folder.split("/", 1)[0])
+            columns["year"].append(str(time.gmtime(entry["mtime"]).tm_year))
+            columns["root"].append(entry.get("root") or "")
+            for i in range(len(text) - 2):
+                ids = self.postings.setdefault(text[i:i + 3], [])
+                # Ids are added in order, so checking the last one dedupes
+                if not ids or ids[-1] != doc_id:
+                    ids.append(doc_id)
+        self.all_facets = None
+        # Built on the first similar: query
+        self.path_ids = None
+        self.hash_tree = None
+        self.groups = None
+
+    def candidates(self, terms):
+        """
+        Returns candidate ids containing the rarest trigrams of the terms, or
+        None if no term is long enough to use the index.
+        """
+        lists = [self.postings.get(gram, ()) for term in terms for gram in trigrams(term)]
+        if not lists:
+            return None
+        lists.sort(key=len)
+        if len(lists) == 1:
+            return lists[0]
+        # Substring verification removes anything the other trigrams would have
+        return sorted(set(lists[0]).intersection(lists[1]))
+
+    def similar_ids(self, path, distance=SIMILAR_DISTANCE):
+        """
+        Returns the ids of the asset at `path` and of everything in its
+        duplicate group or with a pHash within `distance` bits of its own.
+        """
+        if self.path_ids is None:
+            self.path_ids = {path.lower(): doc_id for doc_id, path in enumerate(self.paths)}
+            self.hash_tree = BKTree()
+            self.groups = defaultdict(list)
+            for doc_id, entry in enumerate(self.entries):
+                for value in entry.get("phash") or ():
+                    self.hash_tree.add(int(value, 16), doc_id)
+                if entry.get("dup_group"):
+                    self.groups[entry["dup_group"]].append(doc_id)
+        doc_id = self.path_ids.get(path.lower())
+        if doc_id is None:
+            return []
+        entry = self.entries[doc_id]
+        found = {doc_id}
+        found.update(self.groups.get(entry.get("dup_group"), ()))
+        for value in entry.get("phash") or ():
+            found.update(other for _, other in self.hash_tree.find(int(value, 16), distance))
+        return sorted(found)
+
+    def _apply_filter(self, field, value, ids):
+        """
+        Returns the ids that pass one filter. Each filter is a single list
+        comprehension, which is much faster than calling a predicate per id.
+        """
+        if field in ("type", "ext"):
+            column = self.columns[field]
+            value = value.lstrip(".")
+            return [doc_id for doc_id in ids if column[doc_id] == value]
+        if field == "root":
+            roots = self.columns["root"]
+            return [doc_id for doc_id in ids if roots[doc_id].lower() == value]
+        if field == "folder":
+            prefix = value.strip("/")
+            folders = self.folders
+            return [doc_id for doc_id in ids if folders[doc_id].startswith(prefix)]
+        if field == "anim":
+            anims = self.anims
+            return [doc_id for doc_id in ids if value in anims[doc_id]]
+        if field == "similar":
+            similar = set(self.similar_ids(unquote(value)))
+            return [doc_id for doc_id in ids if doc_id in similar]
+        column = self.columns[field]
+        low, high = value
+        # None (no metadata) never matches
+        return [doc_id for doc_id in ids if column[doc_id] is not None and low <= column[doc_id] < high]
+
+    def count_facets(self, ids):
+        def count(field):
+            # map() keeps the per-document loop in C
+            return Counter(map(self.columns[field].__getitem__, ids))
+
+        sizes = count("size_bucket")
+        roots = count("root")
+        roots.pop("", None)
+        return {
+            "type": dict(count("type").most_common()),
+            "ext": dict(count("ext").most_common()),
+            "size": {label: sizes[label] for label, _ in SIZE_BUCKETS if sizes[label]},
+            "folder": dict(count("top_folder").most_common(MAX_FOLDER_FACETS)),
+            "date": dict(sorted(count("year").items(), reverse=True)),
+            "root": dict(roots.most_common()),
+        }
+
+    def search(self, query):
+        """
+        Returns {"ids": [...], "facets": {...}} for a query. Ids are ascending,
+        i.e. in path order.
+        """
+        terms, filters = parse_query(query)
+        if not terms and not filters:
+            # The unfiltered result is requested on every reset, so keep it
+            if self.all_facets is None:
+                self.all_facets = self.count_facets(range(len(self.paths)))
+            return {"ids": list(range(len(self.paths))), "facets": self.all_facets}
+        ids = self.candidates(terms)
+        if ids is None:
+            # similar: gives a far smaller starting set than a full scan
+            similar = [value for field, value in filters if field == "similar"]
+            ids = self.similar_ids(unquote(similar[0])) if similar else range(len(self.paths))
+        texts = self.texts
+        for term in terms:
+            ids = [doc_id for doc_id in ids if term in texts[doc_id]]
+        for field, value in filters:
+            ids = self._apply_filter(field, value, ids)
+        ids = list(ids)
+        return {"ids": ids, "facets": self.count_facets(ids)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the catalog of an asset library.")
+    parser.add_argument("root", help="Library root folder, or a roots file (see library_roots.py)")
+    parser.add_argument("query", help="Search query, e.g. \"hero type:fbx size:>10mb\"")
+    parser.add_argument("--limit", type=int, default=20, help="Number of results to print")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SearchIndex(load_library_catalog(args.root))
+    print(f"Indexed {len(index.paths)} assets in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    result = index.search(args.query)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{len(result['ids'])} matches in {elapsed:.1f}ms")
+    for doc_id in result["ids"][:args.limit]:
+        print(f"  {index.paths[doc_id]}")
+    for field, counts in result["facets"].items():
+        print(f"{field}: " + ", ".join(f"{label} ({count})" for label, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
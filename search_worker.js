@@ -0,0 +1,19 @@
+// search_worker.js
+// Module worker that hosts the SearchIndex so indexing and queries never
+// block the page. Messages:
+//   { type: 'index', docs }         -> { type: 'indexed', count }
+//   { type: 'search', id, query }   -> { type: 'results', id, ids, facets }
+import SearchIndex from './search_index.js';
+
+let index = new SearchIndex([]);
+
+self.onmessage = (event) => {
+  const message = event.data;
+  if (message.type === 'index') {
+    index = new SearchIndex(message.docs);
+    self.postMessage({ type: 'indexed', count: index.count });
+  } else if (message.type === 'search') {
+    const { ids, facets } = index.search(message.query);
+    self.postMessage({ type: 'results', id: message.id, ids, facets }, [ids.buffer]);
+  }
+};
@@ -0,0 +1,223 @@
+"""
+Prometheus metrics and slow-operation tracing for the asset tools and server.
+
+Counters, gauges and histograms are kept in process and rendered in the
+Prometheus text exposition format, without a client library. Updating one
+is a dictionary lookup and an addition under a lock, cheap enough to leave
+on all the time.
+
+asset_server.py serves the metrics at /metrics. The batch tools (the
+indexer in asset_catalog.py, thumbnail_atlas.py and the other tools built on
+run_asset_batch) exit after each run, so set DAV_METRICS_FILE to have them
+write their metrics to that file, every few seconds while they run and on
+exit; point it into the node_exporter textfile collector directory, for
+example. Ratios such as the cache hit ratio are left to PromQL:
+
+    sum by (cache) (rate(dav_cache_requests_total{result="hit"}[5m]))
+      / sum by (cache) (rate(dav_cache_requests_total[5m]))
+
+Tracing: set DAV_TRACE_MS (asset_server.py also takes --trace MS) to log
+every directory scan, asset and HTTP request slower than that many
+milliseconds as one JSON object per line on stderr, with the path involved,
+which points at a slow network mount.
+"""
+
+import atexit
+import bisect
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+METRICS_FILE_ENV = "DAV_METRICS_FILE"
+TRACE_ENV = "DAV_TRACE_MS"
+METRICS_FILE_INTERVAL = 10.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a cached stat (sub-millisecond) up to a stalled mount
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "".join(metric.render() for metric in self.metrics)
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        if not self.labels and self.kind != "histogram":
+            self.values[()] = 0
+        registry.register(self)
+
+    def key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labels)
+
+    def header(self):
+        return f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+
+    def render(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        lines = [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}\n" for key, value in items]
+        return self.header() + "".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labels, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # Per-bucket counts (the last one is +Inf), sum
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        lines = []
+        names = self.labels + ("le",)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(names, key + (format_value(bound),))} {cumulative}\n")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}\n")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {cumulative}\n")
+        return self.header() + "".join(lines)
+
+
+# Shared by the tools and the server
+CACHE_REQUESTS = Counter(
+    "dav_cache_requests_total", "Lookups of derived data, by cache and hit or miss", ("cache", "result")
+)
+STAGE_SECONDS = Histogram("dav_stage_seconds", "Duration of complete pipeline stage runs", ("stage",))
+
+
+def parse_trace_threshold(value):
+    try:
+        return float(value) / 1000 if value not in (None, "") else None
+    except ValueError:
+        print(f"Ignoring invalid {TRACE_ENV}={value!r}", file=sys.stderr)
+        return None
+
+
+trace_threshold = parse_trace_threshold(os.environ.get(TRACE_ENV))
+
+
+def set_trace_threshold(milliseconds):
+    global trace_threshold
+    trace_threshold = None if milliseconds is None else milliseconds / 1000
+
+
+def trace(event, seconds, **fields):
+    """
+    Logs an operation that took `seconds` if tracing is on and it was slow.
+    """
+    if trace_threshold is None or seconds < trace_threshold:
+        return
+    record = {"event": event, "ms": round(seconds * 1000, 3), "time": round(time.time(), 3), **fields}
+    print(json.dumps(record, separators=(",", ":")), file=sys.stderr, flush=True)
+
+
+_metrics_file = os.environ.get(METRICS_FILE_ENV)
+_metrics_file_pid = os.getpid()
+_metrics_file_written = 0.0
+
+
+def write_metrics_file(path, registry=REGISTRY):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(temp_path, path)
+
+
+def flush_metrics_file(force=False):
+    """
+    Writes DAV_METRICS_FILE if it is set, at most every METRICS_FILE_INTERVAL
+    seconds unless `force`. Worker processes never write it.
+    """
+    global _metrics_file_written
+    if not _metrics_file or os.getpid() != _metrics_file_pid:
+        return
+    now = time.monotonic()
+    if force or now - _metrics_file_written >= METRICS_FILE_INTERVAL:
+        _metrics_file_written = now
+        try:
+            write_metrics_file(_metrics_file)
+        except OSError as error:
+            print(f"Failed to write metrics to '{_metrics_file}': {error}", file=sys.stderr)
+
+
+if _metrics_file:
+    atexit.register(flush_metrics_file, True)
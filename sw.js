@@ -0,0 +1,140 @@
+// sw.js
+// Service worker: serves the viewer's own files without the network after
+// the first visit.
+// - Packaged builds (create_zip.py) precache every bundle file listed in
+//   precache-manifest.json. The packager stamps the bundle version below, so
+//   a new build installs a new precache and the old one is deleted.
+// - Other files of the viewer (unpackaged checkouts) come from the network,
+//   falling back to a runtime copy when offline, so edits show up at once.
+// - CDN libraries are pinned versions; they are served from the runtime
+//   cache and revalidated in the background.
+// - /api/catalog from asset_server.py is stale-while-revalidate.
+// - Thumbnails and atlases under /library/.dav_cache/ go to a cache-first
+//   runtime cache that keeps only the most recently used entries.
+// Library files themselves are never cached; they are large and use Range
+// requests.
+
+const PRECACHE_VERSION = null;
+const PRECACHE_MANIFEST = 'precache-manifest.json';
+const PRECACHE_PREFIX = 'dav-precache-';
+// create_zip.ENTRY_FILE; navigations to the folder URL are answered with it
+const ENTRY_FILE = 'Digital_Asset_Viewer.html';
+const PRECACHE = PRECACHE_PREFIX + PRECACHE_VERSION;
+const RUNTIME_CACHE = 'dav-runtime';
+const CATALOG_CACHE = 'dav-catalog';
+const THUMBNAIL_CACHE = 'dav-thumbnails';
+const THUMBNAIL_CACHE_MAX_ENTRIES = 2000;
+
+const SCOPE_PATH = new URL(self.registration.scope).pathname;
+const CDN_HOSTS = new Set(['unpkg.com', 'cdnjs.cloudflare.com']);
+// Multi-root libraries (library_roots.py) serve each root under its name
+const THUMBNAIL_PATH = /\/library\/(?:[^/]+\/)?\.dav_cache\/(?:thumbs|atlases)\//;
+
+self.addEventListener('install', event => {
+  event.waitUntil((async () => {
+    if (PRECACHE_VERSION) {
+      const response = await fetch(`${PRECACHE_MANIFEST}?v=${PRECACHE_VERSION}`, { cache: 'no-store' });
+      const manifest = await response.json();
+      if (manifest.version !== PRECACHE_VERSION) {
+        throw new Error(`Precache manifest is version ${manifest.version}, expected ${PRECACHE_VERSION}`);
+      }
+      const cache = await caches.open(PRECACHE);
+      // Only bundle files: static hosts answer the folder URL with a 404 or
+      // a directory listing, either of which would break the install
+      await cache.addAll(manifest.files);
+    }
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener('activate', event => {
+  event.waitUntil((async () => {
+    for (const name of await caches.keys()) {
+      if (name.startsWith(PRECACHE_PREFIX) && name !== PRECACHE) await caches.delete(name);
+    }
+    // A new build replaces the runtime copies of the old one
+    if (PRECACHE_VERSION) await caches.delete(RUNTIME_CACHE);
+    await self.clients.claim();
+  })());
+});
+
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  if (request.method !== 'GET' || request.headers.has('Range')) return;
+  const url = new URL(request.url);
+
+  if (url.origin === location.origin) {
+    const path = url.pathname;
+    if (path === `${SCOPE_PATH}api/catalog`) {
+      event.respondWith(staleWhileRevalidate(event, CATALOG_CACHE));
+    } else if (THUMBNAIL_PATH.test(path)) {
+      event.respondWith(cacheFirstRecent(event));
+    } else if (!path.startsWith(`${SCOPE_PATH}api/`) && !path.startsWith(`${SCOPE_PATH}library/`) &&
+               path !== `${SCOPE_PATH}metrics`) {
+      event.respondWith(precachedOrNetwork(event));
+    }
+  } else if (CDN_HOSTS.has(url.hostname)) {
+    event.respondWith(staleWhileRevalidate(event, RUNTIME_CACHE));
+  }
+});
+
+async function precachedOrNetwork(event) {
+  if (PRECACHE_VERSION) {
+    const isFolder = event.request.mode === 'navigate' && new URL(event.request.url).pathname === SCOPE_PATH;
+    const request = isFolder ? new URL(ENTRY_FILE, self.registration.scope).href : event.request;
+    const cached = await caches.match(request, { cacheName: PRECACHE, ignoreSearch: true });
+    if (cached) return cached;
+  }
+  const cache = await caches.open(RUNTIME_CACHE);
+  try {
+    const response = await fetch(event.request);
+    if (response.ok) event.waitUntil(cache.put(event.request, response.clone()));
+    return response;
+  } catch (error) {
+    const cached = await cache.match(event.request, { ignoreSearch: true });
+    if (cached) return cached;
+    throw error;
+  }
+}
+
+// Answer from the cache when possible and refresh the entry in the
+// background; wait for the network only on a miss
+async function staleWhileRevalidate(event, cacheName) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(event.request);
+  const network = fetch(event.request).then(response => {
+    if (response.ok || response.type === 'opaque') {
+      return cache.put(event.request, response.clone()).then(() => response);
+    }
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+  }
+  return network;
+}
+
+// Cache-first with least-recently-used eviction. Cache.keys() lists entries
+// in insertion order, so a hit is re-inserted to mark it as recently used.
+async function cacheFirstRecent(event) {
+  const cache = await caches.open(THUMBNAIL_CACHE);
+  const cached = await cache.match(event.request);
+  if (cached) {
+    const copy = cached.clone();
+    event.waitUntil(cache.delete(event.request).then(() => cache.put(event.request, copy)));
+    return cached;
+  }
+  const response = await fetch(event.request);
+  if (response.ok) {
+    event.waitUntil(cache.put(event.request, response.clone()).then(() => trimCache(cache)));
+  }
+  return response;
+}
+
+async function trimCache(cache) {
+  const keys = await cache.keys();
+  for (const key of keys.slice(0, Math.max(0, keys.length - THUMBNAIL_CACHE_MAX_ENTRIES))) {
+    await cache.delete(key);
+  }
+}
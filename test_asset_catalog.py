@@ -0,0 +1,71 @@
+import os
+
+from asset_catalog import (
+    detect_asset_type, get_asset_type, named_as_type, sniff_asset_type, update_asset_fields, update_catalog,
+)
+from benchmark import write_fbx, write_glb
+from model_metadata import extract_metadata
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_types_by_extension():
+    assert get_asset_type("Hero.FBX") == "fbx"
+    assert get_asset_type("sky.exr") == "hdr"
+    assert get_asset_type("scan.tiff") == "image"
+    assert get_asset_type("notes.txt") is None
+    assert get_asset_type("README") is None
+
+
+def test_sniffing_by_magic_bytes(tmp_path):
+    assert sniff_asset_type(write(tmp_path / "a", b"\x89PNG\r\n\x1a\n....")) == "image"
+    assert sniff_asset_type(write(tmp_path / "b", b"RIFF\x00\x00\x00\x00WAVEfmt ")) == "audio"
+    assert sniff_asset_type(write(tmp_path / "c", b"RIFF\x00\x00\x00\x00WEBPVP8 ")) == "image"
+    assert sniff_asset_type(write(tmp_path / "d", b"\x00\x00\x00\x18ftypmp42")) == "video"
+    assert sniff_asset_type(write(tmp_path / "g", b"plain text")) is None
+    assert sniff_asset_type(write(tmp_path / "e", b"#?RADIANCE\n")) == "hdr"
+    assert sniff_asset_type(str(tmp_path / "missing")) is None
+    # The extension wins over the content
+    assert detect_asset_type(write(tmp_path / "f.glb", b"#?RADIANCE\n")) == "glb"
+
+
+def test_catalog_sniffs_only_when_asked(tmp_path):
+    write(tmp_path / "model.bin", b"glTF" + bytes(8))
+    write(tmp_path / "sub" / "pic", b"\xff\xd8\xff\xe0")
+    write(tmp_path / "notes.txt", b"hello")
+    assert update_catalog(str(tmp_path))["assets"] == {}
+    assets = update_catalog(str(tmp_path), {"sniff": True})["assets"]
+    assert {path: entry["type"] for path, entry in assets.items()} == {"model.bin": "glb", "sub/pic": "image"}
+
+
+def test_named_as_type_links_files_without_the_extension(tmp_path):
+    named = write(tmp_path / "model.glb", b"glTF")
+    with named_as_type(named, "glb") as path:
+        assert path == named
+    sniffed = write(tmp_path / "model", b"Kaydara")
+    with named_as_type(sniffed, "fbx") as path:
+        assert path.endswith(".fbx")
+        with open(path, "rb") as f:
+            assert f.read() == b"Kaydara"
+    assert not os.path.exists(path)
+    assert os.path.exists(sniffed)
+
+
+def test_sniffed_models_get_metadata(tmp_path):
+    write_glb(str(tmp_path / "cube"), 1.0, (0, 0, 0))
+    write_fbx(str(tmp_path / "cube.bin"), 1.0, 1)
+    assert extract_metadata(str(tmp_path / "cube"))["format"] == "glb"
+    assert extract_metadata(str(tmp_path / "cube.bin"))["format"] == "fbx"
+
+
+def test_unchanged_files_keep_tool_fields(tmp_path):
+    write(tmp_path / "a.png", b"\x89PNG")
+    update_catalog(str(tmp_path))
+    update_asset_fields(str(tmp_path), {"a.png": {"phash": ["00"]}, "gone.png": {"phash": ["11"]}})
+    assert update_catalog(str(tmp_path))["assets"]["a.png"]["phash"] == ["00"]
+    write(tmp_path / "a.png", b"\x89PNG changed")
+    assert "phash" not in update_catalog(str(tmp_path))["assets"]["a.png"]
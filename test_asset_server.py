@@ -0,0 +1,65 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from asset_catalog import update_catalog
+from asset_server import LibraryState, make_handler, parse_byte_range
+
+
+def test_parse_byte_range():
+    assert parse_byte_range(None, 100) is None
+    assert parse_byte_range("bytes=10-19", 100) == (10, 19)
+    assert parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert parse_byte_range("bytes=-5", 100) == (95, 99)
+    assert parse_byte_range("bytes=0-500", 100) == (0, 99)
+    assert parse_byte_range("bytes=1-2,4-5", 100) is None
+    with pytest.raises(ValueError):
+        parse_byte_range("bytes=100-", 100)
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("library")
+    (tmp_path / "art").mkdir()
+    (tmp_path / "art" / "hero.png").write_bytes(bytes(range(100)))
+    update_catalog(str(tmp_path))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(LibraryState(str(tmp_path))))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url, method="GET", headers=None):
+    request = urllib.request.Request(url, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, b""
+
+
+@pytest.mark.parametrize("path", ["/", "/main.js", "/styles.css", "/scan_worker.js", "/main.js?v=2"])
+def test_viewer_files_are_served(server, path):
+    assert get(server + path)[0] == 200
+
+
+@pytest.mark.parametrize("path", [
+    "/.git/config", "/asset_server.py", "/requests.jsonl", "/vendor/.downloads/x", "/%2e%2e/etc/passwd",
+])
+def test_other_files_are_not_served(server, path):
+    assert get(server + path)[0] == 404
+    assert get(server + path, method="HEAD")[0] == 404
+
+
+def test_api_and_library_files(server):
+    status, body = get(server + "/api/search?q=hero")
+    assert status == 200
+    assert [entry["path"] for entry in json.loads(body)["results"]] == ["art/hero.png"]
+    assert get(server + "/library/art/hero.png", headers={"Range": "bytes=10-12"}) == (206, bytes([10, 11, 12]))
+    assert get(server + "/library/../asset_server.py")[0] in (403, 404)
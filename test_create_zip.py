@@ -0,0 +1,19 @@
+import json
+import os
+import re
+
+from create_zip import ENTRY_FILE, PRECACHE_MANIFEST_FILE, SERVICE_WORKER_FILE, bundle_sources, stamp_precache
+
+
+def test_precache_lists_the_bundle_files_only():
+    folder = "bundle"
+    file_contents = {os.path.join(folder, *path.split("/")): text for path, text in bundle_sources().items()}
+    version = stamp_precache(file_contents, {"three/three.module.js": b"x"}, folder)
+    manifest = json.loads(file_contents[os.path.join(folder, PRECACHE_MANIFEST_FILE)])
+    assert manifest["version"] == version
+    # The folder URL is mapped to the entry page by the service worker
+    assert ENTRY_FILE in manifest["files"] and "./" not in manifest["files"]
+    assert SERVICE_WORKER_FILE not in manifest["files"]
+    service_worker = file_contents[os.path.join(folder, SERVICE_WORKER_FILE)]
+    assert f'const PRECACHE_VERSION = "{version}";' in service_worker
+    assert re.search(r"^const ENTRY_FILE = '([^']+)';$", service_worker, re.M).group(1) == ENTRY_FILE
@@ -0,0 +1,74 @@
+import random
+
+from duplicates import (
+    DUPLICATE_DISTANCE, HASH_IMAGE_SIZE, BKTree, dct_hash, find_similar, format_hash, full_hash, group_duplicates,
+    hamming, quick_hash,
+)
+
+
+def test_bk_tree_matches_a_linear_scan():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    # Near copies, so small radii find something
+    values += [value ^ (1 << rng.randrange(64)) for value in values[:50]]
+    tree = BKTree()
+    for item, value in enumerate(values):
+        tree.add(value, item)
+    assert tree.count == len(values)
+    for query in values[:20] + [rng.getrandbits(64) for _ in range(5)]:
+        for radius in (0, 1, 6, 20):
+            expected = sorted((hamming(query, value), item) for item, value in enumerate(values)
+                              if hamming(query, value) <= radius)
+            assert sorted(tree.find(query, radius)) == expected
+
+
+def test_bk_tree_keeps_equal_values_together():
+    tree = BKTree()
+    tree.add(5, "a")
+    tree.add(5, "b")
+    assert sorted(tree.find(5, 0)) == [(0, "a"), (0, "b")]
+    assert BKTree().find(5, 64) == []
+
+
+def test_dct_hash_ignores_brightness_but_not_structure():
+    size = HASH_IMAGE_SIZE
+    rng = random.Random(3)
+    image = [rng.randrange(200) for _ in range(size * size)]
+    brighter = [value + 40 for value in image]
+    flipped = [image[y * size + size - 1 - x] for y in range(size) for x in range(size)]
+    assert hamming(dct_hash(image), dct_hash(brighter)) <= DUPLICATE_DISTANCE
+    assert hamming(dct_hash(image), dct_hash(flipped)) > DUPLICATE_DISTANCE
+    assert len(format_hash(dct_hash(image))) == 16
+
+
+def test_quick_and_full_hashes(tmp_path):
+    a = tmp_path / "a.bin"
+    b = tmp_path / "b.bin"
+    # Same head and tail blocks, different middle
+    a.write_bytes(bytes(200 * 1024))
+    b.write_bytes(bytes(100 * 1024) + b"x" + bytes(100 * 1024 - 1))
+    assert quick_hash(str(a), 200 * 1024) == quick_hash(str(b), 200 * 1024)
+    assert full_hash(str(a)) != full_hash(str(b))
+
+
+def test_group_duplicates_joins_hashes_and_close_phashes():
+    groups = group_duplicates({"assets": {
+        "b.png": {"hash": "h1"},
+        "a.png": {"hash": "h1"},
+        "c.png": {"phash": [format_hash(0b1111)]},
+        # 2 bits from c.png
+        "d.png": {"phash": [format_hash(0b0011)]},
+        "e.png": {"phash": [format_hash(2 ** 64 - 1)]},
+    }})
+    assert groups == {"a.png": "a.png", "b.png": "a.png", "c.png": "c.png", "d.png": "c.png"}
+
+
+def test_find_similar_lists_the_closest_first():
+    library = {"assets": {
+        "a.png": {"hash": "h1", "phash": [format_hash(0)]},
+        "copy.png": {"hash": "h1"},
+        "near.png": {"phash": [format_hash(0b111)]},
+        "far.png": {"phash": [format_hash(2 ** 40 - 1)]},
+    }}
+    assert find_similar(library, "a.png") == [(0, "a.png"), (0, "copy.png"), (3, "near.png")]
+    assert find_similar(library, "missing.png") == []
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import fbx_convert
+from asset_catalog import cache_root, update_asset_fields, update_catalog
+from benchmark import write_fbx
+from fbx_convert import CONVERTED_DIR_NAME, process_asset, remove_stale_conversions
+
+
+@pytest.fixture
+def conversions(monkeypatch):
+    converted = []
+
+    def convert_fbx(source, output):
+        converted.append(source)
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "wb") as f:
+            f.write(b"glTF")
+
+    monkeypatch.setattr(fbx_convert, "convert_fbx", convert_fbx)
+    return converted
+
+
+def test_same_content_is_converted_once(tmp_path, conversions):
+    write_fbx(str(tmp_path / "a.fbx"), 1.0, 1)
+    (tmp_path / "copies").mkdir()
+    (tmp_path / "copies" / "b.fbx").write_bytes((tmp_path / "a.fbx").read_bytes())
+    first = process_asset(str(tmp_path), "a.fbx")
+    assert first["glb"].startswith(CONVERTED_DIR_NAME + "/")
+    assert process_asset(str(tmp_path), "copies/b.fbx") == first
+    os.rename(tmp_path / "a.fbx", tmp_path / "renamed.fbx")
+    assert process_asset(str(tmp_path), "renamed.fbx") == first
+    assert len(conversions) == 1
+
+    write_fbx(str(tmp_path / "renamed.fbx"), 2.0, 1)
+    edited = process_asset(str(tmp_path), "renamed.fbx")
+    assert edited["hash"] != first["hash"] and edited["glb"] != first["glb"]
+    assert process_asset(str(tmp_path), "renamed.fbx", force=True) == edited
+    assert len(conversions) == 3
+
+
+def test_stale_conversions_are_removed(tmp_path, conversions):
+    remove_stale_conversions(str(tmp_path))
+    write_fbx(str(tmp_path / "a.fbx"), 1.0, 1)
+    update_catalog(str(tmp_path))
+    update_asset_fields(str(tmp_path), {"a.fbx": process_asset(str(tmp_path), "a.fbx")})
+    converted_dir = os.path.join(cache_root(str(tmp_path)), CONVERTED_DIR_NAME)
+    for name in ("stale.glb", "notes.txt"):
+        with open(os.path.join(converted_dir, name), "wb") as f:
+            f.write(b"x")
+
+    remove_stale_conversions(str(tmp_path))
+    current = os.path.basename(process_asset(str(tmp_path), "a.fbx")["glb"])
+    assert sorted(os.listdir(converted_dir)) == sorted([current, "notes.txt"])
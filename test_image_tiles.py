@@ -0,0 +1,121 @@
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from image_tiles import TILE_SIZE, ImageSource, RgbeSource, build_pyramid, halve, level_count, tone_map  # noqa: E402
+
+VIEWER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def js_function(file_name, name):
+    with open(os.path.join(VIEWER_DIR, file_name), encoding="utf-8") as f:
+        text = f.read()
+    return re.search(rf"^(?:export )?function {name}\(.*?^}}$", text, re.M | re.S).group(0).replace("export ", "", 1)
+
+
+def run_js(file_name, name, calls):
+    """
+    Runs a function of a viewer module in node on each argument list.
+    """
+    if not shutil.which("node"):
+        pytest.skip("node is required to compare with the viewer")
+    script = f"{js_function(file_name, name)}\nconsole.log(JSON.stringify({json.dumps(calls)}.map(a => {name}(...a))));"
+    return json.loads(subprocess.run(["node", "-e", script], capture_output=True, check=True, text=True).stdout)
+
+
+class GradientSource(ImageSource):
+    always_tiled = False
+
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+
+    def bands(self):
+        for y in range(0, self.height, TILE_SIZE):
+            rows = np.arange(y, min(y + TILE_SIZE, self.height))
+            band = np.zeros((len(rows), self.width, 3), dtype=np.uint8)
+            band[..., 0] = rows[:, np.newaxis] % 256
+            band[..., 1] = np.arange(self.width) % 256
+            yield band
+
+
+def test_level_sizes_and_tiles_for_odd_dimensions(tmp_path):
+    width, height = 601, 299
+    manifest = build_pyramid(GradientSource(width, height), str(tmp_path / "a.json"), str(tmp_path / "a_files"))
+    assert manifest["levels"] == level_count(width, height) == 11
+    pyramid = {"width": width, "height": height, "levels": manifest["levels"]}
+    sizes = run_js("tiled_image.js", "levelSize", [[pyramid, level] for level in range(manifest["levels"])])
+    assert sizes[0] == [1, 1] and sizes[-1] == [width, height]
+    for level, (level_width, level_height) in enumerate(sizes):
+        level_dir = tmp_path / "a_files" / str(level)
+        columns, rows = math.ceil(level_width / TILE_SIZE), math.ceil(level_height / TILE_SIZE)
+        assert sorted(os.listdir(level_dir)) == sorted(f"{c}_{r}.webp" for c in range(columns) for r in range(rows))
+        # Tiles of the last column and row cover exactly what is left
+        with Image.open(level_dir / f"{columns - 1}_{rows - 1}.webp") as tile:
+            assert tile.size == (level_width - (columns - 1) * TILE_SIZE, level_height - (rows - 1) * TILE_SIZE)
+
+
+def test_halve_repeats_the_last_row_and_column():
+    band = np.arange(3 * 5 * 3, dtype=np.uint8).reshape(3, 5, 3)
+    halved = halve(band)
+    assert halved.shape == (2, 3, 3)
+    assert (halved[0, 0] == (band[0, 0].astype(int) + band[0, 1] + band[1, 0] + band[1, 1] + 2) // 4).all()
+    assert (halved[1, 2] == band[2, 4]).all()
+    assert (halved[1, 0] == (band[2, 0].astype(int) + band[2, 1] + 1) // 2).all()
+
+
+def rle_plane(values):
+    # A run for the leading repeats, then the rest as literals
+    run = 1
+    while run < len(values) and run < 127 and values[run] == values[0]:
+        run += 1
+    data = bytes([128 + run, values[0]]) if run > 1 else b""
+    rest = values[run if run > 1 else 0:]
+    for i in range(0, len(rest), 128):
+        data += bytes([len(rest[i:i + 128])]) + bytes(rest[i:i + 128])
+    return data
+
+
+def test_rle_radiance_round_trip(tmp_path):
+    width, height = 12, 3
+    rgbe = np.zeros((height, width, 4), dtype=np.uint8)
+    rgbe[..., 0] = np.arange(width) * 20
+    rgbe[..., 1] = 64
+    rgbe[..., 2] = np.arange(height)[:, np.newaxis] * 50
+    rgbe[..., 3] = 128
+    rgbe[0, 0] = (10, 10, 10, 0)
+    data = b"#?RADIANCE\nFORMAT=32-bit_rle_rgbe\n\n" + f"-Y {height} +X {width}\n".encode("ascii")
+    for row in rgbe:
+        data += bytes([2, 2, width >> 8, width & 255])
+        data += b"".join(rle_plane(list(row[:, component])) for component in range(4))
+    path = tmp_path / "sky.hdr"
+    path.write_bytes(data)
+
+    with RgbeSource(str(path)) as source:
+        assert (source.width, source.height) == (width, height)
+        pixels = np.concatenate(list(source.bands()))
+    expected = (rgbe[..., :3] + 0.5) * 2.0 ** (128 - 136)
+    expected[0, 0] = 0
+    assert np.allclose(pixels, expected)
+
+
+def test_rgbe_rejects_other_layouts(tmp_path):
+    path = tmp_path / "flipped.hdr"
+    path.write_bytes(b"#?RADIANCE\n\n+Y 1 +X 1\n\x00\x00\x00\x00")
+    with pytest.raises(ValueError):
+        RgbeSource(str(path))
+
+
+def test_tone_map_matches_the_viewer():
+    values = [0.0, -1.0, 0.001, 0.0031, 0.01, 0.18, 0.5, 1.0, 2.0, 8.0, 100.0, 65504.0]
+    values += [float(v) for v in np.geomspace(1e-4, 1e3, 200)]
+    expected = run_js("hdr_preview.js", "toneMap", [[value] for value in values])
+    assert tone_map(np.array(values, dtype=np.float64)).tolist() == expected
+    assert tone_map(np.array([0.5]), exposure=1.0).tolist() == tone_map(np.array([1.0])).tolist()
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from asset_catalog import load_catalog
+from library_roots import load_library_catalog, load_roots, merge_catalogs, resolve_asset, update_roots
+from search_index import SearchIndex
+
+
+def image_entry(path, **fields):
+    return {"path": path, "name": path, "type": "image", "ext": "png", "size": 10, "mtime": 0, **fields}
+
+
+def root_catalog(updated=None):
+    # Two look-alikes grouped under "x.png" in each root
+    return {
+        "updated": updated,
+        "assets": {
+            "x.png": image_entry("x.png", dup_group="x.png"),
+            "y.png": image_entry("y.png", dup_group="x.png"),
+        },
+    }
+
+
+ROOTS = [{"name": "A", "path": "/a"}, {"name": "B", "path": "/b"}]
+
+
+def test_merge_prefixes_keys_and_adds_the_root():
+    merged = merge_catalogs(ROOTS, [root_catalog(5), root_catalog(9)])
+    assert sorted(merged["assets"]) == ["A/x.png", "A/y.png", "B/x.png", "B/y.png"]
+    assert merged["assets"]["B/y.png"]["root"] == "B"
+    assert merged["assets"]["B/y.png"]["path"] == "y.png"
+    assert merged["updated"] == 9
+    assert merged["roots"] == ROOTS
+
+
+def test_duplicate_groups_stay_within_their_root():
+    merged = merge_catalogs(ROOTS, [root_catalog(), root_catalog()])
+    assert merged["assets"]["A/y.png"]["dup_group"] == "A/x.png"
+    assert merged["assets"]["B/y.png"]["dup_group"] == "B/x.png"
+    index = SearchIndex(merged)
+    found = [index.paths[doc_id] for doc_id in index.search("similar:A/x.png")["ids"]]
+    assert found == ["A/x.png", "A/y.png"]
+
+
+def test_root_filter_and_facet():
+    index = SearchIndex(merge_catalogs(ROOTS, [root_catalog(), {"assets": {"z.png": image_entry("z.png")}}]))
+    assert [index.paths[doc_id] for doc_id in index.search("root:b")["ids"]] == ["B/z.png"]
+    assert index.search("")["facets"]["root"] == {"A": 2, "B": 1}
+
+
+def test_resolve_asset():
+    assert resolve_asset(ROOTS, "B/sub/x.png") == (ROOTS[1], "sub/x.png")
+    assert resolve_asset(ROOTS, "C/x.png") == (None, None)
+
+
+def write_roots_file(tmp_path, roots):
+    path = tmp_path / "roots.json"
+    path.write_text(json.dumps({"roots": roots}))
+    return str(path)
+
+
+def test_load_roots_resolves_paths_and_names(tmp_path):
+    roots = load_roots(write_roots_file(tmp_path, ["hero", {"name": "p", "path": "props", "max_depth": 1}]))
+    assert [(root["name"], root["path"]) for root in roots] == [
+        ("hero", os.path.join(str(tmp_path), "hero")),
+        ("p", os.path.join(str(tmp_path), "props")),
+    ]
+    assert roots[1]["max_depth"] == 1
+
+
+@pytest.mark.parametrize("roots", [
+    [{"name": "a", "path": "x"}, {"name": "a", "path": "y"}],
+    [{"name": "a/b", "path": "x"}],
+    [{"name": ".dav_cache", "path": "x"}],
+    [],
+])
+def test_load_roots_rejects_bad_names(tmp_path, roots):
+    with pytest.raises(ValueError):
+        load_roots(write_roots_file(tmp_path, roots))
+
+
+def test_update_roots_applies_each_root_rules(tmp_path):
+    for rel_path in ("one/a.png", "one/skip/b.png", "two/c.glb", "two/d.png"):
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    roots_file = write_roots_file(tmp_path, [
+        {"path": "one", "exclude": ["skip"]},
+        {"path": "two", "include": ["*.glb"]},
+    ])
+    roots = load_roots(roots_file)
+    assert update_roots(roots, jobs=1) == []
+    assert sorted(load_catalog(roots[0]["path"])["assets"]) == ["a.png"]
+    assert sorted(load_library_catalog(roots_file)["assets"]) == ["one/a.png", "two/c.glb"]
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import struct
+from array import array
+
+from asset_catalog import cache_root, update_catalog
+from glb_io import ELEMENT_ARRAY_BUFFER, FLOAT, UNSIGNED_INT, GLBFile
+from lod_chain import cluster_triangles, model_triangles, process_asset, simplify_model
+
+
+def grid_glb(cells):
+    """
+    A flat cells x cells grid of quads with positions and normals.
+    """
+    side = cells + 1
+    positions = array("f", (value for y in range(side) for x in range(side) for value in (x, y, 0)))
+    normals = array("f", (0, 0, 1) * (side * side))
+    indices = array("I")
+    for y in range(cells):
+        for x in range(cells):
+            a = y * side + x
+            indices.extend((a, a + 1, a + side, a + 1, a + side + 1, a + side))
+    glb = GLBFile({
+        "asset": {"version": "2.0"},
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {}}]}],
+    }, [])
+    primitive = glb.gltf["meshes"][0]["primitives"][0]
+    primitive["attributes"]["POSITION"] = glb.add_accessor(
+        positions.tobytes(), FLOAT, "VEC3", side * side, min=[0, 0, 0], max=[cells, cells, 0])
+    primitive["attributes"]["NORMAL"] = glb.add_accessor(normals.tobytes(), FLOAT, "VEC3", side * side)
+    primitive["indices"] = glb.add_accessor(
+        indices.tobytes(), UNSIGNED_INT, "SCALAR", len(indices), target=ELEMENT_ARRAY_BUFFER)
+    return glb
+
+
+def test_cluster_triangles_drops_collapsed_triangles():
+    positions = array("f", [0, 0, 0, 0.1, 0, 0, 0, 1, 0, 1, 1, 0])
+    indices = array("I", [0, 1, 2, 1, 3, 2])
+    bounds = ([0, 0, 0], [1, 1, 0])
+    # Vertices 0 and 1 share a cell, so the first triangle collapses
+    assert list(cluster_triangles(positions, indices, 2, bounds)) == [0, 3, 2]
+
+
+def test_simplify_model_reaches_the_target(tmp_path):
+    glb = grid_glb(40)
+    assert model_triangles(glb) == 3200
+    simplify_model(glb, 400)
+    path = str(tmp_path / "simple.glb")
+    glb.write(path)
+
+    simple = GLBFile.read(path)
+    primitive = simple.gltf["meshes"][0]["primitives"][0]
+    accessors = simple.gltf["accessors"]
+    vertex_count = accessors[primitive["attributes"]["POSITION"]]["count"]
+    assert accessors[primitive["attributes"]["NORMAL"]]["count"] == vertex_count
+    indices = simple.accessor_values(primitive["indices"])
+    assert max(indices) < vertex_count
+    assert 200 <= model_triangles(simple) <= 600
+    # The old geometry is pruned on write
+    assert len(accessors) == 3
+
+
+def test_glb_round_trip_keeps_accessor_data(tmp_path):
+    glb = grid_glb(2)
+    path = str(tmp_path / "grid.glb")
+    glb.write(path)
+    copy = GLBFile.read(path)
+    position = copy.gltf["meshes"][0]["primitives"][0]["attributes"]["POSITION"]
+    assert list(copy.accessor_values(position))[:6] == [0, 0, 0, 1, 0, 0]
+
+
+def test_small_models_get_no_levels(tmp_path, monkeypatch):
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    grid_glb(10).write(str(tmp_path / "small.glb"))
+    update_catalog(str(tmp_path))
+    assert process_asset(str(tmp_path), "small.glb") == {"lods": []}
+
+
+def test_compressed_models_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    path = tmp_path / "packed.glb"
+    grid_glb(80).write(str(path))
+    # GLBFile.write refuses these extensions, so patch them into the JSON chunk
+    data = path.read_bytes()
+    json_length = struct.unpack_from("<I", data, 12)[0]
+    gltf = json.loads(data[20:20 + json_length])
+    gltf["extensionsUsed"] = ["EXT_meshopt_compression"]
+    chunk = json.dumps(gltf).encode("utf-8")
+    chunk += b" " * (-len(chunk) % 4)
+    rest = data[20 + json_length:]
+    path.write_bytes(struct.pack("<4sII", b"glTF", 2, 20 + len(chunk) + len(rest))
+                     + struct.pack("<I4s", len(chunk), b"JSON") + chunk + rest)
+    update_catalog(str(tmp_path))
+    assert process_asset(str(tmp_path), "packed.glb") == {"lods": []}
+    assert not os.path.exists(os.path.join(cache_root(str(tmp_path)), "lods"))
+
+
+def test_process_asset_writes_the_chain(tmp_path, monkeypatch):
+    # Use the built-in simplifier even where gltfpack is installed
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    grid_glb(80).write(str(tmp_path / "big.glb"))
+    update_catalog(str(tmp_path))
+    fields = process_asset(str(tmp_path), "big.glb")
+    assert [lod["file"] for lod in fields["lods"]] == ["lods/big.glb.lod0.glb"]
+    assert os.path.exists(os.path.join(cache_root(str(tmp_path)), "lods", "big.glb.lod0.glb"))
+    assert fields["lods"][0]["triangles"] < 12800 / 2
@@ -0,0 +1,120 @@
+import struct
+from array import array
+
+import pytest
+
+from benchmark import fbx_node, fbx_property, write_fbx, write_glb
+from glb_io import FLOAT, GLBFile
+from model_metadata import count_negative_int32, extract_glb_metadata, extract_metadata
+
+
+def test_glb_cube(tmp_path):
+    path = str(tmp_path / "cube.glb")
+    write_glb(path, 2.0, (255, 0, 0))
+    info = extract_metadata(path)
+    assert info["format"] == "glb"
+    assert (info["vertices"], info["triangles"], info["meshes"], info["materials"]) == (8, 12, 1, 1)
+    assert info["bounds"] == {"min": [-1.0, -1.0, -1.0], "max": [1.0, 1.0, 1.0]}
+    assert info["animations"] == []
+
+
+def test_glb_bounds_follow_the_node_hierarchy(tmp_path):
+    glb = GLBFile({
+        "asset": {"version": "2.0"},
+        "scenes": [{"nodes": [0]}],
+        "nodes": [
+            {"children": [1], "translation": [10, 0, 0]},
+            {"mesh": 0, "scale": [2, 2, 2]},
+        ],
+        "meshes": [{"primitives": [{"attributes": {}, "mode": 5}]}],
+        "animations": [{"samplers": [{"input": 1, "output": 1}]}],
+    }, [])
+    glb.gltf["meshes"][0]["primitives"][0]["attributes"]["POSITION"] = glb.add_accessor(
+        array("f", [0] * 12).tobytes(), FLOAT, "VEC3", 4, min=[-1, -1, -1], max=[1, 1, 1],
+    )
+    glb.add_accessor(array("f", [0, 2.5]).tobytes(), FLOAT, "SCALAR", 2, min=[0], max=[2.5])
+    path = str(tmp_path / "tree.glb")
+    glb.write(path)
+
+    info = extract_glb_metadata(path)
+    # A strip of 4 vertices is 2 triangles
+    assert info["triangles"] == 2
+    assert info["bounds"] == {"min": [8.0, -2.0, -2.0], "max": [12.0, 2.0, 2.0]}
+    assert info["animations"] == [{"name": "animation_0", "duration": 2.5}]
+
+
+def test_fbx_cube(tmp_path):
+    path = str(tmp_path / "cube.fbx")
+    write_fbx(path, 4.0, 1)
+    info = extract_metadata(path)
+    assert info["format"] == "fbx"
+    # Six quads are twelve triangles
+    assert (info["vertices"], info["triangles"], info["meshes"]) == (8, 12, 1)
+    assert info["bounds"] == {"min": [-2.0, -2.0, -2.0], "max": [2.0, 2.0, 2.0]}
+
+
+def p70(name, *values):
+    props = [fbx_property("S", name), fbx_property("S", ""), fbx_property("S", ""), fbx_property("S", "")]
+    for value in values:
+        props.append(b"D" + struct.pack("<d", value) if isinstance(value, float) else fbx_property("L", value))
+    return ("P", props, ())
+
+
+def write_unit_box_fbx(path, model_properties, extra_objects=()):
+    # One triangle spanning the unit box, under a Model with the given properties
+    vertices = [0.0, 0.0, 0.0, 1.0, 1.0, 1.0]
+    nodes = [
+        ("Objects", (), [
+            ("Geometry", [fbx_property("L", 1), fbx_property("S", "G"), fbx_property("S", "Mesh")], [
+                ("Vertices", [fbx_property("d", vertices)], ()),
+                ("PolygonVertexIndex", [fbx_property("i", [0, 1, ~0])], ()),
+            ]),
+            ("Model", [fbx_property("L", 2), fbx_property("S", "M"), fbx_property("S", "Mesh")], [
+                ("Properties70", (), model_properties),
+            ]),
+            *extra_objects,
+        ]),
+        ("Connections", (), [
+            ("C", [fbx_property("S", "OO"), fbx_property("L", 1), fbx_property("L", 2)], ()),
+        ]),
+    ]
+    data = b"Kaydara FBX Binary  \x00\x1a\x00" + struct.pack("<I", 7400)
+    for node in nodes:
+        data += fbx_node(len(data), *node)
+    path.write_bytes(data + bytes(13) + bytes(163))
+    return str(path)
+
+
+def test_fbx_model_transform_and_animation(tmp_path):
+    path = write_unit_box_fbx(tmp_path / "moved.fbx", [p70("Lcl Translation", 5.0, 0.0, 0.0)], [
+        ("AnimationStack", [fbx_property("L", 3), fbx_property("S", "Run\x00\x01AnimStack")], [
+            ("Properties70", (), [p70("LocalStop", 46186158000 * 2)]),
+        ]),
+    ])
+    info = extract_metadata(path)
+    assert info["triangles"] == 1
+    assert info["bounds"] == {"min": [5.0, 0.0, 0.0], "max": [6.0, 1.0, 1.0]}
+    assert info["animations"] == [{"name": "Run", "duration": 2.0}]
+
+
+def test_fbx_pivots_and_offsets(tmp_path):
+    path = write_unit_box_fbx(tmp_path / "pivoted.fbx", [
+        p70("Lcl Rotation", 0.0, 0.0, 90.0),
+        p70("RotationPivot", 1.0, 0.0, 0.0),
+        p70("RotationOffset", 0.0, 0.0, 3.0),
+        p70("Lcl Scaling", 2.0, 2.0, 2.0),
+        p70("ScalingPivot", 0.5, 0.5, 0.5),
+    ])
+    # Scaled about the box centre, turned about x = 1, then lifted by 3
+    assert extract_metadata(path)["bounds"] == {"min": [-0.5, -1.5, 2.5], "max": [1.5, 0.5, 4.5]}
+
+
+def test_count_negative_int32():
+    assert count_negative_int32(array("i", [0, -1, 5, -7, 2 ** 31 - 1]).tobytes()) == 2
+
+
+def test_unsupported_files_are_rejected(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("not a model")
+    with pytest.raises(ValueError):
+        extract_metadata(str(path))
@@ -0,0 +1,89 @@
+import os
+
+from asset_catalog import iter_library, load_catalog, update_catalog
+from scan_rules import GlobPattern, ScanRules
+
+
+def make_files(root, *paths):
+    for path in paths:
+        full = os.path.join(root, *path.split("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as f:
+            f.write(b"x")
+
+
+def test_name_pattern_matches_anywhere():
+    pattern = GlobPattern("*.bak")
+    assert pattern.matches("a.bak", False)
+    assert pattern.matches("deep/folder/a.BAK", False)
+    assert not pattern.matches("a.bak/b.png", False)
+
+
+def test_path_pattern_is_anchored():
+    pattern = GlobPattern("chars/*.fbx")
+    assert pattern.matches("chars/hero.fbx", False)
+    assert not pattern.matches("props/chars/hero.fbx", False)
+    assert not pattern.matches("chars/sub/hero.fbx", False)
+
+
+def test_double_star_spans_folders():
+    pattern = GlobPattern("**/cache/**")
+    assert pattern.matches("cache", True)
+    assert pattern.matches("a/b/cache", True)
+    assert pattern.matches("a/cache/x.png", False)
+    assert not pattern.matches("a/cached/x.png", False)
+
+
+def test_trailing_slash_matches_folders_only():
+    pattern = GlobPattern("build/")
+    assert pattern.matches("build", True)
+    assert pattern.matches("src/build", True)
+    assert not pattern.matches("build", False)
+
+
+def test_leading_slash_anchors_a_name():
+    pattern = GlobPattern("/build")
+    assert pattern.matches("build", True)
+    assert not pattern.matches("src/build", True)
+
+
+def test_question_mark_matches_one_character():
+    pattern = GlobPattern("v?.glb")
+    assert pattern.matches("v1.glb", False)
+    assert not pattern.matches("v10.glb", False)
+
+
+def test_include_and_exclude():
+    rules = ScanRules({"include": ["*.fbx"], "exclude": ["*_old.fbx"]})
+    assert rules.accepts_file("hero.fbx")
+    assert not rules.accepts_file("hero_old.fbx")
+    assert not rules.accepts_file("hero.glb")
+
+
+def test_depth_limit_and_excluded_folders():
+    rules = ScanRules({"exclude": [".git"], "max_depth": 1})
+    assert rules.enters_folder("chars", 1)
+    assert not rules.enters_folder("chars/hero", 2)
+    assert not rules.enters_folder(".git", 1)
+
+
+def test_empty_values_are_not_saved():
+    rules = ScanRules({"include": [], "exclude": ["*.bak"], "max_depth": None, "sniff": False})
+    assert rules.rules == {"exclude": ["*.bak"]}
+    assert ScanRules(None).rules == {}
+
+
+def test_iter_library_applies_rules(tmp_path):
+    make_files(tmp_path, "a.png", "skip/b.png", "one/c.glb", "one/two/d.glb", "one/e.bak")
+    rules = {"exclude": ["skip/"], "max_depth": 1}
+    found = sorted(rel_path for rel_path, _, _ in iter_library(str(tmp_path), rules))
+    assert found == ["a.png", "one/c.glb"]
+
+
+def test_update_catalog_keeps_rules(tmp_path):
+    make_files(tmp_path, "a.png", "b/c.png")
+    update_catalog(str(tmp_path), {"exclude": ["b"]})
+    make_files(tmp_path, "b/d.png")
+    catalog = update_catalog(str(tmp_path))
+    assert sorted(catalog["assets"]) == ["a.png"]
+    assert load_catalog(str(tmp_path))["scan"] == {"exclude": ["b"]}
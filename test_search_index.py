@@ -0,0 +1,89 @@
+import calendar
+
+from search_index import SearchIndex, parse_query, parse_range
+
+MB = 1024 ** 2
+
+
+def entry(path, size=1000, date=(2024, 5, 1), **fields):
+    name = path.rsplit("/", 1)[-1]
+    return {
+        "path": path,
+        "name": name,
+        "type": fields.pop("type", "image"),
+        "ext": name.rsplit(".", 1)[-1],
+        "size": size,
+        "mtime": calendar.timegm(date + (12, 0, 0)),
+        **fields,
+    }
+
+
+def make_index(*entries):
+    return SearchIndex({"assets": {item["path"]: item for item in entries}})
+
+
+def found(index, query):
+    return [index.paths[doc_id] for doc_id in index.search(query)["ids"]]
+
+
+def test_parse_query_splits_terms_and_filters():
+    terms, filters = parse_query("Hero type:FBX size:>1mb unknown:x")
+    assert terms == ["hero", "unknown:x"]
+    assert filters == [("type", "fbx"), ("size", (MB, float("inf")))]
+
+
+def test_invalid_numeric_filters_are_dropped():
+    assert parse_query("size:huge date:someday") == ([], [])
+
+
+def test_parse_range():
+    assert parse_range("size", "1kb..2kb") == (1024, 2048)
+    assert parse_range("tris", ">100") == (101, float("inf"))
+    assert parse_range("tris", "<100") == (float("-inf"), 100)
+    assert parse_range("tris", "100") == (100, 101)
+
+
+def test_parse_date_ranges():
+    may = calendar.timegm((2024, 5, 1, 0, 0, 0))
+    june = calendar.timegm((2024, 6, 1, 0, 0, 0))
+    assert parse_range("date", "2024-05") == (may, june)
+    assert parse_range("date", "<2024-05") == (float("-inf"), may)
+    assert parse_range("date", "2024-12")[1] == calendar.timegm((2025, 1, 1, 0, 0, 0))
+    assert parse_range("date", "2024-13") is None
+
+
+def test_terms_match_substrings_of_the_path():
+    index = make_index(entry("chars/hero.fbx", type="fbx"), entry("props/box.glb", type="glb"), entry("hero.png"))
+    assert found(index, "hero") == ["chars/hero.fbx", "hero.png"]
+    assert found(index, "HERO fbx") == ["chars/hero.fbx"]
+    # Terms shorter than a trigram are checked against every path
+    assert found(index, "bo") == ["props/box.glb"]
+
+
+def test_filters():
+    index = make_index(
+        entry("chars/hero.fbx", type="fbx", size=20 * MB, model={"triangles": 50000, "animations": [{"name": "Run"}]}),
+        entry("chars/villain.fbx", type="fbx", size=2 * MB, date=(2023, 1, 1)),
+        entry("props/box.glb", type="glb", size=500, model={"triangles": 12}),
+    )
+    assert found(index, "type:fbx") == ["chars/hero.fbx", "chars/villain.fbx"]
+    assert found(index, "ext:.glb") == ["props/box.glb"]
+    assert found(index, "folder:chars/") == ["chars/hero.fbx", "chars/villain.fbx"]
+    assert found(index, "size:>10mb") == ["chars/hero.fbx"]
+    assert found(index, "date:2023") == ["chars/villain.fbx"]
+    assert found(index, "tris:<100") == ["props/box.glb"]
+    assert found(index, "anim:run") == ["chars/hero.fbx"]
+
+
+def test_facets_count_the_results():
+    index = make_index(
+        entry("chars/hero.fbx", type="fbx", size=20 * MB),
+        entry("chars/villain.fbx", type="fbx", size=50),
+        entry("props/box.glb", type="glb", size=50, date=(2023, 1, 1)),
+    )
+    facets = index.search("")["facets"]
+    assert facets["type"] == {"fbx": 2, "glb": 1}
+    assert facets["size"] == {"<100 KB": 2, "10-100 MB": 1}
+    assert facets["folder"] == {"chars": 2, "props": 1}
+    assert facets["date"] == {"2024": 2, "2023": 1}
+    assert index.search("type:glb")["facets"]["type"] == {"glb": 1}
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import service_metrics
+from service_metrics import Counter, Gauge, Histogram, Registry, trace, write_metrics_file
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = Registry()
+    histogram = Histogram("op_seconds", "Op time", ("stage",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, stage="scan")
+    assert registry.render() == (
+        "# HELP op_seconds Op time\n"
+        "# TYPE op_seconds histogram\n"
+        'op_seconds_bucket{stage="scan",le="0.1"} 2\n'
+        'op_seconds_bucket{stage="scan",le="1"} 3\n'
+        'op_seconds_bucket{stage="scan",le="+Inf"} 4\n'
+        'op_seconds_sum{stage="scan"} 2.65\n'
+        'op_seconds_count{stage="scan"} 4\n'
+    )
+
+
+def test_counter_and_gauge():
+    registry = Registry()
+    counter = Counter("requests_total", "Requests", ("route",), registry=registry)
+    gauge = Gauge("active", "Active", registry=registry)
+    counter.inc(route="b")
+    counter.inc(2, route="a")
+    gauge.inc(3)
+    gauge.dec()
+    assert registry.render().splitlines()[2:4] == ['requests_total{route="a"} 2', 'requests_total{route="b"} 1']
+    assert registry.render().endswith("active 2\n")
+
+
+def test_labels_are_checked_and_escaped():
+    registry = Registry()
+    counter = Counter("files_total", "Files", ("path",), registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc(name="x")
+    counter.inc(path='a"b\\c\nd')
+    assert 'files_total{path="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_metrics_file_is_replaced_atomically(tmp_path):
+    registry = Registry()
+    Gauge("up", "Up", registry=registry).set(1)
+    path = tmp_path / "dav.prom"
+    write_metrics_file(str(path), registry)
+    assert path.read_text().endswith("up 1\n")
+    assert [item.name for item in tmp_path.iterdir()] == ["dav.prom"]
+
+
+def test_trace_logs_only_slow_operations(capsys, monkeypatch):
+    monkeypatch.setattr(service_metrics, "trace_threshold", 0.1)
+    trace("fast", 0.05)
+    trace("slow", 0.25, path="a.glb")
+    record = json.loads(capsys.readouterr().err)
+    assert (record["event"], record["ms"], record["path"]) == ("slow", 250.0, "a.glb")
@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from asset_catalog import cache_root, update_asset_fields, update_catalog
+from thumbnail_atlas import ATLAS_DIR_NAME, MANIFEST_FILE_NAME, atlas_name, build_atlases, split_runs
+
+PATHS = [f"img{i:04d}.png" for i in range(1000)]
+
+
+def names(paths, assets):
+    return {atlas_name(members, assets): members for members in split_runs(paths)}
+
+
+def test_inserting_an_asset_changes_only_its_run():
+    assets = {path: {"size": 10, "mtime": 0} for path in PATHS + ["img0123a.png"]}
+    before = names(PATHS, assets)
+    after = names(sorted(PATHS + ["img0123a.png"]), assets)
+    assert len(before) > 2
+    assert len(set(before) - set(after)) == 1
+    [added] = set(after) - set(before)
+    assert "img0123a.png" in after[added]
+
+
+def test_edited_members_rename_their_atlas():
+    members = PATHS[:3]
+    assets = {path: {"size": 10, "mtime": 0} for path in members}
+    name = atlas_name(members, assets)
+    assets[members[1]]["mtime"] = 1
+    assert atlas_name(members, assets) != name
+
+
+@pytest.fixture
+def library(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+
+    def add(*rel_paths):
+        for rel_path in rel_paths:
+            Image.new("RGB", (4, 4), (200, 0, 0)).save(tmp_path / rel_path)
+            # The same size and date make every sort order list the assets by name
+            os.utime(tmp_path / rel_path, (1_000_000, 1_000_000))
+        thumbs_dir = os.path.join(cache_root(str(tmp_path)), "thumbs")
+        os.makedirs(thumbs_dir, exist_ok=True)
+        thumbs = {}
+        for path in update_catalog(str(tmp_path))["assets"]:
+            Image.new("RGBA", (8, 8)).save(os.path.join(thumbs_dir, path + ".webp"))
+            thumbs[path] = {"thumb": f"thumbs/{path}.webp"}
+        update_asset_fields(str(tmp_path), thumbs)
+
+    return tmp_path, add
+
+
+def read_manifest(root):
+    with open(os.path.join(cache_root(str(root)), ATLAS_DIR_NAME, MANIFEST_FILE_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def atlas_files(root):
+    return {name for name in os.listdir(os.path.join(cache_root(str(root)), ATLAS_DIR_NAME)) if name.endswith(".webp")}
+
+
+def test_rebuild_packs_only_the_changed_run(library):
+    root, add = library
+    add(*PATHS[:300])
+    packed = build_atlases(str(root), jobs=1)
+    before = atlas_files(root)
+    assert packed == len(before) > 1
+
+    add("img0123a.png")
+    assert build_atlases(str(root), jobs=1) == 1
+    after = atlas_files(root)
+    assert len(before - after) == 1 and len(after - before) == 1
+    # The sweep keeps every atlas the new manifest refers to
+    assert {atlas["file"].split("/")[-1] for atlas in read_manifest(root)["atlases"]} == after
+
+
+def test_missing_thumbnails_are_skipped(library):
+    root, add = library
+    add("a.png", "b.png")
+    os.remove(os.path.join(cache_root(str(root)), "thumbs", "a.png.webp"))
+    build_atlases(str(root), jobs=1)
+    assert list(read_manifest(root)["orders"]["name"]) == ["b.png"]
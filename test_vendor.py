@@ -0,0 +1,18 @@
+import re
+
+import vendor
+from create_zip import FONT_AWESOME_CDN_PATTERN, MODEL_VIEWER_CDN_PATTERN, bundle_sources
+
+THREE_CDN_PATTERN = re.compile(r"https://unpkg\.com/three(?:@[^/]+)?/")
+
+
+def cdn_urls(pattern):
+    return {url for text in bundle_sources().values() for url in pattern.findall(text)}
+
+
+def test_viewer_loads_the_vendored_versions():
+    # The service worker serves CDN files stale-while-revalidate, which is
+    # only safe for URLs that always return the same file
+    assert cdn_urls(MODEL_VIEWER_CDN_PATTERN) == {vendor.MODEL_VIEWER_URL}
+    assert cdn_urls(FONT_AWESOME_CDN_PATTERN) == {vendor.FONT_AWESOME_CSS_URL}
+    assert cdn_urls(THREE_CDN_PATTERN) == {vendor.THREE_URL + "/"}
@@ -0,0 +1,79 @@
+import struct
+import wave
+from array import array
+
+from waveform_peaks import (
+    HEADER_FORMAT, LEVEL_FORMAT, MIN_LEVEL_PEAKS, PEAK_MAGIC, PEAK_VERSION, PeakBuilder, build_levels,
+    downsample_peaks, generate_peak_file, pcm_to_array,
+)
+
+
+def write_wav(path, samples, channels=1, sample_rate=8000):
+    pcm = array("h", samples)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+
+
+def read_peak_file(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, level_count, sample_rate, frame_count = struct.unpack_from(HEADER_FORMAT, data)
+    offset = struct.calcsize(HEADER_FORMAT)
+    counts = []
+    for _ in range(level_count):
+        counts.append(struct.unpack_from(LEVEL_FORMAT, data, offset))
+        offset += struct.calcsize(LEVEL_FORMAT)
+    levels = []
+    for samples_per_peak, peak_count in counts:
+        peaks = array("b")
+        peaks.frombytes(data[offset:offset + peak_count * 2])
+        offset += peak_count * 2
+        levels.append((samples_per_peak, list(peaks)))
+    assert offset == len(data)
+    return magic, version, sample_rate, frame_count, levels
+
+
+def test_builder_folds_channels_and_keeps_the_tail():
+    builder = PeakBuilder(2, 2, 128)
+    # Peaks split across feeds are carried over; the last one may be short
+    builder.feed(array("h", [0, 10, -20, 5, 64, -128]))
+    builder.feed(array("h", [127, 3, 1, 2]))
+    assert builder.frame_count == 5
+    assert list(builder.finish()) == [-20, 10, -127, 126, 1, 2]
+
+
+def test_pcm_to_array_sample_widths():
+    assert list(pcm_to_array(bytes([0, 128, 255]), 1)) == [-128, 0, 127]
+    assert list(pcm_to_array(struct.pack("<hh", -2, 300), 2)) == [-2, 300]
+    # 24-bit samples end up in the high bytes of 32-bit ones
+    assert list(pcm_to_array(b"\x01\x00\x80", 3)) == [-(2 ** 31) + 256]
+
+
+def test_downsample_merges_groups():
+    peaks = array("b", [-1, 1, -5, 2, -3, 9, 0, 0, -7, 4])
+    assert list(downsample_peaks(peaks, 2)) == [-5, 2, -3, 9, -7, 4]
+
+
+def test_levels_stop_at_the_minimum_size():
+    base = array("b", [0, 0] * (MIN_LEVEL_PEAKS * 16))
+    levels = build_levels(base, 512)
+    assert [samples for samples, _ in levels] == [512 * 16, 512 * 4, 512]
+    assert len(levels[0][1]) // 2 == MIN_LEVEL_PEAKS
+
+
+def test_peak_file_layout(tmp_path):
+    source = tmp_path / "tone.wav"
+    samples = [16384 if i % 2 else -32768 for i in range(3000)]
+    write_wav(source, samples, channels=2, sample_rate=22050)
+    output = tmp_path / "tone.peaks"
+    generate_peak_file(str(source), str(output))
+
+    magic, version, sample_rate, frame_count, levels = read_peak_file(output)
+    assert (magic, version, sample_rate, frame_count) == (PEAK_MAGIC, PEAK_VERSION, 22050, 1500)
+    samples_per_peak, peaks = levels[-1]
+    assert samples_per_peak == 512
+    # ceil(1500 / 512) peaks, each the full negative and half positive range
+    assert peaks == [-127, 64] * 3
@@ -0,0 +1,279 @@
+"""
+Packs image and video thumbnails into atlases, so a page of tiles costs one
+or two file reads and image decodes instead of one per asset.
+
+Thumbnails are rendered once per asset into ``.dav_cache/thumbs/``. For each
+sort order the viewer offers (name, size, type, date) the thumbnailable
+assets are split into runs of about one page, and each run is packed into a
+grid of THUMB_SIZE cells in ``.dav_cache/atlases/``. A page of tiles in that
+order then falls into one or two atlases.
+
+Run boundaries are content-defined: a run ends after an asset whose path
+hashes to a multiple of BOUNDARY_MODULUS (within CHUNK_MIN..CHUNK_MAX
+assets). Adding or removing an asset therefore only changes the run it
+falls in, and atlases are named by a hash of their members, so only atlases
+whose member set changed are packed again.
+
+Images are decoded with Pillow (pip install Pillow). Video thumbnails are
+taken with ffmpeg, which must be on PATH.
+
+Usage:
+    python thumbnail_atlas.py LIBRARY_ROOT [--jobs N] [--force]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from asset_catalog import (
+    asset_path, cache_relative, cache_root, derived_path, detect_asset_type, is_fresh, load_catalog,
+    run_asset_batch, update_catalog,
+)
+from service_metrics import STAGE_SECONDS
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ATLAS_DIR_NAME = "atlases"
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+THUMB_SIZE = 256
+THUMB_QUALITY = 80
+VIDEO_THUMB_TIME = 1.0
+
+# Sort orders of the viewer, as keys on catalog entries. Ties fall back to the
+# name, as the viewer sorts an alphabetical list with a stable sort.
+SORT_ORDERS = {
+    "name": lambda entry: (entry["name"].casefold(),),
+    "size": lambda entry: (entry["size"], entry["name"].casefold()),
+    "type": lambda entry: (entry["type"], entry["name"].casefold()),
+    "date": lambda entry: (entry["mtime"], entry["name"].casefold()),
+}
+
+# Runs hold about one page (the viewer shows at most 150 tiles per page)
+CHUNK_MIN = 100
+CHUNK_MAX = 200
+BOUNDARY_MODULUS = 50
+
+
+def require_pillow():
+    if Image is None:
+        raise RuntimeError("Pillow is required to build thumbnails: pip install Pillow")
+
+
+def video_frame(path):
+    """
+    Grabs one frame near the start of a video as a Pillow image.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg is required to thumbnail videos but was not found on PATH")
+    scale = f"scale={THUMB_SIZE}:{THUMB_SIZE}:force_original_aspect_ratio=decrease"
+    # Very short clips have no frame at VIDEO_THUMB_TIME, so retry from the start
+    for seek in (VIDEO_THUMB_TIME, 0):
+        command = [
+            ffmpeg, "-v", "error", "-nostdin", "-ss", str(seek), "-i", path,
+            "-frames:v", "1", "-vf", scale, "-f", "image2pipe", "-c:v", "png", "-",
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode == 0 and result.stdout:
+            return Image.open(io.BytesIO(result.stdout))
+    raise RuntimeError(f"ffmpeg could not extract a frame: {result.stderr.decode('utf-8', 'replace').strip()}")
+
+
+def make_thumbnail(path, asset_type):
+    """
+    Returns an RGBA thumbnail that fits in a THUMB_SIZE square.
+    """
+    require_pillow()
+    if asset_type == "video":
+        image = video_frame(path)
+    else:
+        image = Image.open(path)
+        # Lets the JPEG decoder skip most of the work for large photos
+        image.draft("RGB", (THUMB_SIZE, THUMB_SIZE))
+    with image:
+        thumbnail = image.convert("RGBA")
+    thumbnail.thumbnail((THUMB_SIZE, THUMB_SIZE))
+    return thumbnail
+
+
+def process_thumbnail(root, rel_path, force=False):
+    """
+    Batch-mode worker: writes the thumbnail of one asset and returns its
+    catalog fields.
+    """
+    source = asset_path(root, rel_path)
+    output = derived_path(root, "thumbs", rel_path, ".webp")
+    if force or not is_fresh(output, source):
+        thumbnail = make_thumbnail(source, detect_asset_type(source))
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        temp_path = output + ".tmp"
+        thumbnail.save(temp_path, "WEBP", quality=THUMB_QUALITY)
+        os.replace(temp_path, output)
+    return {"thumb": cache_relative(root, output)}
+
+
+def has_thumbnail(root, entry):
+    return bool(entry.get("thumb")) and os.path.exists(os.path.join(cache_root(root), *entry["thumb"].split("/")))
+
+
+def split_runs(paths):
+    """
+    Splits an ordered list of paths into runs with content-defined boundaries.
+    """
+    runs = []
+    current = []
+    for path in paths:
+        current.append(path)
+        at_boundary = zlib.crc32(path.encode("utf-8")) % BOUNDARY_MODULUS == 0
+        if len(current) >= CHUNK_MAX or (len(current) >= CHUNK_MIN and at_boundary):
+            runs.append(current)
+            current = []
+    if current:
+        runs.append(current)
+    return runs
+
+
+def atlas_name(members, assets):
+    """
+    Names an atlas after its members and their versions, so an unchanged
+    run maps to the atlas that already exists.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(f"{MANIFEST_VERSION}:{THUMB_SIZE}\n".encode("utf-8"))
+    for path in members:
+        entry = assets[path]
+        digest.update(f"{path}\0{entry['size']}\0{entry['mtime']}\n".encode("utf-8"))
+    return digest.hexdigest() + ".webp"
+
+
+def atlas_grid(count):
+    columns = max(1, math.ceil(math.sqrt(count)))
+    return columns, max(1, math.ceil(count / columns))
+
+
+def pack_atlas(root, members, thumbs, output):
+    """
+    Pastes member thumbnails, centred in their cells, into one atlas image.
+    """
+    require_pillow()
+    columns, rows = atlas_grid(len(members))
+    atlas = Image.new("RGBA", (columns * THUMB_SIZE, rows * THUMB_SIZE), (0, 0, 0, 0))
+    for index, path in enumerate(members):
+        with Image.open(os.path.join(cache_root(root), *thumbs[path].split("/"))) as thumbnail:
+            column, row = index % columns, index // columns
+            x = column * THUMB_SIZE + (THUMB_SIZE - thumbnail.width) // 2
+            y = row * THUMB_SIZE + (THUMB_SIZE - thumbnail.height) // 2
+            atlas.paste(thumbnail, (x, y))
+    temp_path = output + ".tmp"
+    atlas.save(temp_path, "WEBP", quality=THUMB_QUALITY)
+    os.replace(temp_path, output)
+    return output
+
+
+def build_atlases(root, jobs=None, force=False):
+    """
+    Packs the thumbnails of a library into atlases for every sort order and
+    writes the manifest the viewer reads. Returns the number of atlases packed.
+    """
+    catalog = load_catalog(root)
+    assets = catalog["assets"]
+    # Thumbnails deleted since they were rendered are left out; the next
+    # build_library_atlases run renders them again
+    thumbs = {path: entry["thumb"] for path, entry in assets.items() if has_thumbnail(root, entry)}
+    atlas_dir = os.path.join(cache_root(root), ATLAS_DIR_NAME)
+    os.makedirs(atlas_dir, exist_ok=True)
+
+    atlases = []
+    atlas_indexes = {}
+    orders = {}
+    to_pack = {}
+    for order, key in SORT_ORDERS.items():
+        ordered = sorted(thumbs, key=lambda path: key(assets[path]))
+        cells = {}
+        for members in split_runs(ordered):
+            name = atlas_name(members, assets)
+            if name not in atlas_indexes:
+                columns, rows = atlas_grid(len(members))
+                atlas_indexes[name] = len(atlases)
+                atlases.append({"file": f"{ATLAS_DIR_NAME}/{name}", "columns": columns, "rows": rows})
+                output = os.path.join(atlas_dir, name)
+                if force or not os.path.exists(output):
+                    to_pack[output] = members
+            for cell, path in enumerate(members):
+                cells[path] = [atlas_indexes[name], cell]
+        orders[order] = cells
+
+    print(f"Packing {len(to_pack)} of {len(atlases)} atlases")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(pack_atlas, root, members, thumbs, output) for output, members in to_pack.items()]
+        for future in futures:
+            future.result()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "cell": THUMB_SIZE,
+        "atlases": atlases,
+        "assets": {path: [assets[path]["size"], assets[path]["mtime"]] for path in thumbs},
+        "orders": orders,
+    }
+    manifest_path = os.path.join(atlas_dir, MANIFEST_FILE_NAME)
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    # Atlases of runs that no longer exist
+    current = {os.path.basename(atlas["file"]) for atlas in atlases}
+    for name in os.listdir(atlas_dir):
+        if name.endswith(".webp") and name not in current:
+            os.remove(os.path.join(atlas_dir, name))
+
+    elapsed = time.perf_counter() - start
+    STAGE_SECONDS.observe(elapsed, stage="thumbnail_atlas.pack")
+    print(f"Finished in {elapsed:.2f}s")
+    return len(to_pack)
+
+
+def build_library_atlases(root, jobs=None, force=False):
+    """
+    Renders missing thumbnails, then packs the atlases. Returns the number of
+    assets that could not be thumbnailed.
+    """
+    catalog = update_catalog(root)
+    failures = run_asset_batch(
+        root, ("image", "video"), partial(process_thumbnail, force=force), jobs=jobs, catalog=catalog,
+        needs_update=lambda entry: force or not has_thumbnail(root, entry),
+        error_fields=("thumb",), label="Rendering thumbnails for",
+    )
+    build_atlases(root, jobs=jobs, force=force)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack image and video thumbnails into page atlases.")
+    parser.add_argument("root", help="Library root folder")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild thumbnails and atlases that are up to date")
+    args = parser.parse_args()
+
+    failures = build_library_atlases(args.root, jobs=args.jobs, force=args.force)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+// tile_scheduler.js
+// Queues tile loads so only a few of each asset type run at once.
+// Queued tiles closest to the viewport centre start first, and every
+// load gets an AbortSignal that fires when its tile leaves the page.
+
+// Maximum number of concurrent loads per asset type
+export const TYPE_CONCURRENCY = {
+  fbx: 2,
+  glb: 2,
+  video: 4,
+  audio: 4,
+  image: 6
+};
+
+const DEFAULT_CONCURRENCY = 4;
+
+class TileLoadScheduler {
+  constructor(limits = TYPE_CONCURRENCY) {
+    this.limits = { ...limits };
+    this.queued = new Map();   // tile -> { type, loader }
+    this.running = new Map();  // tile -> { type, controller }
+    this.activeCounts = new Map();
+  }
+
+  // Queue a tile load. `loader` receives an AbortSignal and must return a
+  // promise that settles once the tile content is ready.
+  enqueue(tile, type, loader) {
+    if (this.queued.has(tile) || this.running.has(tile)) return;
+    this.queued.set(tile, { type, loader });
+    this.pump();
+  }
+
+  // Drop a tile that has not started loading yet (e.g. scrolled out of view)
+  dequeue(tile) {
+    return this.queued.delete(tile);
+  }
+
+  // Drop a queued tile or abort its in-flight load
+  cancel(tile) {
+    this.queued.delete(tile);
+    const job = this.running.get(tile);
+    if (job) {
+      job.controller.abort();
+    }
+  }
+
+  // Abort everything, used when the grid is re-rendered
+  cancelAll() {
+    this.queued.clear();
+    for (const job of this.running.values()) {
+      job.controller.abort();
+    }
+  }
+
+  isPending(tile) {
+    return this.queued.has(tile) || this.running.has(tile);
+  }
+
+  getLimit(type) {
+    return this.limits[type] ?? DEFAULT_CONCURRENCY;
+  }
+
+  hasCapacity(type) {
+    return (this.activeCounts.get(type) || 0) < this.getLimit(type);
+  }
+
+  // Distance from the tile centre to the viewport centre, in pixels
+  distanceToViewportCentre(tile) {
+    const rect = tile.getBoundingClientRect();
+    const dx = rect.left + rect.width / 2 - window.innerWidth / 2;
+    const dy = rect.top + rect.height / 2 - window.innerHeight / 2;
+    return Math.hypot(dx, dy);
+  }
+
+  // Pick the queued tile nearest the viewport centre whose type has a free slot
+  nextJob() {
+    let best = null;
+    let bestDistance = Infinity;
+    for (const [tile, job] of this.queued) {
+      if (!this.hasCapacity(job.type)) continue;
+      const distance = this.distanceToViewportCentre(tile);
+      if (distance < bestDistance) {
+        best = tile;
+        bestDistance = distance;
+      }
+    }
+    return best;
+  }
+
+  pump() {
+    let tile;
+    while ((tile = this.nextJob())) {
+      this.start(tile);
+    }
+  }
+
+  start(tile) {
+    const { type, loader } = this.queued.get(tile);
+    this.queued.delete(tile);
+
+    const controller = new AbortController();
+    this.running.set(tile, { type, controller });
+    this.activeCounts.set(type, (this.activeCounts.get(type) || 0) + 1);
+
+    Promise.resolve()
+      .then(() => loader(controller.signal))
+      .catch(error => {
+        if (error?.name !== 'AbortError') {
+          console.error(`Error loading ${type} tile:`, error);
+        }
+      })
+      .finally(() => {
+        this.running.delete(tile);
+        this.activeCounts.set(type, this.activeCounts.get(type) - 1);
+        this.pump();
+      });
+  }
+}
+
+export default TileLoadScheduler;
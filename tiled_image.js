@@ -0,0 +1,306 @@
+// tiled_image.js
+// Deep-zoom viewing of the tile pyramids image_tiles.py writes for large
+// and HDR images. Only the tiles covering the viewport at the level that
+// matches the zoom are read, so a 16K texture pans as fast as a small one.
+// Coarser levels already loaded are drawn underneath while finer tiles
+// arrive.
+import { typeFromName } from './asset_types.js';
+import { getCacheDirectory, getCacheFile, getCatalogEntry } from './library_cache.js';
+import { loadCachedPreview } from './image_preview.js';
+import { registerMemorySource } from './memory_diagnostics.js';
+
+// Decoded tiles kept per viewer (RGBA); about 400 tiles of 256px
+export const TILE_MEMORY_BUDGET = 96 * 1024 * 1024;
+const MAX_TILE_LOADS = 6;
+// Furthest zoom in, in screen pixels per image pixel
+const MAX_SCALE = 16;
+const WHEEL_ZOOM_SPEED = 0.002;
+
+const liveViewers = new Set();
+registerMemorySource(() => [...liveViewers].map(viewer => ({ type: 'tile cache', cacheBytes: viewer.bytes })));
+
+// The pyramid of an asset from its catalog entry, or null if it has none
+// or it is older than the asset
+export async function getPyramid(model) {
+  const entry = await getCatalogEntry(model);
+  if (!entry?.tiles) return null;
+  const file = await getCacheFile(entry.tiles, model.root);
+  if (!file || file.lastModified < model.file.lastModified) return null;
+  try {
+    const manifest = JSON.parse(await file.text());
+    const folder = entry.tiles.slice(0, entry.tiles.lastIndexOf('/') + 1) + manifest.tiles;
+    return { ...manifest, root: model.root, folder, levelDirs: new Map() };
+  } catch (error) {
+    console.error(`Error reading tile manifest of ${model.name}:`, error);
+    return null;
+  }
+}
+
+// TIFF files, which only Safari decodes, so they are shown through their
+// pyramid or not at all. Only files without an image extension (sniffed
+// ones) are read, so tiles of ordinary images cost no extra file read.
+export async function needsPyramid(file) {
+  if (typeFromName(file.name) === 'image') return /\.tiff?$/i.test(file.name);
+  const head = new Uint8Array(await file.slice(0, 4).arrayBuffer());
+  const magic = String.fromCharCode(...head);
+  return magic === 'II*\x00' || magic === 'MM\x00*';
+}
+
+// Width and height of a pyramid level
+function levelSize(pyramid, level) {
+  const factor = 2 ** (pyramid.levels - 1 - level);
+  return [Math.ceil(pyramid.width / factor), Math.ceil(pyramid.height / factor)];
+}
+
+async function loadTile(pyramid, level, column, row) {
+  let dir = pyramid.levelDirs.get(level);
+  if (!dir) {
+    dir = getCacheDirectory(`${pyramid.folder}/${level}`, pyramid.root);
+    pyramid.levelDirs.set(level, dir);
+  }
+  const handle = await (await dir).getFileHandle(`${column}_${row}.${pyramid.format}`);
+  return createImageBitmap(await handle.getFile());
+}
+
+// A still preview at most `maxSize` pixels on its longest side, put
+// together from the tiles of the smallest level that is large enough
+export function loadPyramidPreview(pyramid, key, maxSize, signal) {
+  return loadCachedPreview(`${key}#tiles`, maxSize, async (size) => {
+    let level = 0;
+    while (level < pyramid.levels - 1 && Math.max(...levelSize(pyramid, level)) < size) level++;
+    const [width, height] = levelSize(pyramid, level);
+    const tileSize = pyramid.tile_size;
+    const scale = Math.min(1, size / Math.max(width, height));
+    const canvas = new OffscreenCanvas(Math.max(1, Math.round(width * scale)), Math.max(1, Math.round(height * scale)));
+    const ctx = canvas.getContext('2d');
+    ctx.imageSmoothingQuality = 'high';
+    const loads = [];
+    for (let row = 0; row * tileSize < height; row++) {
+      for (let column = 0; column * tileSize < width; column++) {
+        loads.push(loadTile(pyramid, level, column, row).then(bitmap => {
+          ctx.drawImage(bitmap, column * tileSize * scale, row * tileSize * scale,
+            bitmap.width * scale, bitmap.height * scale);
+          bitmap.close();
+        }));
+      }
+    }
+    await Promise.all(loads);
+    return canvas.transferToImageBitmap();
+  }, signal);
+}
+
+// Pan (drag) and zoom (wheel, double-click) viewer for a pyramid, filling
+// `container`. Call dispose() once it is no longer shown.
+export class TiledImageViewer {
+  constructor(container, pyramid) {
+    this.pyramid = pyramid;
+    this.canvas = document.createElement('canvas');
+    this.canvas.className = 'tiled-image';
+    container.appendChild(this.canvas);
+    this.ctx = this.canvas.getContext('2d');
+
+    // Key "level/column_row" -> ImageBitmap, least recently drawn first
+    this.tiles = new Map();
+    this.bytes = 0;
+    this.loading = new Set();
+    this.wanted = [];
+    this.frame = null;
+    this.disposed = false;
+    // Screen pixels per image pixel, and the image point at the centre
+    this.scale = 1;
+    this.centerX = pyramid.width / 2;
+    this.centerY = pyramid.height / 2;
+    this.fitted = true;
+
+    // The level that fits in one tile is always drawn first, as a backdrop
+    this.baseLevel = Math.max(0, pyramid.levels - 1 -
+      Math.ceil(Math.log2(Math.max(pyramid.width, pyramid.height) / pyramid.tile_size)));
+
+    this.bindEvents();
+    this.resizeObserver = new ResizeObserver(() => this.onResize());
+    this.resizeObserver.observe(this.canvas);
+    liveViewers.add(this);
+  }
+
+  bindEvents() {
+    const canvas = this.canvas;
+    canvas.addEventListener('wheel', (event) => {
+      event.preventDefault();
+      this.zoomAt(event.offsetX, event.offsetY, Math.exp(-event.deltaY * WHEEL_ZOOM_SPEED));
+    }, { passive: false });
+    canvas.addEventListener('dblclick', (event) => {
+      // Toggle between fitting the view and one image pixel per screen pixel
+      const target = this.fitted ? 1 / window.devicePixelRatio : this.fitScale();
+      this.zoomAt(event.offsetX, event.offsetY, target / this.scale);
+      this.fitted = !this.fitted && target === this.fitScale();
+    });
+    let drag = null;
+    canvas.addEventListener('pointerdown', (event) => {
+      drag = { x: event.clientX, y: event.clientY };
+      canvas.setPointerCapture(event.pointerId);
+    });
+    canvas.addEventListener('pointermove', (event) => {
+      if (!drag) return;
+      this.centerX -= (event.clientX - drag.x) / this.scale;
+      this.centerY -= (event.clientY - drag.y) / this.scale;
+      drag = { x: event.clientX, y: event.clientY };
+      this.fitted = false;
+      this.requestRender();
+    });
+    const endDrag = () => { drag = null; };
+    canvas.addEventListener('pointerup', endDrag);
+    canvas.addEventListener('pointercancel', endDrag);
+  }
+
+  fitScale() {
+    const { clientWidth, clientHeight } = this.canvas;
+    return Math.min(clientWidth / this.pyramid.width, clientHeight / this.pyramid.height) || 1;
+  }
+
+  onResize() {
+    const dpr = window.devicePixelRatio;
+    this.canvas.width = Math.max(1, Math.round(this.canvas.clientWidth * dpr));
+    this.canvas.height = Math.max(1, Math.round(this.canvas.clientHeight * dpr));
+    if (this.fitted) {
+      this.scale = this.fitScale();
+      this.centerX = this.pyramid.width / 2;
+      this.centerY = this.pyramid.height / 2;
+    }
+    this.requestRender();
+  }
+
+  // Zoom by `factor`, keeping the image point under (x, y) in place
+  zoomAt(x, y, factor) {
+    const scale = Math.min(MAX_SCALE, Math.max(this.fitScale() / 2, this.scale * factor));
+    const offsetX = x - this.canvas.clientWidth / 2;
+    const offsetY = y - this.canvas.clientHeight / 2;
+    this.centerX += offsetX / this.scale - offsetX / scale;
+    this.centerY += offsetY / this.scale - offsetY / scale;
+    this.scale = scale;
+    this.fitted = false;
+    this.requestRender();
+  }
+
+  requestRender() {
+    if (this.frame || this.disposed) return;
+    this.frame = requestAnimationFrame(() => {
+      this.frame = null;
+      this.render();
+    });
+  }
+
+  // Tiles of `level` inside the viewport, nearest to its centre first
+  visibleTiles(level, left, top, right, bottom) {
+    const { levels, tile_size: tileSize } = this.pyramid;
+    const [width, height] = levelSize(this.pyramid, level);
+    // Image pixels per level pixel
+    const factor = 2 ** (levels - 1 - level);
+    const span = tileSize * factor;
+    const firstColumn = Math.max(0, Math.floor(left / span));
+    const lastColumn = Math.min(Math.ceil(width / tileSize) - 1, Math.floor(right / span));
+    const firstRow = Math.max(0, Math.floor(top / span));
+    const lastRow = Math.min(Math.ceil(height / tileSize) - 1, Math.floor(bottom / span));
+    const middleColumn = (left + right) / 2 / span;
+    const middleRow = (top + bottom) / 2 / span;
+    const tiles = [];
+    for (let row = firstRow; row <= lastRow; row++) {
+      for (let column = firstColumn; column <= lastColumn; column++) {
+        const distance = Math.hypot(column + 0.5 - middleColumn, row + 0.5 - middleRow);
+        tiles.push({ level, column, row, factor, distance, key: `${level}/${column}_${row}` });
+      }
+    }
+    return tiles.sort((a, b) => a.distance - b.distance);
+  }
+
+  render() {
+    const { canvas, ctx, pyramid } = this;
+    const dpr = window.devicePixelRatio;
+    // Device pixels per image pixel
+    const pixelScale = this.scale * dpr;
+    const halfWidth = canvas.width / 2 / pixelScale;
+    const halfHeight = canvas.height / 2 / pixelScale;
+    const left = this.centerX - halfWidth;
+    const top = this.centerY - halfHeight;
+    const right = this.centerX + halfWidth;
+    const bottom = this.centerY + halfHeight;
+
+    // The coarsest level that still has a pixel per device pixel
+    const maxLevel = pyramid.levels - 1;
+    const level = Math.max(this.baseLevel, Math.min(maxLevel,
+      maxLevel - Math.floor(Math.log2(1 / Math.min(1, pixelScale)))));
+
+    ctx.setTransform(1, 0, 0, 1, 0, 0);
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    // Sharp pixels when zoomed in past 1:1, smooth ones below
+    ctx.imageSmoothingEnabled = pixelScale < 2;
+    ctx.imageSmoothingQuality = 'high';
+
+    this.wanted = [];
+    for (let drawn = this.baseLevel; drawn <= level; drawn++) {
+      const tiles = this.visibleTiles(drawn, left, top, right, bottom);
+      for (const tile of tiles) {
+        const bitmap = this.tiles.get(tile.key);
+        if (!bitmap) continue;
+        // Most recently drawn last, so eviction drops tiles out of view
+        this.tiles.delete(tile.key);
+        this.tiles.set(tile.key, bitmap);
+        const x = (tile.column * pyramid.tile_size * tile.factor - left) * pixelScale;
+        const y = (tile.row * pyramid.tile_size * tile.factor - top) * pixelScale;
+        ctx.drawImage(bitmap, x, y, bitmap.width * tile.factor * pixelScale, bitmap.height * tile.factor * pixelScale);
+      }
+      // Only the backdrop and the level for this zoom are fetched
+      if (drawn === this.baseLevel || drawn === level) {
+        this.wanted.push(...tiles.filter(tile => !this.tiles.has(tile.key)));
+      }
+    }
+    this.loadWanted();
+  }
+
+  // Start loads for the tiles the last frame was missing, up to
+  // MAX_TILE_LOADS at a time. Tiles that scrolled out of view meanwhile are
+  // never requested.
+  loadWanted() {
+    while (this.loading.size < MAX_TILE_LOADS && this.wanted.length) {
+      const tile = this.wanted.shift();
+      if (this.loading.has(tile.key) || this.tiles.has(tile.key)) continue;
+      this.loading.add(tile.key);
+      loadTile(this.pyramid, tile.level, tile.column, tile.row)
+        .then(bitmap => {
+          if (this.disposed) {
+            bitmap.close();
+            return;
+          }
+          this.tiles.set(tile.key, bitmap);
+          this.bytes += bitmap.width * bitmap.height * 4;
+          this.evict();
+          this.requestRender();
+        })
+        .catch(error => console.warn(`Could not load tile ${tile.key}:`, error))
+        .finally(() => {
+          this.loading.delete(tile.key);
+          if (!this.disposed) this.loadWanted();
+        });
+    }
+  }
+
+  evict() {
+    for (const [key, bitmap] of this.tiles) {
+      if (this.bytes <= TILE_MEMORY_BUDGET) break;
+      this.tiles.delete(key);
+      this.bytes -= bitmap.width * bitmap.height * 4;
+      bitmap.close();
+    }
+  }
+
+  dispose() {
+    if (this.disposed) return;
+    this.disposed = true;
+    cancelAnimationFrame(this.frame);
+    this.resizeObserver.disconnect();
+    for (const bitmap of this.tiles.values()) bitmap.close();
+    this.tiles.clear();
+    this.bytes = 0;
+    this.canvas.remove();
+    liveViewers.delete(this);
+  }
+}
@@ -14,9 +14,7 @@ let _searchTerm = '';
 function clearSearch(searchInput) {
   searchInput.value = '';
   _searchTerm = '';
-  setCurrentPage(0);
   updateFilteredModelFiles();
-  renderPage(getCurrentPage());
 }
 
 // Function to close all dropdowns
@@ -78,9 +76,8 @@ export function initializeUI() {
       if (searchInput) {
         searchInput.addEventListener('input', (e) => {
           _searchTerm = e.target.value.toLowerCase();
-          setCurrentPage(0);
+          // Resets to the first page when the results change
           updateFilteredModelFiles();
-          renderPage(getCurrentPage());
         });
       }
 
@@ -316,22 +313,6 @@ export function getUIElements() {
   return window.uiElements || {};
 }
 
-// Function to check if a file matches the search criteria
-export const fileMatchesSearch = (file) => {
-  if (!_searchTerm) return true;
-  
-  const searchTerms = _searchTerm.split(' ').filter(term => term.length > 0);
-  if (searchTerms.length === 0) return true;
-  
-  const searchableContent = [
-    file.name.toLowerCase(),
-    file.type.toLowerCase(),
-    file.fullPath?.toLowerCase() || ''
-  ].join(' ');
-  
-  return searchTerms.every(term => searchableContent.includes(term));
-};
-
 // Getters
 export const getCurrentPage = () => _currentPage;
 export const getItemsPerPage = () => _itemsPerPage;
@@ -342,6 +323,12 @@ export const getSelectedFiles = () => new Set(_selectedFiles);
 export const getSearchTerm = () => _searchTerm;
 
 // Setters
+export const setSearchTerm = (term) => {
+  const searchInput = getUIElements().searchInput;
+  if (searchInput) searchInput.value = term;
+  _searchTerm = term.toLowerCase();
+  updateFilteredModelFiles();
+};
 export const setCurrentPage = (page) => {
   _currentPage = page;
   return _currentPage;
@@ -505,14 +492,10 @@ export function exitFullscreen(currentFullscreenViewer) {
   
   if (currentFullscreenViewer) {
     if (currentFullscreenViewer.type === 'video') {
-      // Stop both fullscreen video and any preview video
+      // Stop the fullscreen video; grid tiles only show extracted frames
       fullscreenVideo.pause();
       fullscreenVideo.currentTime = 0;
       fullscreenVideo.src = '';
-      if (currentFullscreenViewer.previewVideo) {
-        currentFullscreenViewer.previewVideo.pause();
-        currentFullscreenViewer.previewVideo.currentTime = 0;
-      }
     } else if (currentFullscreenViewer.cleanup) {
       currentFullscreenViewer.cleanup();
     }
@@ -0,0 +1,98 @@
+"""
+Downloads the third-party browser files the viewer can serve locally into
+``vendor/``, so it does not depend on a CDN at run time.
+
+Every file is pinned to an exact version. Run this once after checking out
+the viewer, or whenever VENDOR_FILES changes. create_zip.py also uses
+fetch() to vendor three.js, model-viewer and Font Awesome into the bundle.
+
+Usage:
+    python vendor.py [--force]
+"""
+
+import argparse
+import os
+import sys
+import urllib.request
+from urllib.parse import urlsplit
+
+VIEWER_DIR = os.path.dirname(os.path.abspath(__file__))
+VENDOR_DIR_NAME = "vendor"
+DOWNLOAD_CACHE_DIR_NAME = ".downloads"
+
+THREE_VERSION = "0.161.0"
+THREE_URL = f"https://unpkg.com/three@{THREE_VERSION}"
+THREE_LIBS_URL = f"{THREE_URL}/examples/jsm/libs"
+MODEL_VIEWER_VERSION = "3.4.0"
+MODEL_VIEWER_URL = f"https://unpkg.com/@google/model-viewer@{MODEL_VIEWER_VERSION}/dist/model-viewer.min.js"
+FONT_AWESOME_VERSION = "6.0.0-beta3"
+FONT_AWESOME_CSS_URL = f"https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}/css/all.min.css"
+
+# Local path under vendor/ -> source URL
+VENDOR_FILES = {
+    # Decoders for compressed GLBs written by glb_compress.py
+    "draco/draco_decoder.js": f"{THREE_LIBS_URL}/draco/gltf/draco_decoder.js",
+    "draco/draco_decoder.wasm": f"{THREE_LIBS_URL}/draco/gltf/draco_decoder.wasm",
+    "draco/draco_wasm_wrapper.js": f"{THREE_LIBS_URL}/draco/gltf/draco_wasm_wrapper.js",
+    "basis/basis_transcoder.js": f"{THREE_LIBS_URL}/basis/basis_transcoder.js",
+    "basis/basis_transcoder.wasm": f"{THREE_LIBS_URL}/basis/basis_transcoder.wasm",
+    "meshopt_decoder.module.js": f"{THREE_LIBS_URL}/meshopt_decoder.module.js",
+}
+
+
+def vendor_path(local_path, vendor_dir=None):
+    return os.path.join(vendor_dir or os.path.join(VIEWER_DIR, VENDOR_DIR_NAME), *local_path.split("/"))
+
+
+def download(url, output):
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    temp_path = output + ".tmp"
+    with urllib.request.urlopen(url) as response, open(temp_path, "wb") as f:
+        f.write(response.read())
+    os.replace(temp_path, output)
+
+
+def fetch(url):
+    """
+    Returns the content of a pinned URL, downloading it only the first time
+    into vendor/.downloads/.
+    """
+    parts = urlsplit(url)
+    path = os.path.join(
+        VIEWER_DIR, VENDOR_DIR_NAME, DOWNLOAD_CACHE_DIR_NAME, parts.netloc, *parts.path.strip("/").split("/")
+    )
+    if not os.path.exists(path):
+        download(url, path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def vendor_files(files=VENDOR_FILES, vendor_dir=None, force=False):
+    """
+    Downloads missing vendored files. Returns the number that failed.
+    """
+    failures = 0
+    for local_path, url in files.items():
+        output = vendor_path(local_path, vendor_dir)
+        if os.path.exists(output) and not force:
+            continue
+        try:
+            download(url, output)
+            print(f"Downloaded {local_path}")
+        except OSError as error:
+            failures += 1
+            print(f"Failed to download {url}: {error}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download pinned third-party files into vendor/.")
+    parser.add_argument("--force", action="store_true", help="Download files that already exist")
+    args = parser.parse_args()
+
+    failures = vendor_files(force=args.force)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+// video_preview.js
+// Extracts a strip of evenly spaced thumbnails from a video once, so tiles
+// can hover-scrub by swapping cached frames instead of seeking a live
+// <video> decoder. Strips live in the shared preview bitmap cache.
+
+import { previewCache, previewSizeFor } from './image_preview.js';
+
+// Number of thumbnails extracted per video
+export const STRIP_FRAME_COUNT = 8;
+
+// Cache key -> { bitmap, duration, frameCount, frameWidth, frameHeight }.
+// Entries whose bitmap the preview cache has evicted (and closed) are pruned.
+const strips = new Map();
+
+// Longest one extraction may take. A video whose decoder never answers is
+// given up on, so it does not stall every later tile behind it.
+const EXTRACTION_TIMEOUT_MS = 20000;
+
+// Extractions run one at a time through a single hidden <video>, so a page
+// of videos never holds more than one decoder for previews.
+let extractionQueue = Promise.resolve();
+let extractorVideo = null;
+
+function abortError() {
+  return new DOMException('Video strip extraction aborted', 'AbortError');
+}
+
+function getExtractorVideo() {
+  if (!extractorVideo) {
+    extractorVideo = document.createElement('video');
+    extractorVideo.muted = true;
+    extractorVideo.preload = 'auto';
+    extractorVideo.playsInline = true;
+  }
+  return extractorVideo;
+}
+
+// Resolves on `eventName`; rejects on a decode error or when `timeout` aborts
+function once(video, eventName, timeout) {
+  return new Promise((resolve, reject) => {
+    const onEvent = () => { cleanup(); resolve(); };
+    const onError = () => { cleanup(); reject(new Error('Failed to decode video')); };
+    const onTimeout = () => { cleanup(); reject(timeout.reason); };
+    const cleanup = () => {
+      video.removeEventListener(eventName, onEvent);
+      video.removeEventListener('error', onError);
+      timeout.removeEventListener('abort', onTimeout);
+    };
+    if (timeout.aborted) {
+      reject(timeout.reason);
+      return;
+    }
+    video.addEventListener(eventName, onEvent);
+    video.addEventListener('error', onError);
+    timeout.addEventListener('abort', onTimeout);
+  });
+}
+
+// Seek to `time`, preferring the nearest keyframe where the browser supports it
+async function seekTo(video, time, timeout) {
+  const seeked = once(video, 'seeked', timeout);
+  if (typeof video.fastSeek === 'function') {
+    video.fastSeek(time);
+  } else {
+    video.currentTime = time;
+  }
+  await seeked;
+}
+
+async function extractStrip(file, maxSize, frameCount, signal, timeout) {
+  const video = getExtractorVideo();
+  const url = URL.createObjectURL(file);
+  try {
+    const metadataLoaded = once(video, 'loadeddata', timeout);
+    video.src = url;
+    await metadataLoaded;
+
+    const scale = Math.min(1, maxSize / Math.max(video.videoWidth, video.videoHeight));
+    const frameWidth = Math.max(1, Math.round(video.videoWidth * scale));
+    const frameHeight = Math.max(1, Math.round(video.videoHeight * scale));
+    const duration = Number.isFinite(video.duration) ? video.duration : 0;
+
+    const canvas = new OffscreenCanvas(frameWidth * frameCount, frameHeight);
+    const ctx = canvas.getContext('2d');
+    for (let i = 0; i < frameCount; i++) {
+      if (signal?.aborted) throw abortError();
+      await seekTo(video, duration * (i + 0.5) / frameCount, timeout);
+      ctx.drawImage(video, i * frameWidth, 0, frameWidth, frameHeight);
+    }
+
+    return {
+      bitmap: canvas.transferToImageBitmap(),
+      info: { duration, frameCount, frameWidth, frameHeight }
+    };
+  } finally {
+    video.removeAttribute('src');
+    video.load();
+    URL.revokeObjectURL(url);
+  }
+}
+
+// Get the thumbnail strip for a video, extracting it on a cache miss.
+// Resolves to { bitmap, duration, frameCount, frameWidth, frameHeight }.
+export async function loadVideoStrip(key, file, maxSize, signal, frameCount = STRIP_FRAME_COUNT) {
+  const size = previewSizeFor(maxSize);
+  const cacheKey = `${key}#strip${frameCount}@${size}`;
+
+  for (const [stripKey, strip] of strips) {
+    if (strip.bitmap.width === 0) strips.delete(stripKey);
+  }
+  const cached = strips.get(cacheKey);
+  // Also marks the bitmap as recently used
+  if (cached && previewCache.get(cacheKey) === cached.bitmap) return cached;
+
+  const extraction = extractionQueue.then(async () => {
+    if (signal?.aborted) throw abortError();
+    const timeout = new AbortController();
+    const timer = setTimeout(() => {
+      // A fresh element for the next extraction, in case this one is wedged
+      extractorVideo = null;
+      timeout.abort(new Error(`Timed out extracting frames of ${file.name}`));
+    }, EXTRACTION_TIMEOUT_MS);
+    try {
+      return await extractStrip(file, size, frameCount, signal, timeout.signal);
+    } finally {
+      clearTimeout(timer);
+    }
+  });
+  // Keep the queue moving whether or not this extraction succeeds
+  extractionQueue = extraction.catch(() => {});
+
+  const { bitmap, info } = await extraction;
+  previewCache.set(cacheKey, bitmap);
+  const strip = { bitmap, ...info };
+  strips.set(cacheKey, strip);
+  return strip;
+}
+
+// Draw frame `index` of a strip into a tile canvas
+export function drawStripFrame(canvas, strip, index) {
+  const { bitmap, frameWidth, frameHeight, frameCount } = strip;
+  if (bitmap.width === 0) return; // evicted from the cache
+  const frame = Math.max(0, Math.min(frameCount - 1, index));
+  if (canvas.width !== frameWidth || canvas.height !== frameHeight) {
+    canvas.width = frameWidth;
+    canvas.height = frameHeight;
+  }
+  canvas.getContext('2d').drawImage(
+    bitmap,
+    frame * frameWidth, 0, frameWidth, frameHeight,
+    0, 0, frameWidth, frameHeight
+  );
+}
@@ -2,6 +2,24 @@
 import * as THREE from 'three';
 import { OrbitControls } from 'three/addons/controls/OrbitControls.js';
 import { FBXLoader } from 'three/addons/loaders/FBXLoader.js';
+import { startSpan } from './perf_trace.js';
+
+// Free the GPU resources of a loaded model: geometries, materials and the
+// textures they reference
+export function disposeObject(object) {
+  object.traverse(child => {
+    child.geometry?.dispose();
+    const materials = Array.isArray(child.material) ? child.material : [child.material];
+    for (const material of materials) {
+      if (!material) continue;
+      for (const value of Object.values(material)) {
+        if (value?.isTexture) value.dispose();
+      }
+      material.dispose();
+    }
+    child.skeleton?.dispose();
+  });
+}
 
 class FBXViewer {
   constructor(container) {
@@ -29,33 +47,88 @@ class FBXViewer {
     this.controls = new OrbitControls(this.camera, this.renderer.domElement);
     this.controls.enableDamping = true;
     this.controls.dampingFactor = 0.05;
+    this.controls.addEventListener('change', () => this.requestRender());
     this.mixer = null;
+    this.model = null;
+    this.loadId = 0;
+    this.running = false;
+    this.animationFrameId = null;
     this.clock = new THREE.Clock();
-    this.animate();
+    this.visibilityListener = () => this.onVisibilityChange();
+    document.addEventListener('visibilitychange', this.visibilityListener);
+    this.start();
     // Add resize observer
     this.resizeObserver = new ResizeObserver(() => this.onResize());
     this.resizeObserver.observe(this.container);
   }
 
+  // Move the canvas into another container, e.g. to reuse one renderer
+  attach(container) {
+    this.container = container;
+    container.appendChild(this.renderer.domElement);
+    this.resizeObserver.disconnect();
+    this.resizeObserver.observe(container);
+    this.onResize();
+  }
+
   onResize() {
     const containerRect = this.container.getBoundingClientRect();
     const width = this.container.offsetWidth || containerRect.width;
     const height = this.container.offsetHeight || containerRect.height;
+    if (!width || !height) return;
     this.renderer.setSize(width, height, true);
     this.camera.aspect = width / height;
     this.camera.updateProjectionMatrix();
+    this.requestRender();
+  }
+
+  // Resume rendering. Frames are only drawn on demand: after control
+  // changes (including damping), resizes and model changes, and every
+  // frame while an animation plays.
+  start() {
+    if (this.running) return;
+    this.running = true;
+    this.clock.getDelta();
+    this.requestRender();
+  }
+
+  // Pause rendering, e.g. while the viewer is offscreen or hidden
+  stop() {
+    this.running = false;
+    cancelAnimationFrame(this.animationFrameId);
+    this.animationFrameId = null;
+  }
+
+  requestRender() {
+    if (!this.running || this.animationFrameId || document.hidden) return;
+    this.animationFrameId = requestAnimationFrame(() => this.animate());
   }
 
   animate() {
-    requestAnimationFrame(() => this.animate());
-    if (this.mixer) { this.mixer.update(this.clock.getDelta()); }
-    this.controls.update();
+    this.animationFrameId = null;
+    const delta = this.clock.getDelta();
+    if (this.mixer) { this.mixer.update(delta); }
+    // update() reports whether damping is still moving the camera
+    const moving = this.controls.update();
     this.renderer.render(this.scene, this.camera);
+    if (this.mixer || moving) this.requestRender();
+  }
+
+  onVisibilityChange() {
+    if (document.hidden) {
+      cancelAnimationFrame(this.animationFrameId);
+      this.animationFrameId = null;
+    } else {
+      // Do not play back the time spent hidden in one step
+      this.clock.getDelta();
+      this.requestRender();
+    }
   }
 
   updateBackground() {
     const color = this.isDarkMode ? 0x3a3a3a : 0xe8e8e8;
     this.renderer.setClearColor(color);
+    this.requestRender();
   }
 
   setDarkMode(isDark) {
@@ -63,24 +136,100 @@ class FBXViewer {
     this.updateBackground();
   }
 
-  loadModel(url) {
-    new FBXLoader().load(url, (object) => {
-      const box = new THREE.Box3().setFromObject(object);
-      const center = box.getCenter(new THREE.Vector3());
-      const size = box.getSize(new THREE.Vector3());
-      const maxDim = Math.max(size.x, size.y, size.z);
-      const scale = 1.5 / maxDim;
-      object.scale.set(scale, scale, scale);
-      object.position.sub(center.multiplyScalar(scale));
-      this.scene.add(object);
-      if (object.animations.length > 0) {
-        this.mixer = new THREE.AnimationMixer(object);
-        const action = this.mixer.clipAction(object.animations[0]);
-        action.play();
-      }
-      this.controls.reset();
-      this.camera.lookAt(0, 0, 0);
-    });
+  // Resolves once the model is in the scene, replacing the previous one.
+  // If `signal` aborts first, or another model is loaded or the viewer is
+  // cleared meanwhile, the loaded model is freed and the promise rejects
+  // with an AbortError. `bounds` ({ min: [x, y, z], max: [x, y, z] } from
+  // model_metadata.py) skips measuring the loaded model.
+  loadModel(url, signal, bounds = null) {
+    const pending = new FBXLoader().loadAsync(url)
+      .then(object => ({ object, release: () => disposeObject(object) }));
+    return this.showModel(pending, signal, bounds);
+  }
+
+  // Like loadModel, for a model loaded elsewhere: `pending` resolves to
+  // { object, release }, and release() is called instead of disposing the
+  // object once it leaves the viewer (see model_cache.js)
+  async showModel(pending, signal, bounds = null) {
+    const loadId = ++this.loadId;
+    if (signal?.aborted) {
+      pending.then(({ release }) => release(), () => {});
+      throw new DOMException('Model load aborted', 'AbortError');
+    }
+    const endSpan = startSpan('fbx-load');
+    let object, release;
+    try {
+      ({ object, release } = await pending);
+    } finally {
+      endSpan();
+    }
+    if (signal?.aborted || loadId !== this.loadId) {
+      release();
+      throw new DOMException('Model load aborted', 'AbortError');
+    }
+    this.addModel(object, bounds, release);
+    return object;
+  }
+
+  addModel(object, bounds = null, release = () => disposeObject(object)) {
+    this.clearModel();
+    const box = bounds
+      ? new THREE.Box3(new THREE.Vector3(...bounds.min), new THREE.Vector3(...bounds.max))
+      : new THREE.Box3().setFromObject(object);
+    const center = box.getCenter(new THREE.Vector3());
+    const size = box.getSize(new THREE.Vector3());
+    const maxDim = Math.max(size.x, size.y, size.z);
+    const scale = 1.5 / maxDim;
+    object.scale.set(scale, scale, scale);
+    object.position.sub(center.multiplyScalar(scale));
+    this.scene.add(object);
+    this.model = object;
+    this.releaseModel = release;
+    if (object.animations.length > 0) {
+      this.mixer = new THREE.AnimationMixer(object);
+      const action = this.mixer.clipAction(object.animations[0]);
+      action.play();
+    }
+    this.controls.reset();
+    this.camera.lookAt(0, 0, 0);
+    this.requestRender();
+  }
+
+  // Remove the current model and free its geometry, materials and textures
+  clearModel() {
+    if (this.mixer) {
+      this.mixer.stopAllAction();
+      this.mixer.uncacheRoot(this.model);
+      this.mixer = null;
+    }
+    if (this.model) {
+      this.scene.remove(this.model);
+      this.releaseModel();
+      this.model = null;
+      this.releaseModel = null;
+    }
+    this.renderer.renderLists.dispose();
+    this.requestRender();
+  }
+
+  // Cancel pending loads and drop the current model, keeping the renderer
+  clear() {
+    this.loadId++;
+    this.clearModel();
+  }
+
+  dispose() {
+    if (this.disposed) return;
+    this.disposed = true;
+    this.stop();
+    this.clear();
+    document.removeEventListener('visibilitychange', this.visibilityListener);
+    this.resizeObserver?.disconnect();
+    this.controls.dispose();
+    this.renderer.dispose();
+    // Browsers cap live WebGL contexts, so give this one back right away
+    this.renderer.forceContextLoss();
+    this.renderer.domElement.remove();
   }
 }
 
@@ -0,0 +1,74 @@
+// waveform.js
+// Reads peak files written by waveform_peaks.py and draws them on a canvas.
+// Only the header and the single zoom level being drawn are read from disk.
+
+const PEAK_MAGIC = 'DAVP';
+const HEADER_SIZE = 20;
+const LEVEL_ENTRY_SIZE = 8;
+const MAX_LEVELS = 16;
+
+// Read the coarsest level with at least `minPeaks` peaks (or the finest level
+// if none has that many). Resolves to null if the file is not a peak file.
+export async function readPeakLevel(file, minPeaks) {
+  const head = new DataView(await file.slice(0, HEADER_SIZE + MAX_LEVELS * LEVEL_ENTRY_SIZE).arrayBuffer());
+  const magic = String.fromCharCode(head.getUint8(0), head.getUint8(1), head.getUint8(2), head.getUint8(3));
+  if (magic !== PEAK_MAGIC || head.getUint16(4, true) !== 1) return null;
+
+  const levelCount = head.getUint16(6, true);
+  const sampleRate = head.getUint32(8, true);
+  const frameCount = Number(head.getBigUint64(12, true));
+
+  // Levels are stored coarsest first
+  let offset = HEADER_SIZE + levelCount * LEVEL_ENTRY_SIZE;
+  let chosen = null;
+  for (let i = 0; i < levelCount; i++) {
+    const entry = HEADER_SIZE + i * LEVEL_ENTRY_SIZE;
+    const level = {
+      samplesPerPeak: head.getUint32(entry, true),
+      peakCount: head.getUint32(entry + 4, true),
+      offset
+    };
+    offset += level.peakCount * 2;
+    chosen = level;
+    if (level.peakCount >= minPeaks) break;
+  }
+  if (!chosen) return null;
+
+  const data = await file.slice(chosen.offset, chosen.offset + chosen.peakCount * 2).arrayBuffer();
+  return {
+    sampleRate,
+    frameCount,
+    duration: sampleRate ? frameCount / sampleRate : 0,
+    samplesPerPeak: chosen.samplesPerPeak,
+    peaks: new Int8Array(data)
+  };
+}
+
+// Draw min/max bars filling the canvas, using the canvas CSS colour
+export function drawWaveform(canvas, level) {
+  const rect = canvas.getBoundingClientRect();
+  const width = Math.max(1, Math.round(rect.width * window.devicePixelRatio));
+  const height = Math.max(1, Math.round(rect.height * window.devicePixelRatio));
+  canvas.width = width;
+  canvas.height = height;
+
+  const ctx = canvas.getContext('2d');
+  ctx.fillStyle = getComputedStyle(canvas).color;
+  const peaks = level.peaks;
+  const peakCount = peaks.length / 2;
+  const mid = height / 2;
+  const scale = mid / 128;
+
+  for (let x = 0; x < width; x++) {
+    const start = Math.floor(x * peakCount / width);
+    const end = Math.max(start + 1, Math.floor((x + 1) * peakCount / width));
+    let low = 0;
+    let high = 0;
+    for (let i = start; i < end && i < peakCount; i++) {
+      low = Math.min(low, peaks[i * 2]);
+      high = Math.max(high, peaks[i * 2 + 1]);
+    }
+    const top = mid - high * scale;
+    ctx.fillRect(x, top, 1, Math.max(1, (high - low) * scale));
+  }
+}
@@ -0,0 +1,291 @@
+"""
+Generates compact waveform peak files for audio assets.
+
+Audio is decoded in fixed-size blocks and reduced to min/max pairs on the
+fly, so memory use does not depend on the length of the file. Each peak
+file holds several zoom levels; the viewer reads only the coarsest level to
+draw a tile, which is a few KB regardless of the audio length.
+
+WAV files are decoded with the standard library. Other formats (mp3, float
+WAV) are decoded by piping them through ``ffmpeg``, which must be on PATH.
+
+Peak file layout (little-endian):
+    magic         4s   b"DAVP"
+    version       H    1
+    level_count   H
+    sample_rate   I
+    frame_count   Q
+    levels        level_count * (samples_per_peak I, peak_count I), coarsest first
+    data          for each level, peak_count (min int8, max int8) pairs
+
+Usage:
+    python waveform_peaks.py LIBRARY_ROOT [--jobs N] [--force]
+    python waveform_peaks.py --file input.mp3 --output input.peaks
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import wave
+from array import array
+from functools import partial
+
+from asset_catalog import asset_path, cache_relative, derived_path, is_fresh, run_asset_batch
+
+PEAK_MAGIC = b"DAVP"
+PEAK_VERSION = 1
+HEADER_FORMAT = "<4sHHIQ"
+LEVEL_FORMAT = "<II"
+
+# Finest level: one min/max pair per this many frames
+BASE_SAMPLES_PER_PEAK = 512
+# Each coarser level merges this many peaks of the level below
+LEVEL_FACTOR = 4
+# Stop adding levels once a level has at most this many peaks
+MIN_LEVEL_PEAKS = 512
+
+# Frames decoded per block
+BLOCK_FRAMES = 65536
+FFMPEG_SAMPLE_RATE = 22050
+
+# Magnitude of the most negative sample for each PCM sample width
+FULL_SCALE = {1: 128, 2: 32768, 3: 2 ** 31, 4: 2 ** 31}
+
+
+class PeakBuilder:
+    """
+    Reduces a stream of interleaved samples to min/max pairs.
+
+    Channels are folded together: each peak covers samples_per_peak frames
+    of every channel.
+    """
+
+    def __init__(self, samples_per_peak, channels, full_scale):
+        self.window = samples_per_peak * channels
+        self.channels = channels
+        self.full_scale = full_scale
+        self.pending = None
+        self.frame_count = 0
+        self.peaks = array("b")
+
+    def _emit(self, low, high):
+        scale = 127 / self.full_scale
+        self.peaks.append(max(-128, min(127, round(low * scale))))
+        self.peaks.append(max(-128, min(127, round(high * scale))))
+
+    def feed(self, samples):
+        self.frame_count += len(samples) // self.channels
+        if self.pending:
+            samples = self.pending + samples
+        usable = len(samples) - len(samples) % self.window
+        window = self.window
+        for start in range(0, usable, window):
+            chunk = samples[start:start + window]
+            self._emit(min(chunk), max(chunk))
+        self.pending = samples[usable:]
+
+    def finish(self):
+        if self.pending:
+            self._emit(min(self.pending), max(self.pending))
+            self.pending = None
+        return self.peaks
+
+
+def pcm_to_array(data, sample_width):
+    """
+    Converts little-endian PCM bytes to an array of signed integers.
+    """
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        return array("h", (value - 128 for value in data))
+    if sample_width == 2:
+        samples = array("h")
+        samples.frombytes(data)
+        if sys.byteorder == "big":
+            samples.byteswap()
+        return samples
+    if sample_width == 3:
+        # Widen 24-bit samples to 32-bit by placing them in the high bytes
+        usable = len(data) - len(data) % 3
+        widened = bytearray(usable // 3 * 4)
+        widened[1::4] = data[0:usable:3]
+        widened[2::4] = data[1:usable:3]
+        widened[3::4] = data[2:usable:3]
+        samples = array("i")
+        samples.frombytes(bytes(widened))
+        if sys.byteorder == "big":
+            samples.byteswap()
+        return samples
+    if sample_width == 4:
+        samples = array("i")
+        samples.frombytes(data)
+        if sys.byteorder == "big":
+            samples.byteswap()
+        return samples
+    raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+
+def read_wav_peaks(path, samples_per_peak):
+    """
+    Streams a PCM WAV file through a PeakBuilder.
+
+    Returns (sample_rate, frame_count, peaks).
+    """
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        if sample_width not in FULL_SCALE:
+            raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+        builder = PeakBuilder(samples_per_peak, channels, FULL_SCALE[sample_width])
+        while True:
+            data = wav.readframes(BLOCK_FRAMES)
+            if not data:
+                break
+            samples = pcm_to_array(data, sample_width)
+            builder.feed(samples)
+    return sample_rate, builder.frame_count, builder.finish()
+
+
+def read_ffmpeg_peaks(path, samples_per_peak):
+    """
+    Decodes any format ffmpeg understands to mono 16-bit PCM and streams it
+    through a PeakBuilder.
+
+    Returns (sample_rate, frame_count, peaks).
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg is required to decode this file but was not found on PATH")
+    command = [
+        ffmpeg, "-v", "error", "-nostdin", "-i", path,
+        "-vn", "-ac", "1", "-ar", str(FFMPEG_SAMPLE_RATE),
+        "-f", "s16le", "-acodec", "pcm_s16le", "-",
+    ]
+    builder = PeakBuilder(samples_per_peak, 1, 32768)
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+        leftover = b""
+        while True:
+            data = process.stdout.read(BLOCK_FRAMES * 2)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % 2
+            leftover = data[usable:]
+            samples = pcm_to_array(data[:usable], 2)
+            builder.feed(samples)
+        stderr = process.stderr.read().decode("utf-8", "replace")
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.strip()}")
+    return FFMPEG_SAMPLE_RATE, builder.frame_count, builder.finish()
+
+
+def read_peaks(path, samples_per_peak=BASE_SAMPLES_PER_PEAK):
+    """
+    Computes the finest peak level for an audio file.
+    """
+    if path.lower().endswith(".wav"):
+        try:
+            return read_wav_peaks(path, samples_per_peak)
+        except wave.Error:
+            # Float or compressed WAV - let ffmpeg handle it
+            pass
+    return read_ffmpeg_peaks(path, samples_per_peak)
+
+
+def downsample_peaks(peaks, factor):
+    """
+    Merges every `factor` min/max pairs into one.
+    """
+    merged = array("b")
+    step = factor * 2
+    for start in range(0, len(peaks), step):
+        group = peaks[start:start + step]
+        merged.append(min(group[0::2]))
+        merged.append(max(group[1::2]))
+    return merged
+
+
+def build_levels(base_peaks, base_samples_per_peak=BASE_SAMPLES_PER_PEAK):
+    """
+    Builds the zoom levels from the finest one, returned coarsest first as
+    a list of (samples_per_peak, peaks).
+    """
+    levels = [(base_samples_per_peak, base_peaks)]
+    while len(levels[-1][1]) // 2 > MIN_LEVEL_PEAKS:
+        samples_per_peak, peaks = levels[-1]
+        levels.append((samples_per_peak * LEVEL_FACTOR, downsample_peaks(peaks, LEVEL_FACTOR)))
+    levels.reverse()
+    return levels
+
+
+def write_peak_file(output_path, sample_rate, frame_count, levels):
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, PEAK_MAGIC, PEAK_VERSION, len(levels), sample_rate, frame_count))
+        for samples_per_peak, peaks in levels:
+            f.write(struct.pack(LEVEL_FORMAT, samples_per_peak, len(peaks) // 2))
+        for _, peaks in levels:
+            f.write(peaks.tobytes())
+    os.replace(temp_path, output_path)
+
+
+def generate_peak_file(input_path, output_path):
+    """
+    Decodes one audio file and writes its peak file.
+    """
+    sample_rate, frame_count, base_peaks = read_peaks(input_path)
+    levels = build_levels(base_peaks)
+    write_peak_file(output_path, sample_rate, frame_count, levels)
+    return output_path
+
+
+def process_asset(root, rel_path, force=False):
+    """
+    Batch-mode worker: writes the peak file for one cataloged asset and
+    returns its catalog fields.
+    """
+    source = asset_path(root, rel_path)
+    output = derived_path(root, "peaks", rel_path, ".peaks")
+    if force or not is_fresh(output, source):
+        generate_peak_file(source, output)
+    return {"peaks": cache_relative(root, output)}
+
+
+def generate_library_peaks(root, jobs=None, force=False):
+    """
+    Generates peak files for every audio asset in a library across worker
+    processes and records them in the catalog.
+    """
+    return run_asset_batch(
+        root, ("audio",), partial(process_asset, force=force),
+        jobs=jobs, error_fields=("peaks",), label="Generating waveform peaks for",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate waveform peak files for audio assets.")
+    parser.add_argument("root", nargs="?", help="Library root to process in batch mode")
+    parser.add_argument("--file", help="Process a single audio file instead of a library")
+    parser.add_argument("--output", help="Peak file to write in single-file mode")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Regenerate peak files that are up to date")
+    args = parser.parse_args()
+
+    if args.file:
+        output = args.output or os.path.splitext(args.file)[0] + ".peaks"
+        generate_peak_file(args.file, output)
+        print(f"Wrote '{output}'")
+    elif args.root:
+        failures = generate_library_peaks(args.root, jobs=args.jobs, force=args.force)
+        sys.exit(1 if failures else 0)
+    else:
+        parser.error("either a library root or --file is required")
+
+
+if __name__ == "__main__":
+    main()